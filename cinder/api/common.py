@@ -116,6 +116,33 @@ def limited(items, request, max_limit=CONF.osapi_max_limit):
                     will cause exc.HTTPBadRequest() exceptions to be raised.
     :kwarg max_limit: The maximum number of items to return from 'items'
     """
+    offset, limit = get_offset_and_limit(request, max_limit)
+    range_end = offset + limit
+    return items[offset:range_end]
+
+
+def get_limited_range_end(request, max_limit=CONF.osapi_max_limit):
+    """Return how many leading items limited() may return from a list.
+
+    Callers can use this to avoid fetching more rows than the requested
+    offset and limit will keep.
+
+    :param request: ``wsgi.Request`` as passed to limited()
+    :kwarg max_limit: The maximum number of items limited() returns
+    """
+    offset, limit = get_offset_and_limit(request, max_limit)
+    return offset + limit
+
+
+def get_offset_and_limit(request, max_limit=CONF.osapi_max_limit):
+    """Return the offset and limit that limited() applies to a list.
+
+    Callers that can pass them on to the database get only the requested
+    page back, instead of every item for limited() to slice.
+
+    :param request: ``wsgi.Request`` as passed to limited()
+    :kwarg max_limit: The maximum number of items limited() returns
+    """
     try:
         offset = int(request.GET.get('offset', 0))
     except ValueError:
@@ -137,8 +164,7 @@ def limited(items, request, max_limit=CONF.osapi_max_limit):
         raise webob.exc.HTTPBadRequest(explanation=msg)
 
     limit = min(max_limit, limit or max_limit)
-    range_end = offset + limit
-    return items[offset:range_end]
+    return offset, limit
 
 
 def limited_by_marker(items, request, max_limit=CONF.osapi_max_limit):
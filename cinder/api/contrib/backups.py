@@ -28,6 +28,7 @@ from cinder import backup as backupAPI
 from cinder import exception
 from cinder.i18n import _
 from cinder.openstack.common import log as logging
+from cinder.openstack.common import strutils
 from cinder import utils
 
 LOG = logging.getLogger(__name__)
@@ -106,7 +107,7 @@ class CreateDeserializer(wsgi.MetadataXMLDeserializer):
         backup_node = self.find_first_child_named(node, 'backup')
 
         attributes = ['container', 'display_name',
-                      'display_description', 'volume_id']
+                      'display_description', 'volume_id', 'incremental']
 
         for attr in attributes:
             if backup_node.getAttribute(attr):
@@ -204,6 +205,9 @@ class BackupsController(wsgi.Controller):
         """Returns a list of backups, transformed through view builder."""
         context = req.environ['cinder.context']
         filters = req.params.copy()
+        # limit and offset are not filters, they are applied by the query
+        filters.pop('limit', None)
+        filters.pop('offset', None)
 
         utils.remove_invalid_filter_options(context,
                                             filters,
@@ -213,8 +217,9 @@ class BackupsController(wsgi.Controller):
             filters['display_name'] = filters['name']
             del filters['name']
 
-        backups = self.backup_api.get_all(context, search_opts=filters)
-        limited_list = common.limited(backups, req)
+        offset, limit = common.get_offset_and_limit(req)
+        limited_list = self.backup_api.get_all(context, search_opts=filters,
+                                               limit=limit, offset=offset)
 
         if is_detail:
             backups = self._view_builder.detail_list(req, limited_list)
@@ -246,6 +251,12 @@ class BackupsController(wsgi.Controller):
         container = backup.get('container', None)
         name = backup.get('name', None)
         description = backup.get('description', None)
+        try:
+            incremental = strutils.bool_from_string(
+                backup.get('incremental', False), strict=True)
+        except ValueError:
+            msg = _("Bad value for 'incremental'")
+            raise exc.HTTPBadRequest(explanation=msg)
 
         LOG.info(_("Creating backup of volume %(volume_id)s in container"
                    " %(container)s"),
@@ -254,9 +265,12 @@ class BackupsController(wsgi.Controller):
 
         try:
             new_backup = self.backup_api.create(context, name, description,
-                                                volume_id, container)
+                                                volume_id, container,
+                                                incremental=incremental)
         except exception.InvalidVolume as error:
             raise exc.HTTPBadRequest(explanation=error.msg)
+        except exception.InvalidBackup as error:
+            raise exc.HTTPBadRequest(explanation=error.msg)
         except exception.VolumeNotFound as error:
             raise exc.HTTPNotFound(explanation=error.msg)
         except exception.ServiceNotFound as error:
@@ -34,11 +34,6 @@ class ExtendedSnapshotAttributesController(wsgi.Controller):
                                                                    **kwargs)
         self.volume_api = volume.API()
 
-    def _get_snapshots(self, context):
-        snapshots = self.volume_api.get_all_snapshots(context)
-        rval = dict((snapshot['id'], snapshot) for snapshot in snapshots)
-        return rval
-
     def _extend_snapshot(self, req, resp_snap):
         db_snap = req.cached_resource_by_id(resp_snap['id'])
         for attr in ['project_id', 'progress']:
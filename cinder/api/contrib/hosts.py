@@ -216,7 +216,8 @@ class HostController(wsgi.Controller):
 
         # Getting total available/used resource
         # TODO(jdg): Add summary info for Snapshots
-        volume_refs = db.volume_get_all_by_host(context, host_ref['host'])
+        volume_refs = db.volume_get_all_by_host(context, host_ref['host'],
+                                                load_strategy='noload')
         (count, sum) = db.volume_data_get_for_host(context,
                                                    host_ref['host'])
 
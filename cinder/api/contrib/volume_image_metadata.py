@@ -33,10 +33,11 @@ class VolumeImageMetadataController(wsgi.Controller):
         super(VolumeImageMetadataController, self).__init__(*args, **kwargs)
         self.volume_api = volume.API()
 
-    def _get_all_images_metadata(self, context):
-        """Returns the image metadata for all volumes."""
+    def _get_images_metadata(self, context, volume_id_list):
+        """Returns the image metadata for the given volumes."""
         try:
-            all_metadata = self.volume_api.get_volumes_image_metadata(context)
+            all_metadata = self.volume_api.get_list_volumes_image_metadata(
+                context, volume_id_list)
         except Exception as e:
             LOG.debug('Problem retrieving volume image metadata. '
                       'It will be skipped. Error: %s', e)
@@ -75,8 +76,12 @@ class VolumeImageMetadataController(wsgi.Controller):
         context = req.environ['cinder.context']
         if authorize(context):
             resp_obj.attach(xml=VolumesImageMetadataTemplate())
-            all_meta = self._get_all_images_metadata(context)
-            for vol in list(resp_obj.obj.get('volumes', [])):
+            volumes = list(resp_obj.obj.get('volumes', []))
+            if not volumes:
+                return
+            all_meta = self._get_images_metadata(
+                context, [vol['id'] for vol in volumes])
+            for vol in volumes:
                 image_meta = all_meta.get(vol['id'], {})
                 self._add_image_metadata(context, vol, image_meta)
 
@@ -130,8 +130,9 @@ class VolumeTransferController(wsgi.Controller):
         context = req.environ['cinder.context']
         filters = req.params.copy()
         LOG.debug('Listing volume transfers')
-        transfers = self.transfer_api.get_all(context, filters=filters)
-        limited_list = common.limited(transfers, req)
+        offset, limit = common.get_offset_and_limit(req)
+        limited_list = self.transfer_api.get_all(context, filters=filters,
+                                                 limit=limit, offset=offset)
 
         if is_detail:
             transfers = self._view_builder.detail_list(req, limited_list)
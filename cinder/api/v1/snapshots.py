@@ -150,8 +150,9 @@ class SnapshotsController(wsgi.Controller):
         utils.remove_invalid_filter_options(context, search_opts,
                                             allowed_search_options)
 
-        snapshots = self.volume_api.get_all_snapshots(context,
-                                                      search_opts=search_opts)
+        snapshots = self.volume_api.get_all_snapshots(
+            context, search_opts=search_opts,
+            limit=common.get_limited_range_end(req))
         limited_list = common.limited(snapshots, req)
         req.cache_resource(limited_list)
         res = [entity_maker(context, snapshot) for snapshot in limited_list]
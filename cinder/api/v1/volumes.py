@@ -279,17 +279,18 @@ class VolumeController(wsgi.Controller):
                                             search_opts,
                                             self._get_volume_search_options())
 
-        volumes = self.volume_api.get_all(context, marker=None, limit=None,
+        offset, limit = common.get_offset_and_limit(req)
+        volumes = self.volume_api.get_all(context, marker=None, limit=limit,
                                           sort_key='created_at',
                                           sort_dir='desc', filters=search_opts,
-                                          viewable_admin_meta=True)
+                                          viewable_admin_meta=True,
+                                          offset=offset)
 
-        volumes = [dict(vol.iteritems()) for vol in volumes]
+        limited_list = [dict(vol.iteritems()) for vol in volumes]
 
-        for volume in volumes:
+        for volume in limited_list:
             utils.add_visible_admin_metadata(volume)
 
-        limited_list = common.limited(volumes, req)
         req.cache_resource(limited_list)
         res = [entity_maker(context, vol) for vol in limited_list]
         return {'volumes': res}
@@ -143,10 +143,13 @@ class SnapshotsController(wsgi.Controller):
         """Returns a list of snapshots, transformed through entity_maker."""
         context = req.environ['cinder.context']
 
-        #pop out limit and offset , they are not search_opts
+        #pop out pagination and sorting params, they are not search_opts
         search_opts = req.GET.copy()
         search_opts.pop('limit', None)
         search_opts.pop('offset', None)
+        marker = search_opts.pop('marker', None)
+        sort_key = search_opts.pop('sort_key', 'created_at')
+        sort_dir = search_opts.pop('sort_dir', 'desc')
 
         #filter out invalid option
         allowed_search_options = ('status', 'volume_id', 'name')
@@ -158,8 +161,10 @@ class SnapshotsController(wsgi.Controller):
             search_opts['display_name'] = search_opts['name']
             del search_opts['name']
 
-        snapshots = self.volume_api.get_all_snapshots(context,
-                                                      search_opts=search_opts)
+        snapshots = self.volume_api.get_all_snapshots(
+            context, search_opts=search_opts, marker=marker,
+            limit=common.get_limited_range_end(req), sort_key=sort_key,
+            sort_dir=sort_dir)
         limited_list = common.limited(snapshots, req)
         req.cache_resource(limited_list)
         res = [entity_maker(context, snapshot) for snapshot in limited_list]
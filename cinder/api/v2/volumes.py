@@ -231,9 +231,13 @@ class VolumeController(wsgi.Controller):
         if 'metadata' in filters:
             filters['metadata'] = ast.literal_eval(filters['metadata'])
 
+        # NOTE: the summary view only shows the id and name of each volume,
+        # so the related metadata rows do not need to be loaded for it
+        load_strategy = 'subquery' if is_detail else 'noload'
         volumes = self.volume_api.get_all(context, marker, limit, sort_key,
                                           sort_dir, filters,
-                                          viewable_admin_meta=True)
+                                          viewable_admin_meta=True,
+                                          load_strategy=load_strategy)
 
         volumes = [dict(vol.iteritems()) for vol in volumes]
 
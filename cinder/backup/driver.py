@@ -258,6 +258,10 @@ class BackupDriver(base.Base):
     def put_metadata(self, volume_id, json_metadata):
         self.backup_meta_api.put(volume_id, json_metadata)
 
+    def _file_is_rbd(self, volume_file):
+        """Returns True if the volume_file is actually an RBD image."""
+        return hasattr(volume_file, 'rbd_image')
+
     @abc.abstractmethod
     def backup(self, backup, volume_file, backup_metadata=False):
         """Start a backup of a specified volume."""
@@ -248,8 +248,12 @@ class CephBackupDriver(BackupDriver):
             client.shutdown()
             raise
 
-    def _disconnect_from_rados(self, client, ioctx):
-        """Terminate connection with the backup Ceph cluster."""
+    def _disconnect_from_rados(self, client, ioctx, healthy=True):
+        """Terminate connection with the backup Ceph cluster.
+
+        Backup connections are not pooled, so healthy, as passed by
+        rbd.RADOSClient, is not needed.
+        """
         # closing an ioctx cannot raise an exception
         ioctx.close()
         client.shutdown()
@@ -298,8 +302,35 @@ class CephBackupDriver(BackupDriver):
                     volume.write(zeroes)
                     volume.flush()
 
-    def _transfer_data(self, src, src_name, dest, dest_name, length):
-        """Transfer data between files (Python IO objects)."""
+    def _write_data(self, dest, data, dest_zeroed=False):
+        """Write data to dest and return the number of bytes skipped.
+
+        Chunks of zeroes are not written, dest is seeked past them when it
+        is known to be zeroed already or discarded when it is an rbd.
+        """
+        if utils.is_zero_data(data):
+            length = len(data)
+            if dest_zeroed:
+                dest.seek(length, os.SEEK_CUR)
+                return length
+            if self._file_is_rbd(dest):
+                dest.rbd_image.discard(dest.tell(), length)
+                dest.seek(length, os.SEEK_CUR)
+                return length
+
+        dest.write(data)
+        dest.flush()
+        return 0
+
+    def _transfer_data(self, src, src_name, dest, dest_name, length,
+                       dest_zeroed=False):
+        """Transfer data between files (Python IO objects).
+
+        If dest_zeroed is True dest is known to read back as zeroes, e.g. a
+        newly created rbd image, so chunks of zeroes are not written to it.
+
+        Returns the number of bytes of zeroes not written to dest.
+        """
         LOG.debug("Transferring data between '%(src)s' and '%(dest)s'" %
                   {'src': src_name, 'dest': dest_name})
 
@@ -307,6 +338,8 @@ class CephBackupDriver(BackupDriver):
         LOG.debug("%(chunks)s chunks of %(bytes)s bytes to be transferred" %
                   {'chunks': chunks, 'bytes': self.chunk_size})
 
+        skipped_bytes = 0
+
         for chunk in xrange(0, chunks):
             before = time.time()
             data = src.read(self.chunk_size)
@@ -317,10 +350,9 @@ class CephBackupDriver(BackupDriver):
                     self._discard_bytes(dest, dest.tell(),
                                         length - dest.tell())
 
-                return
+                break
 
-            dest.write(data)
-            dest.flush()
+            skipped_bytes += self._write_data(dest, data, dest_zeroed)
             delta = (time.time() - before)
             rate = (self.chunk_size / delta) / 1024
             LOG.debug((_("Transferred chunk %(chunk)s of %(chunks)s "
@@ -330,19 +362,25 @@ class CephBackupDriver(BackupDriver):
 
             # yield to any other pending backups
             eventlet.sleep(0)
+        else:
+            rem = int(length % self.chunk_size)
+            if rem:
+                LOG.debug("Transferring remaining %s bytes" % rem)
+                data = src.read(rem)
+                if data == '':
+                    if CONF.restore_discard_excess_bytes:
+                        self._discard_bytes(dest, dest.tell(), rem)
+                else:
+                    skipped_bytes += self._write_data(dest, data,
+                                                      dest_zeroed)
+                    # yield to any other pending backups
+                    eventlet.sleep(0)
 
-        rem = int(length % self.chunk_size)
-        if rem:
-            LOG.debug("Transferring remaining %s bytes" % rem)
-            data = src.read(rem)
-            if data == '':
-                if CONF.restore_discard_excess_bytes:
-                    self._discard_bytes(dest, dest.tell(), rem)
-            else:
-                dest.write(data)
-                dest.flush()
-                # yield to any other pending backups
-                eventlet.sleep(0)
+        if skipped_bytes:
+            LOG.info(_("Skipped writing %(bytes)d bytes of zeroes to "
+                       "'%(dest)s'") % {'bytes': skipped_bytes,
+                                        'dest': dest_name})
+        return skipped_bytes
 
     def _create_base_image(self, name, size, rados_client):
         """Create a base backup image.
@@ -683,16 +721,12 @@ class CephBackupDriver(BackupDriver):
                           {'snapshot': new_snap, 'volume': volume_id})
                 source_rbd_image.remove_snap(new_snap)
 
-    def _file_is_rbd(self, volume_file):
-        """Returns True if the volume_file is actually an RBD image."""
-        return hasattr(volume_file, 'rbd_image')
-
     def _full_backup(self, backup_id, volume_id, src_volume, src_name, length):
         """Perform a full backup of src volume.
 
         First creates a base backup image in our backup location then performs
         an chunked copy of all data from source volume to a new backup rbd
-        image.
+        image. Returns the number of bytes of zeroes not copied.
         """
         backup_name = self._get_backup_base_name(volume_id, backup_id)
 
@@ -718,8 +752,9 @@ class CephBackupDriver(BackupDriver):
                                                        self._ceph_backup_user,
                                                        self._ceph_backup_conf)
                 rbd_fd = rbd_driver.RBDImageIOWrapper(rbd_meta)
-                self._transfer_data(src_volume, src_name, rbd_fd, backup_name,
-                                    length)
+                return self._transfer_data(src_volume, src_name, rbd_fd,
+                                           backup_name, length,
+                                           dest_zeroed=True)
             finally:
                 dest_rbd.close()
 
@@ -870,12 +905,12 @@ class CephBackupDriver(BackupDriver):
         else:
             do_full_backup = True
 
+        backup_update = {'container': self._ceph_backup_pool}
         if do_full_backup:
-            self._full_backup(backup_id, volume_id, volume_file,
-                              volume_name, length)
+            backup_update['skipped_zero_bytes'] = self._full_backup(
+                backup_id, volume_id, volume_file, volume_name, length)
 
-        self.db.backup_update(self.context, backup_id,
-                              {'container': self._ceph_backup_pool})
+        self.db.backup_update(self.context, backup_id, backup_update)
 
         if backup_metadata:
             try:
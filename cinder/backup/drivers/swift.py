@@ -28,15 +28,41 @@
                                     failed Swift operations (default: 10).
 :backup_compression_algorithm: Compression algorithm to use for volume
                                backups. Supported options are:
-                               None (to disable), zlib and bz2 (default: zlib)
+                               None (to disable), zlib, bz2, lz4 and snappy
+                               (the last two need the python-lz4 and
+                               python-snappy modules), or the import path of
+                               a module providing compress() and decompress()
+                               (default: zlib)
+:backup_compression_min_ratio: Chunks whose sample does not compress by at
+                               least this ratio are stored uncompressed
+                               (default: 0, always compress).
+:backup_swift_object_checksum: Checksum of the Swift objects verified
+                               against the ETag returned by Swift, md5 or
+                               none (default: md5).
+:backup_swift_upload_concurrency: The number of Swift objects of a backup
+                                  compressed and uploaded concurrently
+                                  (default: 1, upload serially).
+:backup_swift_read_ahead: The number of Swift objects read from the volume
+                          ahead of the uploads in progress (default: 2).
+:backup_swift_restore_prefetch: The number of Swift objects of a backup
+                                downloaded concurrently during a restore
+                                (default: 1).
+:backup_swift_restore_fsync_interval: The number of restored Swift objects
+                                      written between two fsync() calls
+                                      (default: 1).
 """
 
+import contextlib
 import hashlib
+import itertools
 import json
 import os
 import socket
 
 import eventlet
+from eventlet import greenpool
+from eventlet import semaphore
+from eventlet import tpool
 from oslo.config import cfg
 import six
 from swiftclient import client as swift
@@ -45,9 +71,11 @@ from cinder.backup.driver import BackupDriver
 from cinder import exception
 from cinder.i18n import _
 from cinder.openstack.common import excutils
+from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import timeutils
 from cinder.openstack.common import units
+from cinder import utils
 
 
 LOG = logging.getLogger(__name__)
@@ -93,18 +121,59 @@ swiftbackup_service_opts = [
                help='The backoff time in seconds between Swift retries'),
     cfg.StrOpt('backup_compression_algorithm',
                default='zlib',
-               help='Compression algorithm (None to disable)'),
+               help='Compression algorithm (None to disable). One of zlib, '
+                    'bz2, lz4, snappy or the import path of a module '
+                    'providing compress() and decompress()'),
+    cfg.FloatOpt('backup_compression_min_ratio',
+                 default=0.0,
+                 help='Chunks of a backup are compressed only when a sample '
+                      'taken from them compresses by at least this ratio, '
+                      'others are stored as they are. 0 always compresses'),
+    cfg.StrOpt('backup_swift_object_checksum',
+               default='md5',
+               help='Checksum computed for every Swift object of a backup '
+                    'and verified against the ETag returned by Swift. '
+                    'Either md5 or none'),
+    cfg.IntOpt('backup_swift_upload_concurrency',
+               default=1,
+               help='The number of Swift objects of a backup compressed and '
+                    'uploaded concurrently. Values above 1 pipeline reading, '
+                    'compression and uploads'),
+    cfg.IntOpt('backup_swift_read_ahead',
+               default=2,
+               help='The number of Swift objects read from the volume ahead '
+                    'of the uploads in progress when uploads are '
+                    'concurrent. Each one holds backup_swift_object_size '
+                    'bytes in memory'),
+    cfg.IntOpt('backup_swift_restore_prefetch',
+               default=1,
+               help='The number of Swift objects of a backup downloaded '
+                    'concurrently during a restore'),
+    cfg.IntOpt('backup_swift_restore_fsync_interval',
+               default=1,
+               help='The number of restored Swift objects written between '
+                    'two fsync() calls on the volume. The volume is always '
+                    'synced when the restore completes'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(swiftbackup_service_opts)
 
+# Bytes compressed to estimate the compression ratio of a chunk
+_COMPRESSION_SAMPLE_SIZE = 64 * units.Ki
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
 
 class SwiftBackupDriver(BackupDriver):
     """Provides backup, restore and delete of backup objects within Swift."""
 
-    DRIVER_VERSION = '1.0.0'
-    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1'}
+    DRIVER_VERSION = '1.2.0'
+    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1',
+                              '1.1.0': '_restore_v1',
+                              '1.2.0': '_restore_v1'}
 
     def _get_compressor(self, algorithm):
         try:
@@ -116,6 +185,15 @@ class SwiftBackupDriver(BackupDriver):
             elif algorithm.lower() in ('bz2', 'bzip2'):
                 import bz2 as compressor
                 return compressor
+            elif algorithm.lower() == 'lz4':
+                import lz4 as compressor
+                return compressor
+            elif algorithm.lower() == 'snappy':
+                import snappy as compressor
+                return compressor
+            elif '.' in algorithm:
+                # Any module with compress() and decompress() functions
+                return importutils.import_module(algorithm)
         except ImportError:
             pass
 
@@ -151,17 +229,35 @@ class SwiftBackupDriver(BackupDriver):
         self.data_block_size_bytes = CONF.backup_swift_object_size
         self.swift_attempts = CONF.backup_swift_retry_attempts
         self.swift_backoff = CONF.backup_swift_retry_backoff
+        self.upload_concurrency = max(CONF.backup_swift_upload_concurrency, 1)
+        self.read_ahead = max(CONF.backup_swift_read_ahead, 0)
+        self.restore_prefetch = max(CONF.backup_swift_restore_prefetch, 1)
+        self.restore_fsync_interval = max(
+            CONF.backup_swift_restore_fsync_interval, 1)
         self.compressor = \
             self._get_compressor(CONF.backup_compression_algorithm)
+        self.compression_min_ratio = CONF.backup_compression_min_ratio
+        if CONF.backup_swift_object_checksum.lower() not in ('md5', 'none'):
+            err = (_('unsupported object checksum: %s') %
+                   CONF.backup_swift_object_checksum)
+            raise exception.BackupDriverException(err)
+        self.object_md5 = CONF.backup_swift_object_checksum.lower() == 'md5'
         LOG.debug('Connect to %s in "%s" mode' % (CONF.backup_swift_url,
                                                   CONF.backup_swift_auth))
+        if (CONF.backup_swift_auth == 'single_user' and
+                CONF.backup_swift_user is None):
+            LOG.error(_("single_user auth mode enabled, "
+                        "but %(param)s not set")
+                      % {'param': 'backup_swift_user'})
+            raise exception.ParameterNotFound(param='backup_swift_user')
+        self.conn = self._create_connection()
+        # Connections lent to concurrent uploads and downloads, the main
+        # connection is only used while none of them runs.
+        self._idle_connections = [self.conn]
+
+    def _create_connection(self):
         if CONF.backup_swift_auth == 'single_user':
-            if CONF.backup_swift_user is None:
-                LOG.error(_("single_user auth mode enabled, "
-                            "but %(param)s not set")
-                          % {'param': 'backup_swift_user'})
-                raise exception.ParameterNotFound(param='backup_swift_user')
-            self.conn = swift.Connection(
+            return swift.Connection(
                 authurl=CONF.backup_swift_url,
                 auth_version=CONF.backup_swift_auth_version,
                 tenant_name=CONF.backup_swift_tenant,
@@ -169,11 +265,27 @@ class SwiftBackupDriver(BackupDriver):
                 key=CONF.backup_swift_key,
                 retries=self.swift_attempts,
                 starting_backoff=self.swift_backoff)
-        else:
-            self.conn = swift.Connection(retries=self.swift_attempts,
-                                         preauthurl=self.swift_url,
-                                         preauthtoken=self.context.auth_token,
-                                         starting_backoff=self.swift_backoff)
+        return swift.Connection(retries=self.swift_attempts,
+                                preauthurl=self.swift_url,
+                                preauthtoken=self.context.auth_token,
+                                starting_backoff=self.swift_backoff)
+
+    @contextlib.contextmanager
+    def _connection(self):
+        """Lend a Swift connection to the calling greenthread.
+
+        A swiftclient Connection keeps the state of its retries and its
+        HTTP connection, so concurrent requests each need their own.
+        Connections are created on demand and kept for the next request.
+        """
+        try:
+            conn = self._idle_connections.pop()
+        except IndexError:
+            conn = self._create_connection()
+        try:
+            yield conn
+        finally:
+            self._idle_connections.append(conn)
 
     def _create_container(self, context, backup):
         backup_id = backup['id']
@@ -215,7 +327,8 @@ class SwiftBackupDriver(BackupDriver):
         return filename
 
     def _write_metadata(self, backup, volume_id, container, object_list,
-                        volume_meta):
+                        volume_meta, sha256s=None, parent_id=None,
+                        holes=None):
         filename = self._metadata_filename(backup)
         LOG.debug('_write_metadata started, container name: %(container)s,'
                   ' metadata filename: %(filename)s' %
@@ -229,6 +342,10 @@ class SwiftBackupDriver(BackupDriver):
         metadata['created_at'] = str(backup['created_at'])
         metadata['objects'] = object_list
         metadata['volume_meta'] = volume_meta
+        metadata['chunk_size'] = self.data_block_size_bytes
+        metadata['sha256s'] = sha256s or []
+        metadata['parent_id'] = parent_id
+        metadata['holes'] = holes or []
         metadata_json = json.dumps(metadata, sort_keys=True, indent=2)
         reader = six.StringIO(metadata_json)
         etag = self.conn.put_object(container, filename, reader,
@@ -285,25 +402,99 @@ class SwiftBackupDriver(BackupDriver):
                       'availability_zone': availability_zone,
                   })
         object_meta = {'id': 1, 'list': [], 'prefix': object_prefix,
-                       'volume_meta': None}
+                       'volume_meta': None, 'sha256s': [],
+                       'parent_id': None, 'parent_sha256s': [], 'holes': []}
+
+        parent_id = backup.get('parent_id')
+        if parent_id:
+            parent_sha256s = self._get_parent_sha256s(parent_id)
+            if parent_sha256s:
+                object_meta['parent_id'] = parent_id
+                object_meta['parent_sha256s'] = parent_sha256s
         return object_meta, container
 
-    def _backup_chunk(self, backup, container, data, data_offset, object_meta):
-        """Backup data chunk based on the object metadata and offset."""
-        object_prefix = object_meta['prefix']
-        object_list = object_meta['list']
-        object_id = object_meta['id']
-        object_name = '%s-%05d' % (object_prefix, object_id)
+    def _get_parent_sha256s(self, parent_id):
+        """Return the chunk digests of a parent backup, or None.
+
+        Digests are only usable when the parent was cut into chunks of the
+        size used now, otherwise the backup is done as a full one.
+        """
+        parent = self.db.backup_get(self.context, parent_id)
+        try:
+            metadata = self._read_metadata(parent)
+        except socket.error as err:
+            raise exception.SwiftConnectionFailed(reason=err)
+        if (not metadata.get('sha256s') or
+                metadata.get('chunk_size') != self.data_block_size_bytes):
+            LOG.info(_('Parent backup %s has no usable chunk digests, '
+                       'backing up all chunks'), parent_id)
+            return None
+        return metadata['sha256s']
+
+    def _chunk_changed(self, object_meta, data):
+        """Record the SHA-256 of a chunk and return whether to upload it.
+
+        A chunk is unchanged when the parent backup has a chunk with the
+        same digest at the same position in the volume. The digest is
+        computed in a native thread.
+        """
+        sha256 = tpool.execute(_sha256, data)
+        index = len(object_meta['sha256s'])
+        object_meta['sha256s'].append(sha256)
+        parent_sha256s = object_meta['parent_sha256s']
+        return index >= len(parent_sha256s) or parent_sha256s[index] != sha256
+
+    def _record_hole(self, object_meta, data, data_offset):
+        """Record a chunk of zeroes as a hole and return True.
+
+        Holes are listed in the backup metadata instead of being stored as
+        objects, returns False for chunks holding any data.
+        """
+        if not utils.is_zero_data(data):
+            return False
+        object_meta['holes'].append({'offset': data_offset,
+                                     'length': len(data)})
+        return True
+
+    def _worth_compressing(self, data):
+        """Estimate from a sample whether compressing data pays off."""
+        if not self.compression_min_ratio:
+            return True
+        start = max(len(data) - _COMPRESSION_SAMPLE_SIZE, 0) / 2
+        sample = data[start:start + _COMPRESSION_SAMPLE_SIZE]
+        compressed = self.compressor.compress(sample)
+        return (len(sample) >=
+                self.compression_min_ratio * max(len(compressed), 1))
+
+    def _compress_chunk(self, data):
+        """Compress a chunk of data.
+
+        Returns the data, the compression algorithm used on it and its MD5,
+        which is None when object checksums are disabled.
+        """
+        algorithm = 'none'
+        if self.compressor is not None and self._worth_compressing(data):
+            data = self.compressor.compress(data)
+            # Stored as configured, an import path is case sensitive
+            algorithm = CONF.backup_compression_algorithm
+        md5 = hashlib.md5(data).hexdigest() if self.object_md5 else None
+        return data, algorithm, md5
+
+    def _write_chunk(self, container, object_name, data, data_offset):
+        """Compress and upload one chunk and return its metadata entry.
+
+        Compression and checksumming run in a native thread so they do not
+        hold up the other greenthreads, e.g. the service heartbeat.
+        """
         obj = {}
         obj[object_name] = {}
         obj[object_name]['offset'] = data_offset
         obj[object_name]['length'] = len(data)
         LOG.debug('reading chunk of data from volume')
-        if self.compressor is not None:
-            algorithm = CONF.backup_compression_algorithm.lower()
-            obj[object_name]['compression'] = algorithm
-            data_size_bytes = len(data)
-            data = self.compressor.compress(data)
+        data_size_bytes = len(data)
+        data, algorithm, md5 = tpool.execute(self._compress_chunk, data)
+        obj[object_name]['compression'] = algorithm
+        if algorithm != 'none':
             comp_size_bytes = len(data)
             LOG.debug('compressed %(data_size_bytes)d bytes of data '
                       'to %(comp_size_bytes)d bytes using '
@@ -315,18 +506,19 @@ class SwiftBackupDriver(BackupDriver):
                       })
         else:
             LOG.debug('not compressing data')
-            obj[object_name]['compression'] = 'none'
 
         reader = six.StringIO(data)
         LOG.debug('About to put_object')
         try:
-            etag = self.conn.put_object(container, object_name, reader,
-                                        content_length=len(data))
+            with self._connection() as conn:
+                etag = conn.put_object(container, object_name, reader,
+                                       content_length=len(data))
         except socket.error as err:
             raise exception.SwiftConnectionFailed(reason=err)
         LOG.debug('swift MD5 for %(object_name)s: %(etag)s' %
                   {'object_name': object_name, 'etag': etag, })
-        md5 = hashlib.md5(data).hexdigest()
+        if md5 is None:
+            return obj
         obj[object_name]['md5'] = md5
         LOG.debug('backup MD5 for %(object_name)s: %(md5)s' %
                   {'object_name': object_name, 'md5': md5})
@@ -335,6 +527,24 @@ class SwiftBackupDriver(BackupDriver):
                     'swift %(etag)s is not the same as MD5 of object sent '
                     'to swift %(md5)s') % {'etag': etag, 'md5': md5}
             raise exception.InvalidBackup(reason=err)
+        return obj
+
+    def _backup_chunk(self, backup, container, data, data_offset, object_meta):
+        """Backup data chunk based on the object metadata and offset."""
+        if not self._chunk_changed(object_meta, data):
+            LOG.debug('chunk at offset %d unchanged since the parent backup',
+                      data_offset)
+            eventlet.sleep(0)
+            return
+        if self._record_hole(object_meta, data, data_offset):
+            LOG.debug('chunk at offset %d only holds zeroes', data_offset)
+            eventlet.sleep(0)
+            return
+        object_prefix = object_meta['prefix']
+        object_list = object_meta['list']
+        object_id = object_meta['id']
+        object_name = '%s-%05d' % (object_prefix, object_id)
+        obj = self._write_chunk(container, object_name, data, data_offset)
         object_list.append(obj)
         object_id += 1
         object_meta['list'] = object_list
@@ -342,6 +552,53 @@ class SwiftBackupDriver(BackupDriver):
         LOG.debug('Calling eventlet.sleep(0)')
         eventlet.sleep(0)
 
+    def _backup_chunks_pipelined(self, backup, container, volume_file,
+                                 object_meta):
+        """Backup all chunks of volume_file with concurrent uploads.
+
+        Chunks are read while up to upload_concurrency earlier chunks are
+        compressed and uploaded, and at most read_ahead chunks wait for an
+        upload slot. Object metadata is assembled in volume order whatever
+        order the uploads complete in. Chunks unchanged since the parent
+        backup and chunks of zeroes are not uploaded.
+        """
+        object_prefix = object_meta['prefix']
+        object_id = object_meta['id']
+        pool = greenpool.GreenPool(self.upload_concurrency)
+        slots = semaphore.Semaphore(self.upload_concurrency + self.read_ahead)
+        written = {}
+        errors = []
+
+        def _upload(object_id, data, data_offset):
+            object_name = '%s-%05d' % (object_prefix, object_id)
+            try:
+                written[object_id] = self._write_chunk(
+                    container, object_name, data, data_offset)
+            except Exception as err:
+                errors.append(err)
+            finally:
+                slots.release()
+
+        while not errors:
+            slots.acquire()
+            data_offset = volume_file.tell()
+            data = volume_file.read(self.data_block_size_bytes)
+            if data == '':
+                slots.release()
+                break
+            if (not self._chunk_changed(object_meta, data) or
+                    self._record_hole(object_meta, data, data_offset)):
+                slots.release()
+                continue
+            pool.spawn_n(_upload, object_id, data, data_offset)
+            object_id += 1
+        pool.waitall()
+
+        if errors:
+            raise errors[0]
+        object_meta['list'].extend(written[key] for key in sorted(written))
+        object_meta['id'] = object_id
+
     def _finalize_backup(self, backup, container, object_meta):
         """Finalize the backup by updating its metadata on Swift."""
         object_list = object_meta['list']
@@ -352,11 +609,21 @@ class SwiftBackupDriver(BackupDriver):
                                  backup['volume_id'],
                                  container,
                                  object_list,
-                                 volume_meta)
+                                 volume_meta,
+                                 sha256s=object_meta['sha256s'],
+                                 parent_id=object_meta['parent_id'],
+                                 holes=object_meta['holes'])
         except socket.error as err:
             raise exception.SwiftConnectionFailed(reason=err)
+        skipped_bytes = sum(hole['length'] for hole in object_meta['holes'])
         self.db.backup_update(self.context, backup['id'],
-                              {'object_count': object_id})
+                              {'object_count': object_id,
+                               'skipped_zero_bytes': skipped_bytes})
+        if skipped_bytes:
+            LOG.info(_('Backup %(backup_id)s skipped %(skipped_bytes)d bytes '
+                       'of zeroes'),
+                     {'backup_id': backup['id'],
+                      'skipped_bytes': skipped_bytes})
         LOG.debug('backup %s finished.' % backup['id'])
 
     def _backup_metadata(self, backup, object_meta):
@@ -378,13 +645,17 @@ class SwiftBackupDriver(BackupDriver):
         """Backup the given volume to Swift."""
 
         object_meta, container = self._prepare_backup(backup)
-        while True:
-            data = volume_file.read(self.data_block_size_bytes)
-            data_offset = volume_file.tell()
-            if data == '':
-                break
-            self._backup_chunk(backup, container, data,
-                               data_offset, object_meta)
+        if self.upload_concurrency > 1:
+            self._backup_chunks_pipelined(backup, container, volume_file,
+                                          object_meta)
+        else:
+            while True:
+                data_offset = volume_file.tell()
+                data = volume_file.read(self.data_block_size_bytes)
+                if data == '':
+                    break
+                self._backup_chunk(backup, container, data,
+                                   data_offset, object_meta)
 
         if backup_metadata:
             try:
@@ -398,11 +669,26 @@ class SwiftBackupDriver(BackupDriver):
 
         self._finalize_backup(backup, container, object_meta)
 
-    def _restore_v1(self, backup, volume_id, metadata, volume_file):
-        """Restore a v1 swift volume backup from swift."""
-        backup_id = backup['id']
-        LOG.debug('v1 swift volume backup restore of %s started', backup_id)
-        container = backup['container']
+    def _fsync(self, volume_file):
+        # Be tolerant to IO implementations that do not support fileno()
+        try:
+            fileno = volume_file.fileno()
+        except IOError:
+            LOG.info("volume_file does not support fileno() so skipping "
+                     "fsync()")
+        else:
+            os.fsync(fileno)
+
+    def _write_hole(self, volume_file, length):
+        """Zero length bytes of volume_file from its current offset."""
+        if self._file_is_rbd(volume_file):
+            # Discarded RBD extents read back as zeroes.
+            volume_file.rbd_image.discard(volume_file.tell(), length)
+            volume_file.seek(length, os.SEEK_CUR)
+        else:
+            volume_file.write('\0' * length)
+
+    def _verify_object_list(self, backup, metadata):
         metadata_objects = metadata['objects']
         metadata_object_names = sum((obj.keys() for obj in metadata_objects),
                                     [])
@@ -416,7 +702,52 @@ class SwiftBackupDriver(BackupDriver):
                     'swift does not match object list stored in metadata')
             raise exception.InvalidBackup(reason=err)
 
-        for metadata_object in metadata_objects:
+    def _get_backup_chain(self, backup, metadata):
+        """Return (backup, metadata) pairs from backup back to its base."""
+        chain = [(backup, metadata)]
+        while metadata.get('parent_id'):
+            backup = self.db.backup_get(self.context, metadata['parent_id'])
+            try:
+                metadata = self._read_metadata(backup)
+            except socket.error as err:
+                raise exception.SwiftConnectionFailed(reason=err)
+            chain.append((backup, metadata))
+        return chain
+
+    def _restore_v1(self, backup, volume_id, metadata, volume_file):
+        """Restore a v1 swift volume backup from swift.
+
+        An incremental backup only holds the chunks that changed since its
+        parent, the other chunks are read from the backups it is based on.
+        Chunks of zeroes are restored as holes.
+        """
+        backup_id = backup['id']
+        LOG.debug('v1 swift volume backup restore of %s started', backup_id)
+        chain = self._get_backup_chain(backup, metadata)
+        for chain_backup, chain_metadata in chain:
+            self._verify_object_list(chain_backup, chain_metadata)
+
+        if len(chain) == 1 and not metadata.get('holes'):
+            sources = [(backup['container'], metadata_object)
+                       for metadata_object in metadata['objects']]
+        else:
+            # Walk the chain from its base so that the most recent copy of
+            # each chunk wins. Holes have no container.
+            chunks = {}
+            for chain_backup, chain_metadata in reversed(chain):
+                for metadata_object in chain_metadata['objects']:
+                    object_name = metadata_object.keys()[0]
+                    data_offset = metadata_object[object_name]['offset']
+                    chunks[data_offset] = (chain_backup['container'],
+                                           metadata_object)
+                for hole in chain_metadata.get('holes', []):
+                    chunks[hole['offset']] = (None, hole)
+            sources = [chunks[key] for key in sorted(chunks)]
+
+        def _fetch(source):
+            container, metadata_object = source
+            if container is None:
+                return None
             object_name = metadata_object.keys()[0]
             LOG.debug('restoring object from swift. backup: %(backup_id)s, '
                       'container: %(container)s, swift object name: '
@@ -428,35 +759,43 @@ class SwiftBackupDriver(BackupDriver):
                           'volume_id': volume_id,
                       })
             try:
-                (resp, body) = self.conn.get_object(container, object_name)
+                with self._connection() as conn:
+                    (resp, body) = conn.get_object(container, object_name)
             except socket.error as err:
                 raise exception.SwiftConnectionFailed(reason=err)
             compression_algorithm = metadata_object[object_name]['compression']
             decompressor = self._get_compressor(compression_algorithm)
-            if decompressor is not None:
-                LOG.debug('decompressing data using %s algorithm' %
-                          compression_algorithm)
-                decompressed = decompressor.decompress(body)
-                volume_file.write(decompressed)
+            if decompressor is None:
+                return body
+            LOG.debug('decompressing data using %s algorithm' %
+                      compression_algorithm)
+            return tpool.execute(decompressor.decompress, body)
+
+        # Objects are downloaded and decompressed up to restore_prefetch at a
+        # time, imap hands them back in volume order.
+        pool = greenpool.GreenPool(self.restore_prefetch)
+        unsynced = 0
+        for source, data in itertools.izip(sources,
+                                           pool.imap(_fetch, sources)):
+            if data is None:
+                self._write_hole(volume_file, source[1]['length'])
             else:
-                volume_file.write(body)
+                volume_file.write(data)
 
             # force flush every write to avoid long blocking write on close
             volume_file.flush()
 
-            # Be tolerant to IO implementations that do not support fileno()
-            try:
-                fileno = volume_file.fileno()
-            except IOError:
-                LOG.info("volume_file does not support fileno() so skipping "
-                         "fsync()")
-            else:
-                os.fsync(fileno)
+            unsynced += 1
+            if unsynced >= self.restore_fsync_interval:
+                self._fsync(volume_file)
+                unsynced = 0
 
             # Restoring a backup to a volume can take some time. Yield so other
             # threads can run, allowing for among other things the service
             # status to be updated
             eventlet.sleep(0)
+        if unsynced:
+            self._fsync(volume_file)
         LOG.debug('v1 swift volume backup restore of %s finished',
                   backup_id)
 
@@ -30,9 +30,16 @@ Volume backups can be created, restored, deleted and listed.
 :backup_manager:  The module name of a class derived from
                           :class:`manager.Manager` (default:
                           :class:`cinder.backup.manager.Manager`).
+:backup_max_concurrent_operations: The maximum number of backups and
+                                   restores run at once for each volume
+                                   backend (default: 0, no limit).
 
 """
 
+import collections
+import contextlib
+
+from eventlet import semaphore
 from oslo.config import cfg
 from oslo import messaging
 
@@ -45,6 +52,7 @@ from cinder import manager
 from cinder.openstack.common import excutils
 from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
+from cinder.openstack.common import periodic_task
 from cinder import quota
 from cinder import rpc
 from cinder import utils
@@ -57,6 +65,11 @@ backup_manager_opts = [
                default='cinder.backup.drivers.swift',
                help='Driver to use for backups.',
                deprecated_name='backup_service'),
+    cfg.IntOpt('backup_max_concurrent_operations',
+               default=0,
+               help='The maximum number of backups and restores run at once '
+                    'for each volume backend, further requests wait for one '
+                    'to finish. 0 means no limit'),
 ]
 
 # This map doesn't need to be extended in the future since it's only
@@ -82,6 +95,13 @@ class BackupManager(manager.SchedulerDependentManager):
         self.volume_managers = {}
         self._setup_volume_drivers()
         self.backup_rpcapi = backup_rpcapi.BackupAPI()
+        # Worker slots, waiting and running operations per volume backend
+        self._backend_slots = {}
+        self._queued_operations = collections.defaultdict(int)
+        self._in_flight_operations = collections.defaultdict(int)
+        self.operation_stats = {'queued_operations': 0,
+                                'in_flight_operations': 0,
+                                'backends': {}}
         super(BackupManager, self).__init__(service_name='backup',
                                             *args, **kwargs)
 
@@ -183,6 +203,60 @@ class BackupManager(manager.SchedulerDependentManager):
 
         driver.set_initialized()
 
+    def _report_operations(self):
+        """Update queue depth and in-flight operations per backend."""
+        backends = {}
+        for backend in set(self._queued_operations.keys() +
+                           self._in_flight_operations.keys()):
+            backends[backend or 'default'] = {
+                'queued_operations': self._queued_operations[backend],
+                'in_flight_operations': self._in_flight_operations[backend],
+            }
+        self.operation_stats = {
+            'queued_operations': sum(self._queued_operations.values()),
+            'in_flight_operations': sum(
+                self._in_flight_operations.values()),
+            'backends': backends,
+        }
+
+    @periodic_task.periodic_task
+    def _notify_operation_stats(self, context):
+        """Send the operation stats in a backup.operations notification.
+
+        The schedulers only keep the capabilities of volume services, so
+        the stats are not sent to them.
+        """
+        rpc.get_notifier('backup', self.host).info(context,
+                                                   'backup.operations',
+                                                   self.operation_stats)
+
+    @contextlib.contextmanager
+    def _operation_slot(self, backend):
+        """Wait for a free worker slot of backend and hold it."""
+        if backend not in self._backend_slots:
+            limit = CONF.backup_max_concurrent_operations
+            self._backend_slots[backend] = (semaphore.Semaphore(limit)
+                                            if limit > 0 else None)
+        slots = self._backend_slots[backend]
+
+        self._queued_operations[backend] += 1
+        self._report_operations()
+        try:
+            if slots is not None:
+                slots.acquire()
+        finally:
+            self._queued_operations[backend] -= 1
+
+        self._in_flight_operations[backend] += 1
+        self._report_operations()
+        try:
+            yield
+        finally:
+            self._in_flight_operations[backend] -= 1
+            if slots is not None:
+                slots.release()
+            self._report_operations()
+
     def init_host(self):
         """Do any initialization that needs to be run if this is a
            standalone service.
@@ -193,7 +267,8 @@ class BackupManager(manager.SchedulerDependentManager):
             self._init_volume_driver(ctxt, mgr.driver)
 
         LOG.info(_("Cleaning up incomplete backup operations."))
-        volumes = self.db.volume_get_all_by_host(ctxt, self.host)
+        volumes = self.db.volume_get_all_by_host(ctxt, self.host,
+                                                 load_strategy='noload')
         for volume in volumes:
             volume_host = volume_utils.extract_host(volume['host'], 'backend')
             backend = self._get_volume_backend(host=volume_host)
@@ -277,8 +352,9 @@ class BackupManager(manager.SchedulerDependentManager):
             utils.require_driver_initialized(self.driver)
 
             backup_service = self.service.get_backup_driver(context)
-            self._get_driver(backend).backup_volume(context, backup,
-                                                    backup_service)
+            with self._operation_slot(backend):
+                self._get_driver(backend).backup_volume(context, backup,
+                                                        backup_service)
         except Exception as err:
             with excutils.save_and_reraise_exception():
                 self.db.volume_update(context, volume_id,
@@ -360,9 +436,10 @@ class BackupManager(manager.SchedulerDependentManager):
             utils.require_driver_initialized(self.driver)
 
             backup_service = self.service.get_backup_driver(context)
-            self._get_driver(backend).restore_backup(context, backup,
-                                                     volume,
-                                                     backup_service)
+            with self._operation_slot(backend):
+                self._get_driver(backend).restore_backup(context, backup,
+                                                         volume,
+                                                         backup_service)
         except Exception:
             with excutils.save_and_reraise_exception():
                 self.db.volume_update(context, volume_id,
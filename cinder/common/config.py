@@ -203,6 +203,14 @@ global_opts = [
                help='The full class name of the volume replication API class'),
     cfg.StrOpt('consistencygroup_api_class',
                default='cinder.consistencygroup.api.API',
-               help='The full class name of the consistencygroup API class'), ]
+               help='The full class name of the consistencygroup API class'),
+    cfg.StrOpt('cinder_internal_tenant_project_id',
+               default=None,
+               help='ID of the project owning the volumes Cinder creates '
+                    'for its internal use, such as the image-volume cache'),
+    cfg.StrOpt('cinder_internal_tenant_user_id',
+               default=None,
+               help='ID of the user owning the volumes Cinder creates for '
+                    'its internal use'), ]
 
 CONF.register_opts(global_opts)
@@ -53,7 +53,8 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
     :param limit: maximum number of items to return
     :param sort_keys: array of attributes by which results should be sorted
     :param marker: the last item of the previous page; we returns the next
-                    results after this value.
+                    results after this value. May also be a dict mapping
+                    each of sort_keys to the value of that item.
     :param sort_dir: direction in which results should be sorted (asc, desc)
     :param sort_dirs: per-column array of sort_dirs, corresponding to sort_keys
 
@@ -95,7 +96,10 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
     if marker is not None:
         marker_values = []
         for sort_key in sort_keys:
-            v = getattr(marker, sort_key)
+            if isinstance(marker, dict):
+                v = marker[sort_key]
+            else:
+                v = getattr(marker, sort_key)
             marker_values.append(v)
 
         # Build up an array of sort criteria as in the docstring
@@ -20,6 +20,8 @@
 import copy
 import uuid
 
+from oslo.config import cfg
+
 from cinder.i18n import _
 from cinder.openstack.common import local
 from cinder.openstack.common import log as logging
@@ -27,6 +29,10 @@ from cinder.openstack.common import timeutils
 from cinder import policy
 
 
+CONF = cfg.CONF
+CONF.import_opt('cinder_internal_tenant_project_id', 'cinder.common.config')
+CONF.import_opt('cinder_internal_tenant_user_id', 'cinder.common.config')
+
 LOG = logging.getLogger(__name__)
 
 
@@ -182,3 +188,21 @@ def get_admin_context(read_deleted="no"):
                           is_admin=True,
                           read_deleted=read_deleted,
                           overwrite=False)
+
+
+def get_internal_tenant_context():
+    """Return a context of the Cinder internal tenant.
+
+    Returns None if the internal tenant is not configured.
+    """
+    project_id = CONF.cinder_internal_tenant_project_id
+    user_id = CONF.cinder_internal_tenant_user_id
+    if not project_id or not user_id:
+        LOG.warn(_('Unable to get the internal tenant context, '
+                   'cinder_internal_tenant_project_id and '
+                   'cinder_internal_tenant_user_id must be set.'))
+        return None
+    return RequestContext(user_id=user_id,
+                          project_id=project_id,
+                          is_admin=True,
+                          overwrite=False)
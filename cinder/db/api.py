@@ -185,6 +185,11 @@ def volume_data_get_for_host(context, host, count_only=False):
                                          count_only)
 
 
+def volume_count_get_all_by_host(context):
+    """Get a dict of {host: volume_count} for all hosts with volumes."""
+    return IMPL.volume_count_get_all_by_host(context)
+
+
 def volume_data_get_for_project(context, project_id):
     """Get (volume_count, gigabytes) for project."""
     return IMPL.volume_data_get_for_project(context, project_id)
@@ -211,15 +216,17 @@ def volume_get(context, volume_id):
 
 
 def volume_get_all(context, marker, limit, sort_key, sort_dir,
-                   filters=None):
+                   filters=None, load_strategy='subquery', offset=None):
     """Get all volumes."""
     return IMPL.volume_get_all(context, marker, limit, sort_key, sort_dir,
-                               filters=filters)
+                               filters=filters, load_strategy=load_strategy,
+                               offset=offset)
 
 
-def volume_get_all_by_host(context, host):
+def volume_get_all_by_host(context, host, load_strategy='subquery'):
     """Get all volumes belonging to a host."""
-    return IMPL.volume_get_all_by_host(context, host)
+    return IMPL.volume_get_all_by_host(context, host,
+                                       load_strategy=load_strategy)
 
 
 def volume_get_all_by_group(context, group_id):
@@ -228,10 +235,13 @@ def volume_get_all_by_group(context, group_id):
 
 
 def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
-                              sort_dir, filters=None):
+                              sort_dir, filters=None,
+                              load_strategy='subquery', offset=None):
     """Get all volumes belonging to a project."""
     return IMPL.volume_get_all_by_project(context, project_id, marker, limit,
-                                          sort_key, sort_dir, filters=filters)
+                                          sort_key, sort_dir, filters=filters,
+                                          load_strategy=load_strategy,
+                                          offset=offset)
 
 
 def volume_get_iscsi_target_num(context, volume_id):
@@ -266,14 +276,22 @@ def snapshot_get(context, snapshot_id):
     return IMPL.snapshot_get(context, snapshot_id)
 
 
-def snapshot_get_all(context):
+def snapshot_get_all(context, filters=None, marker=None, limit=None,
+                     sort_key='created_at', sort_dir='desc'):
     """Get all snapshots."""
-    return IMPL.snapshot_get_all(context)
+    return IMPL.snapshot_get_all(context, filters=filters, marker=marker,
+                                 limit=limit, sort_key=sort_key,
+                                 sort_dir=sort_dir)
 
 
-def snapshot_get_all_by_project(context, project_id):
+def snapshot_get_all_by_project(context, project_id, filters=None,
+                                marker=None, limit=None,
+                                sort_key='created_at', sort_dir='desc'):
     """Get all snapshots belonging to a project."""
-    return IMPL.snapshot_get_all_by_project(context, project_id)
+    return IMPL.snapshot_get_all_by_project(context, project_id,
+                                            filters=filters, marker=marker,
+                                            limit=limit, sort_key=sort_key,
+                                            sort_dir=sort_dir)
 
 
 def snapshot_get_all_for_cgsnapshot(context, project_id):
@@ -567,6 +585,11 @@ def volume_glance_metadata_get_all(context):
     return IMPL.volume_glance_metadata_get_all(context)
 
 
+def volume_glance_metadata_list_get(context, volume_id_list):
+    """Return the glance metadata for a volume list."""
+    return IMPL.volume_glance_metadata_list_get(context, volume_id_list)
+
+
 def volume_glance_metadata_get(context, volume_id):
     """Return the glance metadata for a volume."""
     return IMPL.volume_glance_metadata_get(context, volume_id)
@@ -742,9 +765,11 @@ def backup_get(context, backup_id):
     return IMPL.backup_get(context, backup_id)
 
 
-def backup_get_all(context, filters=None):
-    """Get all backups."""
-    return IMPL.backup_get_all(context, filters=filters)
+def backup_get_all(context, filters=None, marker=None, limit=None,
+                   offset=None):
+    """Get all backups, oldest first."""
+    return IMPL.backup_get_all(context, filters=filters, marker=marker,
+                               limit=limit, offset=offset)
 
 
 def backup_get_all_by_host(context, host):
@@ -757,10 +782,12 @@ def backup_create(context, values):
     return IMPL.backup_create(context, values)
 
 
-def backup_get_all_by_project(context, project_id, filters=None):
-    """Get all backups belonging to a project."""
+def backup_get_all_by_project(context, project_id, filters=None,
+                              marker=None, limit=None, offset=None):
+    """Get all backups belonging to a project, oldest first."""
     return IMPL.backup_get_all_by_project(context, project_id,
-                                          filters=filters)
+                                          filters=filters, marker=marker,
+                                          limit=limit, offset=offset)
 
 
 def backup_update(context, backup_id, values):
@@ -784,14 +811,18 @@ def transfer_get(context, transfer_id):
     return IMPL.transfer_get(context, transfer_id)
 
 
-def transfer_get_all(context):
-    """Get all volume transfer records."""
-    return IMPL.transfer_get_all(context)
+def transfer_get_all(context, marker=None, limit=None, offset=None):
+    """Get all volume transfer records, oldest first."""
+    return IMPL.transfer_get_all(context, marker=marker, limit=limit,
+                                 offset=offset)
 
 
-def transfer_get_all_by_project(context, project_id):
+def transfer_get_all_by_project(context, project_id, marker=None, limit=None,
+                                offset=None):
     """Get all volume transfer records for specified project."""
-    return IMPL.transfer_get_all_by_project(context, project_id)
+    return IMPL.transfer_get_all_by_project(context, project_id,
+                                            marker=marker, limit=limit,
+                                            offset=offset)
 
 
 def transfer_create(context, values):
@@ -894,3 +925,40 @@ def cgsnapshot_update(context, cgsnapshot_id, values):
 def cgsnapshot_destroy(context, cgsnapshot_id):
     """Destroy the cgsnapshot or raise if it does not exist."""
     return IMPL.cgsnapshot_destroy(context, cgsnapshot_id)
+
+
+###################
+
+
+def image_volume_cache_create(context, host, image_id, image_checksum,
+                              volume_id, size):
+    """Record volume_id as holding a cached copy of image_id on host."""
+    return IMPL.image_volume_cache_create(context, host, image_id,
+                                          image_checksum, volume_id, size)
+
+
+def image_volume_cache_delete(context, volume_id):
+    """Delete the cache entry of the image volume volume_id."""
+    return IMPL.image_volume_cache_delete(context, volume_id)
+
+
+def image_volume_cache_get_and_update_last_used(context, image_id, host):
+    """Get the most recent cache entry of image_id on host and mark it used.
+
+    Returns None if the image is not cached on host.
+    """
+    return IMPL.image_volume_cache_get_and_update_last_used(context,
+                                                            image_id, host)
+
+
+def image_volume_cache_get_by_volume_id(context, volume_id):
+    """Get the cache entry of the image volume volume_id, or None."""
+    return IMPL.image_volume_cache_get_by_volume_id(context, volume_id)
+
+
+def image_volume_cache_get_all_for_host(context, host):
+    """Get the cache entries of all the pools of a backend host.
+
+    The entries are ordered from the most to the least recently used.
+    """
+    return IMPL.image_volume_cache_get_all_for_host(context, host)
@@ -33,7 +33,7 @@ from oslo.db.sqlalchemy import session as db_session
 import osprofiler.sqlalchemy
 import sqlalchemy
 from sqlalchemy import or_
-from sqlalchemy.orm import joinedload, joinedload_all
+from sqlalchemy.orm import joinedload, joinedload_all, noload, subqueryload
 from sqlalchemy.orm import RelationshipProperty
 from sqlalchemy.sql.expression import literal_column
 from sqlalchemy.sql import func
@@ -87,6 +87,12 @@ def get_session(**kwargs):
 
 _DEFAULT_QUOTA_NAME = 'default'
 
+# Maximum number of values passed in a single SQL IN clause
+_IN_QUERY_CHUNK_SIZE = 500
+
+# Order of the listings that have no sort key, oldest first
+_CREATION_SORT_KEYS = ['created_at', 'id']
+
 
 def get_backend():
     """The backend is this module itself."""
@@ -1078,6 +1084,19 @@ def volume_data_get_for_host(context, host, count_only=False):
         return (result[0] or 0, result[1] or 0)
 
 
+@require_admin_context
+def volume_count_get_all_by_host(context):
+    """Return a dict of {host: volume_count} from a single grouped query."""
+    rows = model_query(context,
+                       models.Volume.host,
+                       func.count(models.Volume.id),
+                       read_deleted="no").\
+        filter(models.Volume.host.isnot(None)).\
+        group_by(models.Volume.host).\
+        all()
+    return dict(rows)
+
+
 @require_admin_context
 def _volume_data_get_for_project(context, project_id, volume_type_id=None,
                                  session=None):
@@ -1193,21 +1212,43 @@ def volume_detached(context, volume_id):
         volume_ref['attach_time'] = None
 
 
+# Volume relationships that are collections, loading these with a JOIN
+# multiplies the number of rows returned by the number of entries in each.
+_VOLUME_COLLECTIONS = ['volume_metadata', 'volume_admin_metadata']
+_VOLUME_REFERENCES = ['volume_type', 'consistencygroup']
+
+
 @require_context
-def _volume_get_query(context, session=None, project_only=False):
-    if is_admin_context(context):
-        return model_query(context, models.Volume, session=session,
-                           project_only=project_only).\
-            options(joinedload('volume_metadata')).\
-            options(joinedload('volume_admin_metadata')).\
-            options(joinedload('volume_type')).\
-            options(joinedload('consistencygroup'))
+def _volume_get_query(context, session=None, project_only=False,
+                      load_strategy='joined'):
+    """Build the base volume query with its relationships loaded.
+
+    :param load_strategy: how related rows are loaded; 'joined' loads all
+                          of them in the same query, 'subquery' loads the
+                          metadata collections in one batched query each
+                          instead of multiplying the volume rows, and
+                          'noload' does not load relationships at all
+    """
+    relations = list(_VOLUME_COLLECTIONS) + _VOLUME_REFERENCES
+    if not is_admin_context(context):
+        relations.remove('volume_admin_metadata')
+
+    if load_strategy == 'joined':
+        loaders = dict((rel, joinedload) for rel in relations)
+    elif load_strategy == 'subquery':
+        loaders = dict((rel, subqueryload if rel in _VOLUME_COLLECTIONS
+                        else joinedload) for rel in relations)
+    elif load_strategy == 'noload':
+        loaders = dict((rel, noload) for rel in relations)
     else:
-        return model_query(context, models.Volume, session=session,
-                           project_only=project_only).\
-            options(joinedload('volume_metadata')).\
-            options(joinedload('volume_type')).\
-            options(joinedload('consistencygroup'))
+        msg = _("Invalid volume load strategy: %s") % load_strategy
+        raise exception.InvalidInput(reason=msg)
+
+    query = model_query(context, models.Volume, session=session,
+                        project_only=project_only)
+    for rel in relations:
+        query = query.options(loaders[rel](rel))
+    return query
 
 
 @require_context
@@ -1229,7 +1270,7 @@ def volume_get(context, volume_id):
 
 @require_admin_context
 def volume_get_all(context, marker, limit, sort_key, sort_dir,
-                   filters=None):
+                   filters=None, load_strategy='subquery', offset=None):
     """Retrieves all volumes.
 
     :param context: context to query under
@@ -1242,13 +1283,18 @@ def volume_get_all(context, marker, limit, sort_key, sort_dir,
                     'no_migration_targets'=True causes volumes with either
                     a NULL 'migration_status' or a 'migration_status' that
                     does not start with 'target:' to be retrieved.
+    :param load_strategy: how the volume relationships are loaded, see
+                          _volume_get_query
+    :param offset: number of items to skip
     :returns: list of matching volumes
     """
     session = get_session()
     with session.begin():
         # Generate the query
         query = _generate_paginate_query(context, session, marker, limit,
-                                         sort_key, sort_dir, filters)
+                                         sort_key, sort_dir, filters,
+                                         load_strategy=load_strategy,
+                                         offset=offset)
         # No volumes would match, return empty list
         if query is None:
             return []
@@ -1256,8 +1302,12 @@ def volume_get_all(context, marker, limit, sort_key, sort_dir,
 
 
 @require_admin_context
-def volume_get_all_by_host(context, host):
-    """Retrieves all volumes hosted on a host."""
+def volume_get_all_by_host(context, host, load_strategy='subquery'):
+    """Retrieves all volumes hosted on a host.
+
+    :param load_strategy: how the volume relationships are loaded, see
+                          _volume_get_query
+    """
     # As a side effect of the introduction of pool-aware scheduler,
     # newly created volumes will have pool information appended to
     # 'host' field of a volume record. So a volume record in DB can
@@ -1270,7 +1320,8 @@ def volume_get_all_by_host(context, host):
             host_attr = getattr(models.Volume, 'host')
             conditions = [host_attr == host,
                           host_attr.op('LIKE')(host + '#%')]
-            result = _volume_get_query(context).filter(or_(*conditions)).all()
+            result = _volume_get_query(context, load_strategy=load_strategy).\
+                filter(or_(*conditions)).all()
             return result
     elif not host:
         return []
@@ -1284,7 +1335,8 @@ def volume_get_all_by_group(context, group_id):
 
 @require_context
 def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
-                              sort_dir, filters=None):
+                              sort_dir, filters=None,
+                              load_strategy='subquery', offset=None):
     """"Retrieves all volumes in a project.
 
     :param context: context to query under
@@ -1298,6 +1350,9 @@ def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
                     'no_migration_targets'=True causes volumes with either
                     a NULL 'migration_status' or a 'migration_status' that
                     does not start with 'target:' to be retrieved.
+    :param load_strategy: how the volume relationships are loaded, see
+                          _volume_get_query
+    :param offset: number of items to skip
     :returns: list of matching volumes
     """
     session = get_session()
@@ -1308,7 +1363,9 @@ def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
         filters['project_id'] = project_id
         # Generate the query
         query = _generate_paginate_query(context, session, marker, limit,
-                                         sort_key, sort_dir, filters)
+                                         sort_key, sort_dir, filters,
+                                         load_strategy=load_strategy,
+                                         offset=offset)
         # No volumes would match, return empty list
         if query is None:
             return []
@@ -1316,7 +1373,8 @@ def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
 
 
 def _generate_paginate_query(context, session, marker, limit, sort_key,
-                             sort_dir, filters):
+                             sort_dir, filters, load_strategy='joined',
+                             offset=None):
     """Generate the query to include the filters and the paginate options.
 
     Returns a query with sorting / pagination criteria added or None
@@ -1325,7 +1383,9 @@ def _generate_paginate_query(context, session, marker, limit, sort_key,
     :param context: context to query under
     :param session: the session to use
     :param marker: the last item of the previous page; we returns the next
-                    results after this value.
+                    results after this value. Either the id of that item or,
+                    for keyset pagination, a dict holding its values for
+                    sort_key, 'created_at' and 'id'.
     :param limit: maximum number of items to return
     :param sort_key: single attributes by which results should be sorted
     :param sort_dir: direction in which results should be sorted (asc, desc)
@@ -1333,9 +1393,13 @@ def _generate_paginate_query(context, session, marker, limit, sort_key,
                     tuples, sets, or frozensets cause an 'IN' test to
                     be performed, while exact matching ('==' operator)
                     is used for other values
+    :param load_strategy: how the volume relationships are loaded, see
+                          _volume_get_query
+    :param offset: number of items to skip after the marker
     :returns: updated query or None
     """
-    query = _volume_get_query(context, session=session)
+    query = _volume_get_query(context, session=session,
+                              load_strategy=load_strategy)
 
     if filters:
         filters = filters.copy()
@@ -1406,14 +1470,82 @@ def _generate_paginate_query(context, session, marker, limit, sort_key,
         if filter_dict:
             query = query.filter_by(**filter_dict)
 
-    marker_volume = None
-    if marker is not None:
-        marker_volume = _volume_get(context, marker, session)
+    sort_keys = [sort_key, 'created_at', 'id']
+    marker_values = None
+    if isinstance(marker, dict):
+        # Keyset pagination, the marker already carries the sort tuple of
+        # the last item of the previous page so no lookup is needed
+        missing = [key for key in sort_keys if key not in marker]
+        if missing:
+            msg = (_("Keyset marker is missing sort keys: %s") %
+                   ', '.join(missing))
+            raise exception.InvalidInput(reason=msg)
+        marker_values = marker
+    elif marker is not None:
+        marker_values = _get_marker_values(context, session, models.Volume,
+                                           marker, sort_keys)
+        if not marker_values:
+            raise exception.VolumeNotFound(volume_id=marker)
+
+    query = sqlalchemyutils.paginate_query(query, models.Volume, limit,
+                                           sort_keys,
+                                           marker=marker_values,
+                                           sort_dir=sort_dir)
+    if offset:
+        query = query.offset(offset)
+    return query
 
-    return sqlalchemyutils.paginate_query(query, models.Volume, limit,
-                                          [sort_key, 'created_at', 'id'],
-                                          marker=marker_volume,
-                                          sort_dir=sort_dir)
+
+def _get_marker_values(context, session, model, marker, sort_keys,
+                       project_only=True):
+    """Fetch only the sort key columns of the marker row.
+
+    Pagination only needs the values the result set is ordered by, so
+    there is no need to load the full marker object and its relationships.
+
+    :param context: context to query under
+    :param session: the session to use
+    :param model: the ORM model class being paginated
+    :param marker: the id of the last item of the previous page
+    :param sort_keys: the attributes by which results are sorted
+    :param project_only: restrict the lookup to the project of a user
+                         context, for models that have a project_id
+    :returns: a row whose attributes are the marker's sort key values, or
+              None if the marker does not exist
+    """
+    try:
+        columns = [getattr(model, key) for key in set(sort_keys)]
+    except AttributeError:
+        msg = _("Invalid sort key")
+        raise exception.InvalidInput(reason=msg)
+
+    return model_query(context, *columns, session=session,
+                       project_only=project_only).\
+        filter_by(id=marker).\
+        first()
+
+
+def _paginate_by_creation(query, model, marker_values, limit, offset):
+    """Add creation order, marker, limit and offset to a listing query.
+
+    Used for the listings without a sort key, which are returned oldest
+    first.
+
+    :param query: the query object to which we should add paging/sorting
+    :param model: the ORM model class
+    :param marker_values: the sort key values of the last item of the
+                          previous page, see _get_marker_values
+    :param limit: maximum number of items to return
+    :param offset: number of items to skip after the marker
+    :returns: the query with sorting/pagination added
+    """
+    query = sqlalchemyutils.paginate_query(query, model, limit,
+                                           _CREATION_SORT_KEYS,
+                                           marker=marker_values,
+                                           sort_dir='asc')
+    if offset:
+        query = query.offset(offset)
+    return query
 
 
 @require_admin_context
@@ -1694,10 +1826,28 @@ def snapshot_get(context, snapshot_id):
 
 
 @require_admin_context
-def snapshot_get_all(context):
-    return model_query(context, models.Snapshot).\
-        options(joinedload('snapshot_metadata')).\
-        all()
+def snapshot_get_all(context, filters=None, marker=None, limit=None,
+                     sort_key='created_at', sort_dir='desc'):
+    """Retrieves all snapshots.
+
+    :param context: context to query under
+    :param filters: dictionary of exact match filters on snapshot columns
+    :param marker: the id of the last item of the previous page, used to
+                   determine the next page of results to return
+    :param limit: maximum number of items to return
+    :param sort_key: single attributes by which results should be sorted
+    :param sort_dir: direction in which results should be sorted (asc, desc)
+    :returns: list of matching snapshots
+    """
+    session = get_session()
+    with session.begin():
+        query = _snapshot_generate_paginate_query(context, session, marker,
+                                                  limit, sort_key, sort_dir,
+                                                  filters)
+        # No snapshots would match, return empty list
+        if query is None:
+            return []
+        return query.all()
 
 
 @require_context
@@ -1720,12 +1870,83 @@ def snapshot_get_all_for_cgsnapshot(context, cgsnapshot_id):
 
 
 @require_context
-def snapshot_get_all_by_project(context, project_id):
-    authorize_project_context(context, project_id)
-    return model_query(context, models.Snapshot).\
-        filter_by(project_id=project_id).\
-        options(joinedload('snapshot_metadata')).\
-        all()
+def snapshot_get_all_by_project(context, project_id, filters=None,
+                                marker=None, limit=None,
+                                sort_key='created_at', sort_dir='desc'):
+    """Retrieves all snapshots in a project.
+
+    :param context: context to query under
+    :param project_id: project for all snapshots being retrieved
+    :param filters: dictionary of exact match filters on snapshot columns
+    :param marker: the id of the last item of the previous page, used to
+                   determine the next page of results to return
+    :param limit: maximum number of items to return
+    :param sort_key: single attributes by which results should be sorted
+    :param sort_dir: direction in which results should be sorted (asc, desc)
+    :returns: list of matching snapshots
+    """
+    session = get_session()
+    with session.begin():
+        authorize_project_context(context, project_id)
+        # Add in the project filter without modifying the given filters
+        filters = filters.copy() if filters else {}
+        filters['project_id'] = project_id
+        query = _snapshot_generate_paginate_query(context, session, marker,
+                                                  limit, sort_key, sort_dir,
+                                                  filters)
+        # No snapshots would match, return empty list
+        if query is None:
+            return []
+        return query.all()
+
+
+def _snapshot_generate_paginate_query(context, session, marker, limit,
+                                      sort_key, sort_dir, filters):
+    """Generate the snapshot query with filters and pagination applied.
+
+    Mirrors _generate_paginate_query for volumes. Returns None if the given
+    filters will not yield any results.
+
+    :param context: context to query under
+    :param session: the session to use
+    :param marker: the id of the last item of the previous page
+    :param limit: maximum number of items to return
+    :param sort_key: single attributes by which results should be sorted
+    :param sort_dir: direction in which results should be sorted (asc, desc)
+    :param filters: dictionary of exact match filters on snapshot columns
+    :returns: updated query or None
+    """
+    query = model_query(context, models.Snapshot, session=session).\
+        options(joinedload('snapshot_metadata'))
+
+    if filters:
+        for key in filters:
+            try:
+                column_attr = getattr(models.Snapshot, key)
+                # Do not allow relationship properties since those require
+                # schema specific knowledge
+                prop = getattr(column_attr, 'property')
+                if isinstance(prop, RelationshipProperty):
+                    LOG.debug("'%s' filter key is not valid, it maps to a "
+                              "relationship.", key)
+                    return None
+            except AttributeError:
+                LOG.debug("'%s' filter key is not valid.", key)
+                return None
+        query = query.filter_by(**filters)
+
+    sort_keys = [sort_key, 'created_at', 'id']
+    marker_values = None
+    if marker is not None:
+        marker_values = _get_marker_values(context, session, models.Snapshot,
+                                           marker, sort_keys)
+        if not marker_values:
+            raise exception.SnapshotNotFound(snapshot_id=marker)
+
+    return sqlalchemyutils.paginate_query(query, models.Snapshot, limit,
+                                          sort_keys,
+                                          marker=marker_values,
+                                          sort_dir=sort_dir)
 
 
 @require_context
@@ -1766,7 +1987,8 @@ def snapshot_get_active_by_window(context, begin, end=None, project_id=None):
     if project_id:
         query = query.filter_by(project_id=project_id)
 
-    return query.all()
+    return query.order_by(models.Snapshot.created_at,
+                          models.Snapshot.id).all()
 
 
 @require_context
@@ -2104,7 +2326,7 @@ def volume_get_active_by_window(context,
     if project_id:
         query = query.filter_by(project_id=project_id)
 
-    return query.all()
+    return query.order_by(models.Volume.created_at, models.Volume.id).all()
 
 
 ####################
@@ -2559,6 +2781,29 @@ def volume_glance_metadata_get_all(context):
     return _volume_glance_metadata_get_all(context)
 
 
+@require_context
+def volume_glance_metadata_list_get(context, volume_id_list):
+    """Return the Glance metadata for the specified list of volumes.
+
+    The volume ids are looked up in chunks of _IN_QUERY_CHUNK_SIZE so that
+    very long lists do not exceed the database's limits for an IN clause.
+    """
+    volume_id_list = list(volume_id_list)
+    session = get_session()
+    rows = []
+    for i in xrange(0, len(volume_id_list), _IN_QUERY_CHUNK_SIZE):
+        chunk = volume_id_list[i:i + _IN_QUERY_CHUNK_SIZE]
+        query = model_query(context, models.VolumeGlanceMetadata,
+                            session=session).\
+            filter(models.VolumeGlanceMetadata.volume_id.in_(chunk))
+        if is_user_context(context):
+            query = query.filter(
+                models.Volume.id == models.VolumeGlanceMetadata.volume_id,
+                models.Volume.project_id == context.project_id)
+        rows.extend(query.all())
+    return rows
+
+
 @require_context
 @require_volume_exists
 def _volume_glance_metadata_get(context, volume_id, session=None):
@@ -2737,20 +2982,32 @@ def backup_get(context, backup_id):
     return result
 
 
-def _backup_get_all(context, filters=None):
+def _backup_get_all(context, filters=None, marker=None, limit=None,
+                    offset=None):
     session = get_session()
     with session.begin():
         # Generate the query
-        query = model_query(context, models.Backup)
+        query = model_query(context, models.Backup, session=session)
         if filters:
             query = query.filter_by(**filters)
 
+        marker_values = None
+        if marker is not None:
+            marker_values = _get_marker_values(context, session,
+                                               models.Backup, marker,
+                                               _CREATION_SORT_KEYS)
+            if not marker_values:
+                raise exception.BackupNotFound(backup_id=marker)
+        query = _paginate_by_creation(query, models.Backup, marker_values,
+                                      limit, offset)
         return query.all()
 
 
 @require_admin_context
-def backup_get_all(context, filters=None):
-    return _backup_get_all(context, filters)
+def backup_get_all(context, filters=None, marker=None, limit=None,
+                   offset=None):
+    return _backup_get_all(context, filters, marker=marker, limit=limit,
+                           offset=offset)
 
 
 @require_admin_context
@@ -2759,7 +3016,8 @@ def backup_get_all_by_host(context, host):
 
 
 @require_context
-def backup_get_all_by_project(context, project_id, filters=None):
+def backup_get_all_by_project(context, project_id, filters=None,
+                              marker=None, limit=None, offset=None):
 
     authorize_project_context(context, project_id)
     if not filters:
@@ -2769,7 +3027,8 @@ def backup_get_all_by_project(context, project_id, filters=None):
 
     filters['project_id'] = project_id
 
-    return _backup_get_all(context, filters)
+    return _backup_get_all(context, filters, marker=marker, limit=limit,
+                           offset=offset)
 
 
 @require_context
@@ -2853,22 +3112,47 @@ def _translate_transfers(transfers):
 
 
 @require_admin_context
-def transfer_get_all(context):
-    results = model_query(context, models.Transfer).all()
+def transfer_get_all(context, marker=None, limit=None, offset=None):
+    session = get_session()
+    with session.begin():
+        query = model_query(context, models.Transfer, session=session)
+        query = _transfer_paginate(context, session, query, marker, limit,
+                                   offset)
+        results = query.all()
     return _translate_transfers(results)
 
 
 @require_context
-def transfer_get_all_by_project(context, project_id):
+def transfer_get_all_by_project(context, project_id, marker=None, limit=None,
+                                offset=None):
     authorize_project_context(context, project_id)
 
-    query = model_query(context, models.Transfer).\
-        filter(models.Volume.id == models.Transfer.volume_id,
-               models.Volume.project_id == project_id)
-    results = query.all()
+    session = get_session()
+    with session.begin():
+        query = model_query(context, models.Transfer, session=session).\
+            filter(models.Volume.id == models.Transfer.volume_id,
+                   models.Volume.project_id == project_id)
+        query = _transfer_paginate(context, session, query, marker, limit,
+                                   offset)
+        results = query.all()
     return _translate_transfers(results)
 
 
+def _transfer_paginate(context, session, query, marker, limit, offset):
+    marker_values = None
+    if marker is not None:
+        # Transfers have no project_id, the listing query itself is
+        # already restricted to the project.
+        marker_values = _get_marker_values(context, session,
+                                           models.Transfer, marker,
+                                           _CREATION_SORT_KEYS,
+                                           project_only=False)
+        if not marker_values:
+            raise exception.TransferNotFound(transfer_id=marker)
+    return _paginate_by_creation(query, models.Transfer, marker_values,
+                                 limit, offset)
+
+
 @require_context
 def transfer_create(context, values):
     if not values.get('id'):
@@ -3137,3 +3421,69 @@ def cgsnapshot_destroy(context, cgsnapshot_id):
                     'deleted': True,
                     'deleted_at': timeutils.utcnow(),
                     'updated_at': literal_column('updated_at')})
+
+
+###############################
+
+
+@require_context
+def image_volume_cache_create(context, host, image_id, image_checksum,
+                              volume_id, size):
+    session = get_session()
+    with session.begin():
+        cache_entry = models.ImageVolumeCacheEntry()
+        cache_entry.host = host
+        cache_entry.image_id = image_id
+        cache_entry.image_checksum = image_checksum
+        cache_entry.volume_id = volume_id
+        cache_entry.size = size
+        session.add(cache_entry)
+        return cache_entry
+
+
+@require_context
+def image_volume_cache_delete(context, volume_id):
+    session = get_session()
+    with session.begin():
+        model_query(context, models.ImageVolumeCacheEntry, session=session).\
+            filter_by(volume_id=volume_id).\
+            update({'deleted': True,
+                    'deleted_at': timeutils.utcnow(),
+                    'updated_at': literal_column('updated_at')})
+
+
+@require_context
+def image_volume_cache_get_and_update_last_used(context, image_id, host):
+    session = get_session()
+    with session.begin():
+        entry = model_query(context, models.ImageVolumeCacheEntry,
+                            session=session).\
+            filter_by(image_id=image_id).\
+            filter_by(host=host).\
+            order_by(models.ImageVolumeCacheEntry.last_used.desc()).\
+            first()
+
+        if entry:
+            entry.last_used = timeutils.utcnow()
+            entry.save(session=session)
+        return entry
+
+
+@require_context
+def image_volume_cache_get_by_volume_id(context, volume_id):
+    return model_query(context, models.ImageVolumeCacheEntry).\
+        filter_by(volume_id=volume_id).\
+        first()
+
+
+@require_context
+def image_volume_cache_get_all_for_host(context, host):
+    # Entries are kept per pool, the cache limits apply to the whole
+    # backend.
+    host_attr = models.ImageVolumeCacheEntry.host
+    conditions = [host_attr == host,
+                  host_attr.op('LIKE')(host + '#%')]
+    return model_query(context, models.ImageVolumeCacheEntry).\
+        filter(or_(*conditions)).\
+        order_by(models.ImageVolumeCacheEntry.last_used.desc()).\
+        all()
@@ -0,0 +1,62 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import Index, MetaData, Table
+
+from cinder.i18n import _
+from cinder.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# Based on the volume_get_all_by_project pagination query and the
+# volume_get_all_by_host query from: cinder/db/sqlalchemy/api.py
+INDEXES = [
+    ('volumes_project_deleted_created_id_idx',
+     ['project_id', 'deleted', 'created_at', 'id']),
+    ('volumes_host_deleted_idx', ['host', 'deleted']),
+]
+
+
+def _get_index(table, name):
+    for idx in table.indexes:
+        if idx.name == name:
+            return idx
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    volumes = Table('volumes', meta, autoload=True)
+
+    for name, columns in INDEXES:
+        if _get_index(volumes, name):
+            LOG.info(_('Skipped adding %s because an equivalent index '
+                       'already exists.') % name)
+            continue
+        index = Index(name, *[getattr(volumes.c, col) for col in columns])
+        index.create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    volumes = Table('volumes', meta, autoload=True)
+
+    for name, _columns in INDEXES:
+        index = _get_index(volumes, name)
+        if index:
+            index.drop(migrate_engine)
+        else:
+            LOG.info(_('Skipped removing %s because index does not '
+                       'exist.') % name)
@@ -0,0 +1,59 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import Index, MetaData, Table
+
+from cinder.i18n import _
+from cinder.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+INDEX_NAME = 'snapshots_project_deleted_created_id_idx'
+
+
+def _get_index(table):
+    for idx in table.indexes:
+        if idx.name == INDEX_NAME:
+            return idx
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    snapshots = Table('snapshots', meta, autoload=True)
+    if _get_index(snapshots):
+        LOG.info(_('Skipped adding %s because an equivalent index '
+                   'already exists.') % INDEX_NAME)
+        return
+
+    # Based on the snapshot_get_all_by_project pagination query
+    # from: cinder/db/sqlalchemy/api.py
+    index = Index(INDEX_NAME,
+                  snapshots.c.project_id, snapshots.c.deleted,
+                  snapshots.c.created_at, snapshots.c.id)
+
+    index.create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    snapshots = Table('snapshots', meta, autoload=True)
+
+    index = _get_index(snapshots)
+    if index:
+        index.drop(migrate_engine)
+    else:
+        LOG.info(_('Skipped removing %s because index does not '
+                   'exist.') % INDEX_NAME)
@@ -21,7 +21,7 @@ SQLAlchemy models for cinder data.
 
 from oslo.config import cfg
 from oslo.db.sqlalchemy import models
-from sqlalchemy import Column, Integer, String, Text, schema
+from sqlalchemy import BigInteger, Column, Integer, String, Text, schema
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import ForeignKey, DateTime, Boolean
 from sqlalchemy.orm import relationship, backref
@@ -477,6 +477,9 @@ class Backup(BASE, CinderBase):
     service = Column(String(255))
     size = Column(Integer)
     object_count = Column(Integer)
+    parent_id = Column(String(36))
+    # Bytes of zeroes found in the volume and not stored by the backup
+    skipped_zero_bytes = Column(BigInteger)
 
 
 class Encryption(BASE, CinderBase):
@@ -520,6 +523,18 @@ class Transfer(BASE, CinderBase):
                           'Transfer.deleted == False)')
 
 
+class ImageVolumeCacheEntry(BASE, CinderBase):
+    """Represents an image cached in a volume of a backend."""
+    __tablename__ = 'image_volume_cache_entries'
+    id = Column(Integer, primary_key=True, nullable=False)
+    host = Column(String(255), index=True, nullable=False)
+    image_id = Column(String(36), index=True, nullable=False)
+    image_checksum = Column(String(255), nullable=False)
+    volume_id = Column(String(36), nullable=False)
+    size = Column(Integer, nullable=False)
+    last_used = Column(DateTime, default=timeutils.utcnow, nullable=False)
+
+
 def register_models():
     """Register Models and create metadata.
 
@@ -539,7 +554,8 @@ def register_models():
               VolumeTypes,
               VolumeGlanceMetadata,
               ConsistencyGroup,
-              Cgsnapshot
+              Cgsnapshot,
+              ImageVolumeCacheEntry
               )
     engine = create_engine(CONF.database.connection, echo=False)
     for model in models:
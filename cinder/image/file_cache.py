@@ -0,0 +1,236 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Node-local cache of the image files fetched from Glance.
+
+Entries are keyed on the image id and checksum, so an image whose data
+changed is never served from the cache, and are evicted least recently
+used first to keep the cache within its size budget.
+
+The cache directory may be shared by all the volume services of a node.
+Fetching an entry is serialized by an external lock, so that concurrent
+requests for an image that is not cached yet wait for a single download.
+Users of an entry hold a shared flock on it, and eviction skips the
+entries that are locked.  Entries being fetched count against the size
+budget, and the ones left behind by a fetch that did not complete are
+removed once they are no longer written to.
+"""
+
+import contextlib
+import errno
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from oslo.config import cfg
+
+from cinder.i18n import _
+from cinder.openstack.common import fileutils
+from cinder.openstack.common import log as logging
+from cinder.openstack.common import units
+from cinder import utils
+
+
+LOG = logging.getLogger(__name__)
+
+image_file_cache_opts = [
+    cfg.StrOpt('image_file_cache_dir',
+               default='$state_path/image-cache',
+               help='Directory of the node-local cache of images fetched '
+                    'from Glance'),
+    cfg.IntOpt('image_file_cache_size_gb',
+               default=0,
+               help='Size in GB of the node-local cache of images fetched '
+                    'from Glance. 0 disables the cache'),
+    cfg.BoolOpt('image_file_cache_raw',
+                default=False,
+                help='Cache images converted to raw rather than as fetched '
+                     'from Glance'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(image_file_cache_opts)
+
+# Entries being fetched, they are not part of the cache yet.
+_PARTIAL_SUFFIX = '.part'
+# Seconds after which an unlocked partial entry that is not written to
+# any more is considered left behind by a killed service.
+_STALE_PARTIAL_AGE = 60 * 60
+
+_image_file_cache = None
+
+
+def get_image_file_cache():
+    """Return the node-local image file cache, or None if it is disabled."""
+    global _image_file_cache
+
+    if CONF.image_file_cache_size_gb <= 0 or fcntl is None:
+        return None
+
+    max_size = CONF.image_file_cache_size_gb * units.Gi
+    if (_image_file_cache is None or
+            _image_file_cache.cache_dir != CONF.image_file_cache_dir):
+        _image_file_cache = ImageFileCache(CONF.image_file_cache_dir,
+                                           max_size)
+    _image_file_cache.max_size = max_size
+    return _image_file_cache
+
+
+def _flock(entry, operation):
+    """Lock entry, without blocking the other green threads."""
+    while True:
+        try:
+            fcntl.flock(entry, operation | fcntl.LOCK_NB)
+            return
+        except IOError as e:
+            if e.errno not in (errno.EACCES, errno.EAGAIN):
+                raise
+            time.sleep(0.01)
+
+
+def _open_shared(path):
+    """Open path with a shared lock, or return None if it does not exist."""
+    try:
+        entry = open(path, 'rb')
+    except IOError as e:
+        if e.errno == errno.ENOENT:
+            return None
+        raise
+
+    _flock(entry, fcntl.LOCK_SH)
+    if os.fstat(entry.fileno()).st_nlink == 0:
+        # Evicted while waiting for the lock
+        entry.close()
+        return None
+    return entry
+
+
+class ImageFileCache(object):
+    """Size bounded LRU cache of image files."""
+
+    def __init__(self, cache_dir, max_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        fileutils.ensure_tree(cache_dir)
+
+    def _get_path(self, image_id, checksum):
+        return os.path.join(self.cache_dir, '%s-%s' % (image_id, checksum))
+
+    @contextlib.contextmanager
+    def get(self, image_id, checksum, fetch_func):
+        """Yield the path of the cached image, fetching it on a miss.
+
+        :param image_id: id of the image
+        :param checksum: checksum of the image data, as reported by Glance
+        :param fetch_func: called with a path to fetch the image into
+        """
+        path = self._get_path(image_id, checksum)
+
+        @utils.synchronized('image-file-cache-%s-%s' % (image_id, checksum),
+                            external=True)
+        def _open_entry():
+            entry = _open_shared(path)
+            if entry is not None:
+                os.utime(path, None)
+                self.hits += 1
+                LOG.debug('Image %(image_id)s found in the image file cache, '
+                          '%(hits)d hits, %(misses)d misses',
+                          {'image_id': image_id, 'hits': self.hits,
+                           'misses': self.misses})
+                return entry, False
+
+            self.misses += 1
+            LOG.debug('Image %(image_id)s not found in the image file cache, '
+                      '%(hits)d hits, %(misses)d misses',
+                      {'image_id': image_id, 'hits': self.hits,
+                       'misses': self.misses})
+            partial = path + _PARTIAL_SUFFIX
+            with fileutils.remove_path_on_error(partial):
+                # Locked while fetching, so that the partial entry is not
+                # taken for a stale one.
+                with open(partial, 'wb') as fetching:
+                    _flock(fetching, fcntl.LOCK_EX)
+                    fetch_func(partial)
+                # Lock the entry before it can be seen by eviction.
+                entry = _open_shared(partial)
+                os.rename(partial, path)
+            return entry, True
+
+        entry, fetched = _open_entry()
+        try:
+            if fetched:
+                self._evict()
+            yield path
+        finally:
+            entry.close()
+
+    def _evict(self):
+        """Remove the least recently used entries not in use until the
+        cache fits in max_size.
+        """
+        entries = []
+        total_size = 0
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Evicted by another service
+                continue
+            if name.endswith(_PARTIAL_SUFFIX):
+                if (now - stat.st_mtime > _STALE_PARTIAL_AGE and
+                        self._remove_unused(path)):
+                    LOG.info(_('Removed %s left behind by an interrupted '
+                               'fetch from the image file cache'), path)
+                else:
+                    total_size += stat.st_size
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+            total_size += stat.st_size
+
+        for mtime, path, size in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if self._remove_unused(path):
+                total_size -= size
+                self.evictions += 1
+                LOG.info(_('Evicted %(path)s from the image file cache, '
+                           '%(evictions)d evictions'),
+                         {'path': path, 'evictions': self.evictions})
+
+    def _remove_unused(self, path):
+        try:
+            entry = open(path, 'rb')
+        except IOError:
+            return False
+        with contextlib.closing(entry):
+            try:
+                fcntl.flock(entry, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError:
+                # In use
+                return False
+            try:
+                os.unlink(path)
+            except OSError:
+                return False
+            return True
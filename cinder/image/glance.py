@@ -19,6 +19,7 @@
 
 from __future__ import absolute_import
 
+import collections
 import copy
 import itertools
 import random
@@ -42,6 +43,11 @@ glance_opts = [
                 help='A list of url schemes that can be downloaded directly '
                      'via the direct_url.  Currently supported schemes: '
                      '[file].'),
+    cfg.IntOpt('glance_metadata_cache_ttl',
+               default=0,
+               help='Number of seconds the metadata of an image is reused '
+                    'for by later requests. The metadata is always reused '
+                    'within a request'),
 ]
 glance_core_properties = [
     cfg.ListOpt('glance_core_properties',
@@ -57,6 +63,12 @@ CONF.import_opt('glance_api_version', 'cinder.common.config')
 
 LOG = logging.getLogger(__name__)
 
+# Image metadata shared by the image services of the process, see
+# GlanceImageService.show:
+# { (image_id, project_id, is_admin): (request_id, fetched_at, image_meta) }
+_METADATA_CACHE = collections.OrderedDict()
+_METADATA_CACHE_SIZE = 128
+
 
 def _parse_image_ref(image_href):
     """Parse an image href into composite parts.
@@ -226,7 +238,19 @@ class GlanceImageService(object):
         return _params
 
     def show(self, context, image_id):
-        """Returns a dict with image data for the given opaque image id."""
+        """Returns a dict with image data for the given opaque image id.
+
+        The metadata is fetched once per request, see
+        glance_metadata_cache_ttl.
+        """
+        key = (image_id, context.project_id, context.is_admin)
+        cached = _METADATA_CACHE.get(key)
+        if cached is not None:
+            request_id, fetched_at, image_meta = cached
+            if (request_id == context.request_id or
+                    time.time() - fetched_at < CONF.glance_metadata_cache_ttl):
+                return copy.deepcopy(image_meta)
+
         try:
             image = self._client.call(context, 'get', image_id)
         except Exception:
@@ -236,6 +260,12 @@ class GlanceImageService(object):
             raise exception.ImageNotFound(image_id=image_id)
 
         base_image_meta = self._translate_from_glance(image)
+
+        _METADATA_CACHE.pop(key, None)
+        _METADATA_CACHE[key] = (context.request_id, time.time(),
+                                copy.deepcopy(base_image_meta))
+        if len(_METADATA_CACHE) > _METADATA_CACHE_SIZE:
+            _METADATA_CACHE.popitem(last=False)
         return base_image_meta
 
     def get_location(self, context, image_id):
@@ -300,6 +330,7 @@ class GlanceImageService(object):
     def update(self, context, image_id,
                image_meta, data=None, purge_props=True):
         """Modify the given image with the new data."""
+        _forget_metadata(image_id)
         image_meta = self._translate_to_glance(image_meta)
         #NOTE(dosaboy): see comment in bug 1210467
         if CONF.glance_api_version == 1:
@@ -329,6 +360,7 @@ class GlanceImageService(object):
         :raises: NotAuthorized if the user is not an owner.
 
         """
+        _forget_metadata(image_id)
         try:
             self._client.call(context, 'delete', image_id)
         except glanceclient.exc.NotFound:
@@ -493,6 +525,12 @@ def _translate_plain_exception(exc_value):
     return exc_value
 
 
+def _forget_metadata(image_id):
+    for key in _METADATA_CACHE.keys():
+        if key[0] == image_id:
+            del _METADATA_CACHE[key]
+
+
 def get_remote_image_service(context, image_href):
     """Create an image_service and parse the id from the given image_href.
 
@@ -25,13 +25,19 @@ we should look at maybe pushing this up to Oslo
 
 
 import contextlib
+import hashlib
 import os
+import shlex
+import stat
 import tempfile
 
+from eventlet.green import subprocess
 from oslo.config import cfg
 
 from cinder import exception
 from cinder.i18n import _
+from cinder.image import file_cache
+from cinder.openstack.common import excutils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import imageutils
 from cinder.openstack.common import log as logging
@@ -46,11 +52,36 @@ LOG = logging.getLogger(__name__)
 image_helper_opt = [cfg.StrOpt('image_conversion_dir',
                                default='$state_path/conversion',
                                help='Directory used for temporary storage '
-                                    'during image conversion'), ]
+                                    'during image conversion'),
+                    cfg.BoolOpt('image_stream_raw',
+                                default=False,
+                                help='Write raw images to block device '
+                                     'volumes as they are downloaded, '
+                                     'instead of going through a temporary '
+                                     'file and qemu-img'), ]
 
 CONF = cfg.CONF
 CONF.register_opts(image_helper_opt)
 
+# Magic numbers of the image formats qemu-img probes, with their offset.
+# A raw image starting with one of them is not streamed, as it would be
+# detected as that format later on.
+_IMAGE_FORMAT_MAGICS = (
+    (0, 'QFI\xfb'),                  # qcow, qcow2
+    (0, 'QED\x00'),                  # qed
+    (0, 'KDMV'),                     # vmdk
+    (0, 'COWD'),                     # vmdk (ESX)
+    (0, '# Disk DescriptorFile'),    # vmdk descriptor
+    (0, 'conectix'),                 # vpc
+    (0, 'vhdxfile'),                 # vhdx
+    (0, 'WithoutFreeSpace'),         # parallels
+    (0, 'WithouFreSpacExt'),         # parallels
+    (0, 'Bochs Virtual HD Image'),   # bochs
+    (0, 'LUKS\xba\xbe'),              # luks
+    (0x40, '\x7f\x10\xda\xbe'),       # vdi
+)
+_IMAGE_HEADER_SIZE = 512
+
 
 def qemu_img_info(path):
     """Return an object containing the parsed output from qemu-img info."""
@@ -180,6 +211,17 @@ def fetch_to_volume_format(context, image_service,
     qemu_img = True
     image_meta = image_service.show(context, image_id)
 
+    if _can_stream_raw_image(image_meta, dest, volume_format):
+        if size is not None and image_meta['size'] > size * units.Gi:
+            params = {'image_size': image_meta['size'],
+                      'volume_size': size}
+            reason = _("Size is %(image_size)d bytes and doesn't fit in a "
+                       "volume of size %(volume_size)dGB.") % params
+            raise exception.ImageUnacceptable(image_id=image_id, reason=reason)
+        if _stream_raw_image(context, image_service, image_id, image_meta,
+                             dest, blocksize):
+            return
+
     # NOTE(avishay): I'm not crazy about creating temp files which may be
     # large and cause disk full errors which would confuse users.
     # Unfortunately it seems that you can't pipe to 'qemu-img convert' because
@@ -211,12 +253,9 @@ def fetch_to_volume_format(context, image_service,
                              "can be used if qemu-img is not installed."),
                     image_id=image_id)
 
-        fetch(context, image_service, image_id, tmp, user_id, project_id)
-
-        if is_xenserver_image(context, image_service, image_id):
-            replace_xenserver_image_with_coalesced_vhd(tmp)
-
         if not qemu_img:
+            _fetch_image(context, image_service, image_id, tmp, user_id,
+                         project_id)
             # qemu-img is not installed but we do have a RAW image.  As a
             # result we only need to copy the image to the destination and then
             # return.
@@ -226,42 +265,35 @@ def fetch_to_volume_format(context, image_service,
             volume_utils.copy_volume(tmp, dest, image_meta['size'], blocksize)
             return
 
-        data = qemu_img_info(tmp)
-        virt_size = data.virtual_size / units.Gi
-
-        # NOTE(xqueralt): If the image virtual size doesn't fit in the
-        # requested volume there is no point on resizing it because it will
-        # generate an unusable image.
-        if size is not None and virt_size > size:
-            params = {'image_size': virt_size, 'volume_size': size}
-            reason = _("Size is %(image_size)dGB and doesn't fit in a "
-                       "volume of size %(volume_size)dGB.") % params
-            raise exception.ImageUnacceptable(image_id=image_id, reason=reason)
-
-        fmt = data.file_format
-        if fmt is None:
-            raise exception.ImageUnacceptable(
-                reason=_("'qemu-img info' parsing failed."),
-                image_id=image_id)
-
-        backing_file = data.backing_file
-        if backing_file is not None:
-            raise exception.ImageUnacceptable(
-                image_id=image_id,
-                reason=_("fmt=%(fmt)s backed by:%(backing_file)s")
-                % {'fmt': fmt, 'backing_file': backing_file, })
-
-        # NOTE(jdg): I'm using qemu-img convert to write
-        # to the volume regardless if it *needs* conversion or not
-        # TODO(avishay): We can speed this up by checking if the image is raw
-        # and if so, writing directly to the device. However, we need to keep
-        # check via 'qemu-img info' that what we copied was in fact a raw
-        # image and not a different format with a backing file, which may be
-        # malicious.
-        LOG.debug("%s was %s, converting to %s " % (image_id, fmt,
-                                                    volume_format))
-        convert_image(tmp, dest, volume_format,
-                      bps_limit=CONF.volume_copy_bps_limit)
+        with _fetched_image(context, image_service, image_id, image_meta, tmp,
+                            user_id, project_id) as image_path:
+            data = qemu_img_info(image_path)
+            virt_size = data.virtual_size / units.Gi
+
+            # NOTE(xqueralt): If the image virtual size doesn't fit in the
+            # requested volume there is no point on resizing it because it
+            # will generate an unusable image.
+            if size is not None and virt_size > size:
+                params = {'image_size': virt_size, 'volume_size': size}
+                reason = _("Size is %(image_size)dGB and doesn't fit in a "
+                           "volume of size %(volume_size)dGB.") % params
+                raise exception.ImageUnacceptable(image_id=image_id,
+                                                  reason=reason)
+
+            _check_image_format(image_id, data)
+
+            # NOTE(jdg): I'm using qemu-img convert to write
+            # to the volume regardless if it *needs* conversion or not
+            # TODO(avishay): We can speed this up by checking if the image is
+            # raw and if so, writing directly to the device. However, we need
+            # to keep check via 'qemu-img info' that what we copied was in
+            # fact a raw image and not a different format with a backing file,
+            # which may be malicious.
+            LOG.debug("%s was %s, converting to %s " % (image_id,
+                                                        data.file_format,
+                                                        volume_format))
+            convert_image(image_path, dest, volume_format,
+                          bps_limit=CONF.volume_copy_bps_limit)
 
         data = qemu_img_info(dest)
         if data.file_format != volume_format:
@@ -273,6 +305,218 @@ def fetch_to_volume_format(context, image_service,
                                                    file_format})
 
 
+def _can_stream_raw_image(image_meta, dest, volume_format):
+    """Check whether the image can be written to dest as it is downloaded.
+
+    Only raw images with a checksum to verify are streamed, to block
+    devices, and only when the download is not throttled or cached.
+    """
+    if (not CONF.image_stream_raw or volume_format != 'raw' or
+            CONF.volume_copy_bps_limit or
+            file_cache.get_image_file_cache() is not None):
+        return False
+
+    if (not image_meta or image_meta.get('disk_format') != 'raw' or
+            image_meta.get('container_format') != 'bare' or
+            not image_meta.get('checksum')):
+        return False
+
+    try:
+        return stat.S_ISBLK(os.stat(dest).st_mode)
+    except OSError:
+        return False
+
+
+def _stream_raw_image(context, image_service, image_id, image_meta, dest,
+                      blocksize):
+    """Write a raw image to dest as it is downloaded.
+
+    Returns False, without having written to dest, if the image data turns
+    out not to be raw.
+    """
+    odirect = volume_utils.check_for_odirect_support('/dev/zero', dest)
+    writer = _RawImageWriter(image_id, dest, blocksize, odirect,
+                             image_meta['checksum'])
+    start_time = timeutils.utcnow()
+    try:
+        image_service.download(context, image_id, writer)
+        writer.close()
+    except _NotRawImage:
+        LOG.info(_("Image %s is not raw, it can not be streamed to the "
+                   "volume."), image_id)
+        return False
+    except Exception:
+        with excutils.save_and_reraise_exception():
+            writer.abort()
+
+    duration = max(timeutils.delta_seconds(start_time, timeutils.utcnow()), 1)
+    size_mb = float(writer.size) / units.Mi
+    LOG.info(_("Image %(image_id)s streamed to %(dest)s, %(sz).2f MB at "
+               "%(mbps).2f MB/s"),
+             {'image_id': image_id, 'dest': dest, 'sz': size_mb,
+              'mbps': size_mb / duration})
+    return True
+
+
+class _NotRawImage(Exception):
+    """Raised to stop streaming an image which is not raw."""
+
+
+class _RawImageWriter(object):
+    """File-like object writing a raw image to a device through dd.
+
+    Nothing reaches the device until the image header was checked, and
+    the data is checked against the image checksum as it is written.
+    """
+
+    def __init__(self, image_id, dest, blocksize, odirect, checksum):
+        self.image_id = image_id
+        self.checksum = checksum
+        self.size = 0
+        self._md5 = hashlib.md5()
+        self._header = ''
+        self._process = None
+
+        # iflag=fullblock makes dd write whole blocks, as O_DIRECT
+        # requires, whatever the size of the reads from the pipe.
+        self._cmd = ['dd', 'of=%s' % dest, 'bs=%s' % blocksize,
+                     'iflag=fullblock']
+        if odirect:
+            self._cmd.append('oflag=direct')
+
+    def _check_header(self, header):
+        for offset, magic in _IMAGE_FORMAT_MAGICS:
+            if header[offset:offset + len(magic)] == magic:
+                raise _NotRawImage()
+
+    def _start(self):
+        cmd = shlex.split(utils.get_root_helper()) + self._cmd
+        LOG.debug('Running cmd (subprocess): %s', ' '.join(cmd))
+        self._process = subprocess.Popen(cmd,
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE,
+                                         close_fds=True)
+
+    def _write(self, data):
+        self._md5.update(data)
+        self.size += len(data)
+        try:
+            self._process.stdin.write(data)
+        except IOError:
+            # dd exited, report why
+            self._wait()
+            raise
+
+    def _wait(self):
+        stdout, stderr = self._process.communicate()
+        if self._process.returncode:
+            raise processutils.ProcessExecutionError(
+                exit_code=self._process.returncode, stdout=stdout,
+                stderr=stderr, cmd=' '.join(self._cmd))
+
+    def write(self, data):
+        if self._process is not None:
+            self._write(data)
+            return
+
+        self._header += data
+        if len(self._header) >= _IMAGE_HEADER_SIZE:
+            self._flush_header()
+
+    def _flush_header(self):
+        header, self._header = self._header, ''
+        self._check_header(header)
+        self._start()
+        self._write(header)
+
+    def close(self):
+        """Wait for the data to be written and verify its checksum."""
+        if self._process is None:
+            # The image is smaller than its header
+            self._flush_header()
+        self._wait()
+
+        if self._md5.hexdigest() != self.checksum:
+            raise exception.ImageUnacceptable(
+                image_id=self.image_id,
+                reason=_("Image checksum %(actual)s does not match "
+                         "%(expected)s.") %
+                {'actual': self._md5.hexdigest(), 'expected': self.checksum})
+
+    def abort(self):
+        """Let dd exit after the data written so far."""
+        # NOTE: dd runs as root, closing its input is the way to stop it.
+        if self._process is not None and self._process.returncode is None:
+            self._process.communicate()
+
+
+def _fetch_image(context, image_service, image_id, path, user_id,
+                 project_id):
+    """Fetch an image, coalescing the VHD chain of XenServer images."""
+    fetch(context, image_service, image_id, path, user_id, project_id)
+
+    if is_xenserver_image(context, image_service, image_id):
+        replace_xenserver_image_with_coalesced_vhd(path)
+
+
+def _fetch_raw_image(context, image_service, image_id, path, user_id,
+                     project_id):
+    """Fetch an image and convert it to raw into path."""
+    with temporary_file() as tmp:
+        _fetch_image(context, image_service, image_id, tmp, user_id,
+                     project_id)
+        # The checks are done before the conversion, which would otherwise
+        # copy the data of a backing file into path.
+        _check_image_format(image_id, qemu_img_info(tmp))
+        convert_image(tmp, path, 'raw')
+
+
+def _check_image_format(image_id, data):
+    """Reject images that qemu-img cannot parse or with a backing file."""
+    fmt = data.file_format
+    if fmt is None:
+        raise exception.ImageUnacceptable(
+            reason=_("'qemu-img info' parsing failed."),
+            image_id=image_id)
+
+    backing_file = data.backing_file
+    if backing_file is not None:
+        raise exception.ImageUnacceptable(
+            image_id=image_id,
+            reason=_("fmt=%(fmt)s backed by:%(backing_file)s")
+            % {'fmt': fmt, 'backing_file': backing_file, })
+
+
+@contextlib.contextmanager
+def _fetched_image(context, image_service, image_id, image_meta, tmp,
+                   user_id, project_id):
+    """Yield the path of the fetched image.
+
+    The image is fetched into tmp, unless the image file cache is enabled,
+    in which case the path of the cache entry is yielded.
+    """
+    cache = file_cache.get_image_file_cache()
+    checksum = image_meta.get('checksum') if image_meta else None
+    if cache is None or not checksum:
+        _fetch_image(context, image_service, image_id, tmp, user_id,
+                     project_id)
+        yield tmp
+        return
+
+    if CONF.image_file_cache_raw:
+        fetch_func = _fetch_raw_image
+    else:
+        fetch_func = _fetch_image
+
+    def _fetch(path):
+        fetch_func(context, image_service, image_id, path, user_id,
+                   project_id)
+
+    with cache.get(image_id, checksum, _fetch) as path:
+        yield path
+
+
 def upload_volume(context, image_service, image_meta, volume_path,
                   volume_format='raw'):
     image_id = image_meta['id']
@@ -0,0 +1,140 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Per-backend cache of volumes holding Glance images.
+
+The first volume created from an image on a backend is cloned into a
+volume of the Cinder internal tenant, and the next volumes created from
+that image on the backend are cloned from it instead of downloading the
+image again.  Image volumes are as large as their image, the volumes
+cloned from them are extended to the requested size.  Entries are keyed
+on the image id and the pool, invalidated when the image checksum
+changes, and evicted least recently used first to keep the backend
+within its count and size limits.
+"""
+
+from cinder import exception
+from cinder.i18n import _
+from cinder.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+class ImageVolumeCache(object):
+    """LRU cache of the image volumes of a backend."""
+
+    def __init__(self, db, volume_api, max_cache_size_gb=0,
+                 max_cache_size_count=0):
+        self.db = db
+        self.volume_api = volume_api
+        self.max_cache_size_gb = max_cache_size_gb
+        self.max_cache_size_count = max_cache_size_count
+
+    def get_by_image_volume(self, context, volume_id):
+        return self.db.image_volume_cache_get_by_volume_id(context, volume_id)
+
+    def evict(self, context, cache_entry):
+        """Remove an entry from the cache, leaving its volume alone."""
+        LOG.debug('Evicting image %(image_id)s volume %(volume_id)s from the '
+                  'image-volume cache of %(host)s.',
+                  {'image_id': cache_entry['image_id'],
+                   'volume_id': cache_entry['volume_id'],
+                   'host': cache_entry['host']})
+        self.db.image_volume_cache_delete(context, cache_entry['volume_id'])
+
+    def get_entry(self, context, volume_ref, image_id, image_meta):
+        """Return the entry of the image, or None on a miss.
+
+        An entry of an older version of the image is deleted.  The entry
+        returned may be larger than volume_ref.
+        """
+        cache_entry = self.db.image_volume_cache_get_and_update_last_used(
+            context, image_id, volume_ref['host'])
+        if cache_entry is None:
+            LOG.debug('Image %(image_id)s not found in the image-volume '
+                      'cache of %(host)s.',
+                      {'image_id': image_id, 'host': volume_ref['host']})
+            return None
+
+        if cache_entry['image_checksum'] != image_meta.get('checksum'):
+            LOG.info(_('Image %(image_id)s changed since it was cached in '
+                       'volume %(volume_id)s, deleting the cache entry.'),
+                     {'image_id': image_id,
+                      'volume_id': cache_entry['volume_id']})
+            self._delete_image_volume(context, cache_entry)
+            return None
+
+        LOG.debug('Image %(image_id)s found in the image-volume cache of '
+                  '%(host)s in volume %(volume_id)s.',
+                  {'image_id': image_id, 'host': volume_ref['host'],
+                   'volume_id': cache_entry['volume_id']})
+        return cache_entry
+
+    def create_cache_entry(self, context, volume_ref, image_id, image_meta):
+        """Record volume_ref as holding the image of image_meta."""
+        LOG.debug('Caching image %(image_id)s in volume %(volume_id)s.',
+                  {'image_id': image_id, 'volume_id': volume_ref['id']})
+        return self.db.image_volume_cache_create(context,
+                                                 volume_ref['host'],
+                                                 image_id,
+                                                 image_meta['checksum'],
+                                                 volume_ref['id'],
+                                                 volume_ref['size'])
+
+    def ensure_space(self, context, space_required, host):
+        """Evict entries until a new entry of space_required GB fits.
+
+        :param host: backend host of the new entry, the limits apply to
+                     all the pools of the backend
+        :returns: False if the new entry is larger than the cache
+        """
+        if 0 < self.max_cache_size_gb < space_required:
+            return False
+
+        entries = self.db.image_volume_cache_get_all_for_host(context, host)
+        current_count = len(entries)
+        current_size = sum(entry['size'] for entry in entries)
+
+        # The entries are ordered from the most to the least recently used.
+        while entries and self._should_evict(current_size + space_required,
+                                             current_count + 1):
+            entry = entries.pop()
+            self._delete_image_volume(context, entry)
+            current_count -= 1
+            current_size -= entry['size']
+        return True
+
+    def _should_evict(self, size, count):
+        return ((self.max_cache_size_gb and size > self.max_cache_size_gb) or
+                (self.max_cache_size_count and
+                 count > self.max_cache_size_count))
+
+    def _delete_image_volume(self, context, cache_entry):
+        """Evict an entry and delete its volume."""
+        self.evict(context, cache_entry)
+        # The image volume belongs to the internal tenant, not to the
+        # tenant whose request evicts it.
+        admin_context = context.elevated()
+        try:
+            volume_ref = self.db.volume_get(admin_context,
+                                            cache_entry['volume_id'])
+            self.volume_api.delete(admin_context, volume_ref)
+        except exception.VolumeNotFound:
+            pass
+        except exception.CinderException:
+            LOG.exception(_('Failed to delete image volume %s of the '
+                            'image-volume cache.'), cache_entry['volume_id'])
@@ -51,6 +51,7 @@ This module provides Manager, a base class for managers.
 
 """
 
+import copy
 
 from oslo.config import cfg
 from oslo import messaging
@@ -59,10 +60,20 @@ from cinder.db import base
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import periodic_task
 from cinder.scheduler import rpcapi as scheduler_rpcapi
+from cinder import utils
 from cinder import version
 
 
+manager_opts = [
+    cfg.IntOpt('capabilities_full_sync_interval',
+               default=0,
+               help='Number of capability reports sent to the schedulers '
+                    'as deltas against the previous report between two '
+                    'full reports. 0 sends every report in full'),
+]
+
 CONF = cfg.CONF
+CONF.register_opts(manager_opts)
 LOG = logging.getLogger(__name__)
 
 
@@ -115,19 +126,62 @@ class SchedulerDependentManager(Manager):
         self.last_capabilities = None
         self.service_name = service_name
         self.scheduler_rpcapi = scheduler_rpcapi.SchedulerAPI()
+        # Capabilities last sent to the schedulers when deltas are used,
+        # None makes the next report a full one.
+        self._sent_capabilities = None
+        self._capabilities_version = 0
+        self._deltas_since_full_sync = 0
         super(SchedulerDependentManager, self).__init__(host, db_driver)
 
     def update_service_capabilities(self, capabilities):
         """Remember these capabilities to send on next periodic update."""
         self.last_capabilities = capabilities
 
+    def request_full_capabilities_sync(self):
+        """Send the capabilities in full on next periodic update."""
+        self._sent_capabilities = None
+
     @periodic_task.periodic_task
     def _publish_service_capabilities(self, context):
         """Pass data back to the scheduler at a periodic interval."""
-        if self.last_capabilities:
+        if not self.last_capabilities:
+            return
+
+        interval = CONF.capabilities_full_sync_interval
+        if interval <= 0:
             LOG.debug('Notifying Schedulers of capabilities ...')
             self.scheduler_rpcapi.update_service_capabilities(
                 context,
                 self.service_name,
                 self.host,
                 self.last_capabilities)
+            return
+
+        # Every report gets a new version, the schedulers use it to notice
+        # a missed delta and request a full report.
+        self._capabilities_version += 1
+        if (self._sent_capabilities is None or
+                self._deltas_since_full_sync >= interval):
+            LOG.debug('Notifying Schedulers of capabilities, version %d ...',
+                      self._capabilities_version)
+            self.scheduler_rpcapi.update_service_capabilities(
+                context,
+                self.service_name,
+                self.host,
+                self.last_capabilities,
+                capabilities_version=self._capabilities_version)
+            self._deltas_since_full_sync = 0
+        else:
+            LOG.debug('Notifying Schedulers of capability changes, '
+                      'version %d ...', self._capabilities_version)
+            self.scheduler_rpcapi.update_service_capabilities(
+                context,
+                self.service_name,
+                self.host,
+                None,
+                capabilities_version=self._capabilities_version,
+                capabilities_delta=utils.diff_capabilities(
+                    self._sent_capabilities, self.last_capabilities))
+            self._deltas_since_full_sync += 1
+        # Drivers may update their stats dict in place.
+        self._sent_capabilities = copy.deepcopy(self.last_capabilities)
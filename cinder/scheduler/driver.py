@@ -69,11 +69,14 @@ class Scheduler(object):
             CONF.scheduler_host_manager)
         self.volume_rpcapi = volume_rpcapi.VolumeAPI()
 
-    def update_service_capabilities(self, service_name, host, capabilities):
+    def update_service_capabilities(self, service_name, host, capabilities,
+                                    version=None, delta=None):
         """Process a capability update from a service node."""
-        self.host_manager.update_service_capabilities(service_name,
-                                                      host,
-                                                      capabilities)
+        return self.host_manager.update_service_capabilities(service_name,
+                                                             host,
+                                                             capabilities,
+                                                             version=version,
+                                                             delta=delta)
 
     def host_passes_filters(self, context, volume_id, host, filter_properties):
         """Check if the specified host passes the filters."""
@@ -92,6 +95,12 @@ class Scheduler(object):
         """Must override schedule method for scheduler to work."""
         raise NotImplementedError(_("Must implement schedule_create_volume"))
 
+    def schedule_create_volumes(self, context, request_spec_list,
+                                filter_properties=None):
+        """Must override schedule method for scheduler to work."""
+        raise NotImplementedError(_(
+            "Must implement schedule_create_volumes"))
+
     def schedule_create_consistencygroup(self, context, group_id,
                                          request_spec_list,
                                          filter_properties_list):
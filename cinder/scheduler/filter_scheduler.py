@@ -20,6 +20,9 @@ You can customize this scheduler by specifying your own volume Filters and
 Weighing Functions.
 """
 
+import collections
+import copy
+
 from oslo.config import cfg
 
 from cinder import exception
@@ -88,17 +91,87 @@ class FilterScheduler(driver.Scheduler):
         if not weighed_host:
             raise exception.NoValidHost(reason="No weighed hosts available")
 
-        host = weighed_host.obj.host
+        self._create_volume_on_host(context, request_spec,
+                                    filter_properties, weighed_host.obj)
+
+    def schedule_create_volumes(self, context, request_spec_list,
+                                filter_properties=None):
+        """Schedule a batch of volumes and return the host of each one.
+
+        Host states are refreshed once for the whole batch and the filters
+        run once per distinct volume type and availability zone.  Capacity
+        is consumed in memory as volumes are placed, so that later volumes
+        of the batch are weighed against what earlier ones used.  Volumes
+        which can not be placed get None as their host.
+        """
+        elevated = context.elevated()
+        all_hosts = list(self.host_manager.get_all_host_states(elevated))
+        check_capacity = 'CapacityFilter' in CONF.scheduler_default_filters
+
+        groups = collections.OrderedDict()
+        for index, request_spec in enumerate(request_spec_list):
+            vol = request_spec['volume_properties']
+            key = (vol.get('volume_type_id'), vol.get('availability_zone'))
+            groups.setdefault(key, []).append(index)
+
+        hosts = [None] * len(request_spec_list)
+        for indexes in groups.itervalues():
+            # Only the capacity check depends on the volume, filter with the
+            # smallest one and check capacity again for every volume below.
+            smallest = min(indexes, key=lambda i: request_spec_list[i][
+                'volume_properties']['size'])
+            try:
+                group_properties = self._prepare_filter_properties(
+                    context, request_spec_list[smallest],
+                    copy.deepcopy(filter_properties or {}))
+            except exception.NoValidHost as ex:
+                LOG.warning(_('Failed to schedule volumes: %s'), ex)
+                continue
+            candidates = self.host_manager.get_filtered_hosts(
+                all_hosts, group_properties)
+
+            for index in indexes:
+                request_spec = request_spec_list[index]
+                volume_id = request_spec['volume_id']
+                properties = self._prepare_filter_properties(
+                    context, request_spec,
+                    copy.deepcopy(filter_properties or {}))
+
+                fitting = candidates
+                if check_capacity:
+                    fitting = self.host_manager.get_filtered_hosts(
+                        candidates, properties, ['CapacityFilter'])
+                if not fitting:
+                    LOG.warning(_('No valid host found for volume %s'),
+                                volume_id)
+                    continue
+
+                weighed_hosts = self.host_manager.get_weighed_hosts(
+                    fitting, properties)
+                top_host = self._choose_top_host(weighed_hosts,
+                                                 request_spec)
+                self._create_volume_on_host(context, request_spec,
+                                            properties, top_host.obj)
+                hosts[index] = top_host.obj.host
+
+        return hosts
+
+    def _create_volume_on_host(self, context, request_spec,
+                               filter_properties, host_state):
+        """Record the chosen host and ask it to create the volume."""
+        host = host_state.host
         volume_id = request_spec['volume_id']
         snapshot_id = request_spec['snapshot_id']
         image_id = request_spec['image_id']
 
         updated_volume = driver.volume_update_db(context, volume_id, host)
         self._post_select_populate_filter_properties(filter_properties,
-                                                     weighed_host.obj)
+                                                     host_state)
 
-        # context is not serializable
+        # context and the affinity filters' per-request cache are not
+        # serializable
         filter_properties.pop('context', None)
+        filter_properties.pop('affinity_backends', None)
 
         self.volume_rpcapi.create_volume(context, updated_volume, host,
                                          request_spec, filter_properties,
@@ -252,13 +325,9 @@ class FilterScheduler(driver.Scheduler):
             }
             raise exception.NoValidHost(reason=msg)
 
-    def _get_weighted_candidates(self, context, request_spec,
-                                 filter_properties=None):
-        """Returns a list of hosts that meet the required specs,
-        ordered by their fitness.
-        """
-        elevated = context.elevated()
-
+    def _prepare_filter_properties(self, context, request_spec,
+                                   filter_properties=None):
+        """Fill filter_properties in for scheduling request_spec."""
         volume_properties = request_spec['volume_properties']
         # Since Cinder is using mixed filters from Oslo and it's own, which
         # takes 'resource_XX' and 'volume_XX' as input respectively, copying
@@ -282,6 +351,16 @@ class FilterScheduler(driver.Scheduler):
 
         self.populate_filter_properties(request_spec,
                                         filter_properties)
+        return filter_properties
+
+    def _get_weighted_candidates(self, context, request_spec,
+                                 filter_properties=None):
+        """Returns a list of hosts that meet the required specs,
+        ordered by their fitness.
+        """
+        elevated = context.elevated()
+        filter_properties = self._prepare_filter_properties(
+            context, request_spec, filter_properties)
 
         # Find our local list of acceptable hosts by filtering and
         # weighing our options. we virtually consume resources on
@@ -27,12 +27,28 @@ class AffinityFilter(filters.BaseHostFilter):
     def __init__(self):
         self.volume_api = volume.API()
 
+    def _get_affinity_backends(self, filter_properties, hint, affinity_uuids):
+        """Return the set of back-ends hosting the hinted volumes.
+
+        The volumes are looked up once per scheduling request and the
+        result is cached in filter_properties, so that evaluating the
+        filter against every candidate host needs no further queries.
+        """
+        cache = filter_properties.setdefault('affinity_backends', {})
+        if hint not in cache:
+            context = filter_properties['context']
+            volumes = self.volume_api.get_all(
+                context, filters={'id': affinity_uuids,
+                                  'deleted': False},
+                load_strategy='noload')
+            cache[hint] = set(vol['host'] for vol in volumes)
+        return cache[hint]
+
 
 class DifferentBackendFilter(AffinityFilter):
     """Schedule volume on a different back-end from a set of volumes."""
 
     def host_passes(self, host_state, filter_properties):
-        context = filter_properties['context']
         scheduler_hints = filter_properties.get('scheduler_hints') or {}
 
         affinity_uuids = scheduler_hints.get('different_host', [])
@@ -56,10 +72,10 @@ class DifferentBackendFilter(AffinityFilter):
             return False
 
         if affinity_uuids:
-            return not self.volume_api.get_all(
-                context, filters={'host': host_state.host,
-                                  'id': affinity_uuids,
-                                  'deleted': False})
+            backends = self._get_affinity_backends(filter_properties,
+                                                   'different_host',
+                                                   affinity_uuids)
+            return host_state.host not in backends
 
         # With no different_host key
         return True
@@ -69,7 +85,6 @@ class SameBackendFilter(AffinityFilter):
     """Schedule volume on the same back-end as another volume."""
 
     def host_passes(self, host_state, filter_properties):
-        context = filter_properties['context']
         scheduler_hints = filter_properties.get('scheduler_hints') or {}
 
         affinity_uuids = scheduler_hints.get('same_host', [])
@@ -93,10 +108,10 @@ class SameBackendFilter(AffinityFilter):
             return False
 
         if affinity_uuids:
-            return self.volume_api.get_all(
-                context, filters={'host': host_state.host,
-                                  'id': affinity_uuids,
-                                  'deleted': False})
+            backends = self._get_affinity_backends(filter_properties,
+                                                   'same_host',
+                                                   affinity_uuids)
+            return host_state.host in backends
 
         # With no same_host key
         return True
@@ -0,0 +1,169 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+CapabilitiesFilter that matches hosts against pre-compiled extra specs.
+
+The generic filter splits every extra spec key into its scope and parses
+the requirement string again for each host it is asked about.  Here the
+extra specs of a volume type are compiled once into a list of
+(scope, requirement, test) tuples, which is cached on the contents of the
+extra specs, so setting or unsetting a key compiles the new specs.
+"""
+
+import collections
+import operator
+
+import six
+
+from cinder.openstack.common import log as logging
+from cinder.openstack.common.scheduler.filters import capabilities_filter
+from cinder.openstack.common.scheduler.filters import extra_specs_ops
+
+
+LOG = logging.getLogger(__name__)
+
+# Operators comparing numbers, their operand is converted once at compile
+# time instead of for every host.
+_numeric_ops = {'=': operator.ge,
+                '==': operator.eq,
+                '!=': operator.ne,
+                '>=': operator.ge,
+                '<=': operator.le}
+
+# { frozenset(<extra specs items>): <compiled extra specs> }, least
+# recently used first.
+_compiled_extra_specs = collections.OrderedDict()
+_COMPILED_EXTRA_SPECS_SIZE = 256
+
+
+def _never(value):
+    return False
+
+
+def _compile_requirement(req):
+    """Return a function testing a capability value against req.
+
+    The returned function gives the same answer as
+    extra_specs_ops.match(value, req).
+    """
+    words = req.split()
+
+    op = method = None
+    if words:
+        op = words.pop(0)
+        method = extra_specs_ops._op_methods.get(op)
+
+    if op != '<or>' and not method:
+        return lambda value: value == req
+
+    if op == '<or>':  # Ex: <or> v1 <or> v2 <or> v3
+        choices = tuple(words[::2])
+        return lambda value: value is not None and value in choices
+
+    if not words:
+        return _never
+    operand = words[0]
+
+    if op in _numeric_ops:
+        try:
+            operand = float(operand)
+        except ValueError:
+            return _never
+        method = _numeric_ops[op]
+
+        def test(value):
+            if value is None:
+                return False
+            try:
+                return method(float(value), operand)
+            except ValueError:
+                return False
+        return test
+
+    def test(value):
+        if value is None:
+            return False
+        try:
+            return bool(method(value, operand))
+        except ValueError:
+            return False
+    return test
+
+
+def compile_extra_specs(extra_specs):
+    """Compile extra specs into a list of (scope, req, test) tuples.
+
+    Keys scoped to something other than 'capabilities' are dropped, as
+    they are not meant for this filter.
+    """
+    compiled = []
+    for key, req in six.iteritems(extra_specs):
+        # Either not scope format, or in capabilities scope
+        scope = key.split(':')
+        if len(scope) > 1 and scope[0] != "capabilities":
+            continue
+        elif scope[0] == "capabilities":
+            del scope[0]
+        compiled.append((tuple(scope), req, _compile_requirement(req)))
+    return compiled
+
+
+def get_compiled_extra_specs(resource_type):
+    """Return the compiled extra specs of resource_type, using the cache.
+
+    The cache is keyed on the extra specs themselves, the volume type
+    records are not updated when their extra specs change.
+    """
+    extra_specs = resource_type.get('extra_specs') or {}
+    try:
+        key = frozenset(six.iteritems(extra_specs))
+        compiled = _compiled_extra_specs.pop(key)
+    except TypeError:
+        # Unhashable values are not cached
+        return compile_extra_specs(extra_specs)
+    except KeyError:
+        compiled = compile_extra_specs(extra_specs)
+        if len(_compiled_extra_specs) >= _COMPILED_EXTRA_SPECS_SIZE:
+            _compiled_extra_specs.popitem(last=False)
+
+    _compiled_extra_specs[key] = compiled
+    return compiled
+
+
+class CapabilitiesFilter(capabilities_filter.CapabilitiesFilter):
+    """HostFilter to work with volume type records."""
+
+    def _satisfies_extra_specs(self, capabilities, resource_type):
+        """Check that the capabilities provided by the services satisfy
+        the extra specs associated with the resource type.
+        """
+        if not resource_type or not resource_type.get('extra_specs'):
+            return True
+
+        for scope, req, test in get_compiled_extra_specs(resource_type):
+            cap = capabilities
+            for key in scope:
+                try:
+                    cap = cap.get(key, None)
+                except AttributeError:
+                    return False
+                if cap is None:
+                    return False
+            if not test(cap):
+                LOG.debug("extra_spec requirement '%(req)s' does not match "
+                          "'%(cap)s'", {'req': req, 'cap': cap})
+                return False
+        return True
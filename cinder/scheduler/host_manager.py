@@ -45,7 +45,12 @@ host_manager_opts = [
                 default=[
                     'CapacityWeigher'
                 ],
-                help='Which weigher class names to use for weighing hosts.')
+                help='Which weigher class names to use for weighing hosts.'),
+    cfg.IntOpt('scheduler_service_list_cache_ttl',
+               default=0,
+               help='Number of seconds the scheduler may reuse the list of '
+                    'volume services before reading it from the database '
+                    'again. 0 reads it on every scheduling request.'),
 ]
 
 CONF = cfg.CONF
@@ -109,6 +114,9 @@ class HostState(object):
         self.allocated_capacity_gb = 0
         self.free_capacity_gb = None
         self.reserved_percentage = 0
+        # Number of volumes placed on this host, seeded by HostManager
+        # and bumped as volumes are consumed. None means not known yet.
+        self.volume_count = None
 
         # PoolState for all pools
         self.pools = {}
@@ -194,6 +202,10 @@ class HostState(object):
             # of pools in volume capacity
             for pool_cap in pools:
                 pool_name = pool_cap['pool_name']
+                # The reported pools are kept to apply capability deltas
+                # to, the backend info and timestamp of this report only
+                # go to the pool state.
+                pool_cap = dict(pool_cap)
                 self._append_backend_info(pool_cap)
                 cur_pool = self.pools.get(pool_name, None)
                 if not cur_pool:
@@ -274,6 +286,8 @@ class HostState(object):
             pass
         else:
             self.free_capacity_gb -= volume_gb
+        if self.volume_count is not None:
+            self.volume_count += 1
         self.updated = timeutils.utcnow()
 
     def __repr__(self):
@@ -312,6 +326,12 @@ class PoolState(HostState):
         pass
 
 
+# Service record fields which, when changed, require re-deriving the host
+# state of the service.
+_SERVICE_SIGNATURE_KEYS = ('id', 'topic', 'disabled', 'disabled_reason',
+                           'availability_zone')
+
+
 class HostManager(object):
     """Base HostManager class."""
 
@@ -320,6 +340,20 @@ class HostManager(object):
     def __init__(self):
         self.service_states = {}  # { <host>: {<service>: {cap k : v}}}
         self.host_state_map = {}
+        # Bumped on every capability report of a host, so that host states
+        # are only re-derived when something has changed.
+        self._capability_generations = {}
+        # { <host>: (<capability generation>, <service signature>) } as
+        # last applied to host_state_map
+        self._applied_generations = {}
+        # { <host>: <version of its last versioned capability report> }
+        self._capability_versions = {}
+        self._volume_services = None
+        self._volume_services_updated = None
+        # Volume counts are reloaded with one grouped query whenever a
+        # backend reports its capabilities; between reports they are
+        # maintained by HostState.consume_from_volume().
+        self._volume_counts_stale = True
         self.filter_handler = filters.HostFilterHandler('cinder.scheduler.'
                                                         'filters')
         self.filter_classes = self.filter_handler.get_all_classes()
@@ -415,23 +449,65 @@ class HostManager(object):
                                                        hosts,
                                                        weight_properties)
 
-    def update_service_capabilities(self, service_name, host, capabilities):
-        """Update the per-service capabilities based on this notification."""
+    def update_service_capabilities(self, service_name, host, capabilities,
+                                    version=None, delta=None):
+        """Update the per-service capabilities based on this notification.
+
+        A delta is applied to the capabilities of the previous version of
+        the host.  If that version is not the one known here, an update
+        was missed and False is returned so that a full report can be
+        requested from the host.
+        """
         if service_name != 'volume':
             LOG.debug('Ignoring %(service_name)s service update '
                       'from %(host)s',
                       {'service_name': service_name, 'host': host})
-            return
+            return True
+
+        if delta is not None:
+            known_version = self._capability_versions.get(host)
+            if (host not in self.service_states or known_version is None or
+                    known_version + 1 != version):
+                LOG.debug('Missed a capability update from %(host)s, '
+                          'version %(known)s is followed by %(version)s',
+                          {'host': host, 'known': known_version,
+                           'version': version})
+                self._capability_versions.pop(host, None)
+                return False
+            capabilities = utils.apply_capabilities_delta(
+                self.service_states[host], delta)
+        self._capability_versions[host] = version
 
         # Copy the capabilities, so we don't modify the original dict
         capab_copy = dict(capabilities)
         capab_copy["timestamp"] = timeutils.utcnow()  # Reported time
         self.service_states[host] = capab_copy
+        self._capability_generations[host] = (
+            self._capability_generations.get(host, 0) + 1)
+        self._volume_counts_stale = True
 
         LOG.debug("Received %(service_name)s service update from "
                   "%(host)s: %(cap)s" %
                   {'service_name': service_name, 'host': host,
                    'cap': capabilities})
+        return True
+
+    def _get_volume_services(self, context):
+        """Return enabled volume services, cached for a short while."""
+        ttl = CONF.scheduler_service_list_cache_ttl
+        if (ttl > 0 and self._volume_services is not None and
+                not timeutils.is_older_than(self._volume_services_updated,
+                                            ttl)):
+            return self._volume_services
+
+        topic = CONF.volume_topic
+        volume_services = db.service_get_all_by_topic(context,
+                                                      topic,
+                                                      disabled=False)
+        if ttl > 0:
+            self._volume_services = volume_services
+            self._volume_services_updated = timeutils.utcnow()
+        return volume_services
 
     def get_all_host_states(self, context):
         """Returns a dict of all the hosts the HostManager knows about.
@@ -439,23 +515,34 @@ class HostManager(object):
         Each of the consumable resources in HostState are
         populated with capabilities scheduler received from RPC.
 
+        Host states are only re-derived for hosts which reported new
+        capabilities or whose service record changed since the last call.
+
         For example:
           {'192.168.1.100': HostState(), ...}
         """
 
         # Get resource usage across the available volume nodes:
-        topic = CONF.volume_topic
-        volume_services = db.service_get_all_by_topic(context,
-                                                      topic,
-                                                      disabled=False)
+        volume_services = self._get_volume_services(context)
         active_hosts = set()
         for service in volume_services:
             host = service['host']
             if not utils.service_is_up(service):
                 LOG.warn(_("volume service is down. (host: %s)") % host)
                 continue
-            capabilities = self.service_states.get(host, None)
+            active_hosts.add(host)
+
+            # The service heartbeat bumps updated_at, sign on the fields
+            # the host state actually uses instead.
+            generation = (self._capability_generations.get(host, 0),
+                          tuple(service.get(key)
+                                for key in _SERVICE_SIGNATURE_KEYS))
             host_state = self.host_state_map.get(host)
+            if host_state and self._applied_generations.get(
+                    host) == generation:
+                continue
+
+            capabilities = self.service_states.get(host, None)
             if not host_state:
                 host_state = self.host_state_cls(host,
                                                  capabilities=capabilities,
@@ -466,7 +553,7 @@ class HostManager(object):
             host_state.update_from_volume_capability(capabilities,
                                                      service=
                                                      dict(service.iteritems()))
-            active_hosts.add(host)
+            self._applied_generations[host] = generation
 
         # remove non-active hosts from host_state_map
         nonactive_hosts = set(self.host_state_map.keys()) - active_hosts
@@ -474,6 +561,7 @@ class HostManager(object):
             LOG.info(_("Removing non-active host: %(host)s from "
                        "scheduler cache.") % {'host': host})
             del self.host_state_map[host]
+            self._applied_generations.pop(host, None)
 
         # build a pool_state map and return that map instead of host_state_map
         all_pools = {}
@@ -485,8 +573,26 @@ class HostManager(object):
                 pool_key = '.'.join([host, pool.pool_name])
                 all_pools[pool_key] = pool
 
+        self._update_volume_counts(context, all_pools.values())
+
         return all_pools.itervalues()
 
+    def _update_volume_counts(self, context, pools):
+        """Seed volume_count of pools from a single grouped query.
+
+        Counts are only reloaded after a capability report or when a pool
+        has not been seeded yet; otherwise the incrementally maintained
+        values are kept, so weighing needs no database round-trip.
+        """
+        if not self._volume_counts_stale:
+            if all(pool.volume_count is not None for pool in pools):
+                return
+
+        counts = db.volume_count_get_all_by_host(context)
+        for pool in pools:
+            pool.volume_count = counts.get(pool.host, 0)
+        self._volume_counts_stale = False
+
     def get_pools(self, context):
         """Returns a dict of all pools on all hosts HostManager knows about."""
 
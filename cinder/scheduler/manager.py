@@ -53,7 +53,7 @@ LOG = logging.getLogger(__name__)
 class SchedulerManager(manager.Manager):
     """Chooses a host to create volumes."""
 
-    RPC_API_VERSION = '1.7'
+    RPC_API_VERSION = '1.9'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -79,13 +79,19 @@ class SchedulerManager(manager.Manager):
         self.request_service_capabilities(ctxt)
 
     def update_service_capabilities(self, context, service_name=None,
-                                    host=None, capabilities=None, **kwargs):
+                                    host=None, capabilities=None,
+                                    capabilities_version=None,
+                                    capabilities_delta=None, **kwargs):
         """Process a capability update from a service node."""
         if capabilities is None:
             capabilities = {}
-        self.driver.update_service_capabilities(service_name,
-                                                host,
-                                                capabilities)
+        updated = self.driver.update_service_capabilities(
+            service_name, host, capabilities,
+            version=capabilities_version, delta=capabilities_delta)
+        if updated is False:
+            # A delta was missed, ask the service for a full report.
+            volume_rpcapi.VolumeAPI().publish_service_capabilities(
+                context, host=host, full_sync=True)
 
     def create_consistencygroup(self, context, topic,
                                 group_id,
@@ -131,6 +137,40 @@ class SchedulerManager(manager.Manager):
         with flow_utils.DynamicLogListener(flow_engine, logger=LOG):
             flow_engine.run()
 
+    def create_volumes(self, context, topic, request_spec_list,
+                       filter_properties=None):
+        """Schedule a batch of volumes, returning the host of each one.
+
+        Volumes for which no host could be found are set to error and
+        get None in the returned list.
+        """
+        def _create_volumes_set_error(self, context, ex, request_spec):
+            volume_state = {'volume_state': {'status': 'error'}}
+            self._set_volume_state_and_notify('create_volume', volume_state,
+                                              context, ex, request_spec)
+
+        try:
+            hosts = self.driver.schedule_create_volumes(context,
+                                                        request_spec_list,
+                                                        filter_properties)
+        except Exception as ex:
+            with excutils.save_and_reraise_exception():
+                # Volumes placed before the failure are already on their
+                # way to a volume service, only error out the rest.
+                for request_spec in request_spec_list:
+                    volume_ref = db.volume_get(context,
+                                               request_spec['volume_id'])
+                    if not volume_ref['host']:
+                        _create_volumes_set_error(self, context, ex,
+                                                  request_spec)
+
+        for request_spec, host in zip(request_spec_list, hosts):
+            if host is None:
+                ex = exception.NoValidHost(
+                    reason=_("No weighed hosts available"))
+                _create_volumes_set_error(self, context, ex, request_spec)
+        return hosts
+
     def request_service_capabilities(self, context):
         volume_rpcapi.VolumeAPI().publish_service_capabilities(context)
 
@@ -40,6 +40,9 @@ class SchedulerAPI(object):
         1.5 - Add manage_existing method
         1.6 - Add create_consistencygroup method
         1.7 - Add get_active_pools method
+        1.8 - Add create_volumes method
+        1.9 - Add capabilities_version and capabilities_delta arguments
+              to update_service_capabilities()
     '''
 
     RPC_API_VERSION = '1.0'
@@ -48,7 +51,7 @@ class SchedulerAPI(object):
         super(SchedulerAPI, self).__init__()
         target = messaging.Target(topic=CONF.scheduler_topic,
                                   version=self.RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='1.7')
+        self.client = rpc.get_client(target, version_cap='1.9')
 
     def create_consistencygroup(self, ctxt, topic, group_id,
                                 request_spec_list=None,
@@ -80,6 +83,19 @@ class SchedulerAPI(object):
                           request_spec=request_spec_p,
                           filter_properties=filter_properties)
 
+    def create_volumes(self, ctxt, topic, request_spec_list,
+                       filter_properties=None):
+        cctxt = self.client.prepare(version='1.8')
+        request_spec_p_list = []
+        for request_spec in request_spec_list:
+            request_spec_p = jsonutils.to_primitive(request_spec)
+            request_spec_p_list.append(request_spec_p)
+
+        return cctxt.call(ctxt, 'create_volumes',
+                          topic=topic,
+                          request_spec_list=request_spec_p_list,
+                          filter_properties=filter_properties)
+
     def migrate_volume_to_host(self, ctxt, topic, volume_id, host,
                                force_host_copy=False, request_spec=None,
                                filter_properties=None):
@@ -122,9 +138,20 @@ class SchedulerAPI(object):
 
     def update_service_capabilities(self, ctxt,
                                     service_name, host,
-                                    capabilities):
-        # FIXME(flaper87): What to do with fanout?
-        cctxt = self.client.prepare(fanout=True)
+                                    capabilities,
+                                    capabilities_version=None,
+                                    capabilities_delta=None):
+        if capabilities_version is None:
+            # FIXME(flaper87): What to do with fanout?
+            cctxt = self.client.prepare(fanout=True)
+            cctxt.cast(ctxt, 'update_service_capabilities',
+                       service_name=service_name, host=host,
+                       capabilities=capabilities)
+            return
+
+        cctxt = self.client.prepare(fanout=True, version='1.9')
         cctxt.cast(ctxt, 'update_service_capabilities',
                    service_name=service_name, host=host,
-                   capabilities=capabilities)
+                   capabilities=capabilities,
+                   capabilities_version=capabilities_version,
+                   capabilities_delta=capabilities_delta)
@@ -53,6 +53,9 @@ class VolumeNumberWeigher(weights.BaseHostWeigher):
         """Less volume number weights win.
         We want spreading to be the default.
         """
+        if host_state.volume_count is not None:
+            return host_state.volume_count
+
         context = weight_properties['context']
         volume_number = db.volume_data_get_for_host(context=context,
                                                     host=host_state.host,
@@ -45,7 +45,7 @@ def fake_snapshot_get(self, context, snapshot_id):
     return param
 
 
-def fake_snapshot_get_all(self, context, search_opts=None):
+def fake_snapshot_get_all(self, context, search_opts=None, **kwargs):
     param = _get_default_snapshot_param()
     return [param]
 
@@ -61,8 +61,9 @@ def fake_get_volume_image_metadata(*args, **kwargs):
     return fake_image_metadata
 
 
-def fake_get_volumes_image_metadata(*args, **kwargs):
-    return {'fake': fake_image_metadata}
+def fake_get_list_volumes_image_metadata(self, context, volume_id_list):
+    return dict((volume_id, fake_image_metadata)
+                for volume_id in volume_id_list if volume_id == 'fake')
 
 
 class VolumeImageMetadataTest(test.TestCase):
@@ -74,8 +75,8 @@ class VolumeImageMetadataTest(test.TestCase):
         self.stubs.Set(volume.API, 'get_all', fake_volume_get_all)
         self.stubs.Set(volume.API, 'get_volume_image_metadata',
                        fake_get_volume_image_metadata)
-        self.stubs.Set(volume.API, 'get_volumes_image_metadata',
-                       fake_get_volumes_image_metadata)
+        self.stubs.Set(volume.API, 'get_list_volumes_image_metadata',
+                       fake_get_list_volumes_image_metadata)
         self.stubs.Set(db, 'volume_get', fake_volume_get)
         self.UUID = uuid.uuid4()
 
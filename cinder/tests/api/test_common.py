@@ -158,6 +158,34 @@ class LimiterTest(test.TestCase):
         self.assertRaises(
             webob.exc.HTTPBadRequest, common.limited, self.tiny, req)
 
+    def test_limited_range_end(self):
+        """Test the number of items limited() may need."""
+        req = webob.Request.blank('/')
+        self.assertEqual(1000, common.get_limited_range_end(req))
+        req = webob.Request.blank('/?offset=3&limit=10')
+        self.assertEqual(13, common.get_limited_range_end(req))
+        req = webob.Request.blank('/?offset=3&limit=2500')
+        self.assertEqual(
+            2003, common.get_limited_range_end(req, max_limit=2000))
+        req = webob.Request.blank('/?offset=-3')
+        self.assertRaises(
+            webob.exc.HTTPBadRequest, common.get_limited_range_end, req)
+
+    def test_get_offset_and_limit(self):
+        """Test the offset and limit limited() applies."""
+        req = webob.Request.blank('/')
+        self.assertEqual((0, 1000), common.get_offset_and_limit(req))
+        req = webob.Request.blank('/?offset=3&limit=10')
+        self.assertEqual((3, 10), common.get_offset_and_limit(req))
+        req = webob.Request.blank('/?offset=3&limit=0')
+        self.assertEqual((3, 1000), common.get_offset_and_limit(req))
+        req = webob.Request.blank('/?limit=2500')
+        self.assertEqual(
+            (0, 2000), common.get_offset_and_limit(req, max_limit=2000))
+        req = webob.Request.blank('/?limit=a')
+        self.assertRaises(
+            webob.exc.HTTPBadRequest, common.get_offset_and_limit, req)
+
 
 class PaginationParamsTest(test.TestCase):
     """Unit tests for `cinder.api.common.get_pagination_params` method.
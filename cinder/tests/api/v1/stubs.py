@@ -119,16 +119,24 @@ def stub_snapshot(id, **kwargs):
     return snapshot
 
 
-def stub_snapshot_get_all(self):
+def stub_snapshot_get_all(self, **kwargs):
     return [stub_snapshot(100, project_id='fake'),
             stub_snapshot(101, project_id='superfake'),
             stub_snapshot(102, project_id='superduperfake')]
 
 
-def stub_snapshot_get_all_by_project(self, context):
+def stub_snapshot_get_all_by_project(self, context, **kwargs):
     return [stub_snapshot(1)]
 
 
+def filter_snapshots(snapshots, filters):
+    """Apply exact match filters the way the database layer does."""
+    filters = filters or {}
+    return [snapshot for snapshot in snapshots
+            if all(snapshot.get(key) == value
+                   for key, value in filters.iteritems())]
+
+
 def stub_snapshot_update(self, context, *args, **param):
     pass
 
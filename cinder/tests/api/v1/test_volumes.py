@@ -627,11 +627,13 @@ class VolumeApiTest(test.TestCase):
             def stub_volume_get_all_by_project(context, project_id, marker,
                                                limit, sort_key, sort_dir,
                                                filters=None,
-                                               viewable_admin_meta=False):
-                return [
-                    stubs.stub_volume(1, display_name='vol1'),
-                    stubs.stub_volume(2, display_name='vol2'),
-                ]
+                                               viewable_admin_meta=False,
+                                               load_strategy=None,
+                                               offset=None):
+                # The offset and limit are applied by the database
+                self.assertEqual(2, limit)
+                self.assertEqual(1, offset)
+                return [stubs.stub_volume(2, display_name='vol2')]
 
             self.stubs.Set(db, 'volume_get_all_by_project',
                            stub_volume_get_all_by_project)
@@ -16,6 +16,7 @@
 import datetime
 
 from lxml import etree
+import mock
 import webob
 
 from cinder.api.v2 import snapshots
@@ -70,7 +71,7 @@ def stub_snapshot_get(self, context, snapshot_id):
     return param
 
 
-def stub_snapshot_get_all(self, context, search_opts=None):
+def stub_snapshot_get_all(self, context, search_opts=None, **kwargs):
     param = _get_default_snapshot_param()
     return [param]
 
@@ -246,15 +247,16 @@ class SnapshotApiTest(test.TestCase):
         self.assertEqual(resp_snapshot['id'], UUID)
 
     def test_snapshot_list_by_status(self):
-        def stub_snapshot_get_all_by_project(context, project_id):
-            return [
+        def stub_snapshot_get_all_by_project(context, project_id,
+                                             filters=None, **kwargs):
+            return stubs.filter_snapshots([
                 stubs.stub_snapshot(1, display_name='backup1',
                                     status='available'),
                 stubs.stub_snapshot(2, display_name='backup2',
                                     status='available'),
                 stubs.stub_snapshot(3, display_name='backup3',
                                     status='creating'),
-            ]
+            ], filters)
         self.stubs.Set(db, 'snapshot_get_all_by_project',
                        stub_snapshot_get_all_by_project)
 
@@ -279,12 +281,13 @@ class SnapshotApiTest(test.TestCase):
         self.assertEqual(len(resp['snapshots']), 0)
 
     def test_snapshot_list_by_volume(self):
-        def stub_snapshot_get_all_by_project(context, project_id):
-            return [
+        def stub_snapshot_get_all_by_project(context, project_id,
+                                             filters=None, **kwargs):
+            return stubs.filter_snapshots([
                 stubs.stub_snapshot(1, volume_id='vol1', status='creating'),
                 stubs.stub_snapshot(2, volume_id='vol1', status='available'),
                 stubs.stub_snapshot(3, volume_id='vol2', status='available'),
-            ]
+            ], filters)
         self.stubs.Set(db, 'snapshot_get_all_by_project',
                        stub_snapshot_get_all_by_project)
 
@@ -308,12 +311,13 @@ class SnapshotApiTest(test.TestCase):
         self.assertEqual(resp['snapshots'][0]['status'], 'available')
 
     def test_snapshot_list_by_name(self):
-        def stub_snapshot_get_all_by_project(context, project_id):
-            return [
+        def stub_snapshot_get_all_by_project(context, project_id,
+                                             filters=None, **kwargs):
+            return stubs.filter_snapshots([
                 stubs.stub_snapshot(1, display_name='backup1'),
                 stubs.stub_snapshot(2, display_name='backup2'),
                 stubs.stub_snapshot(3, display_name='backup3'),
-            ]
+            ], filters)
         self.stubs.Set(db, 'snapshot_get_all_by_project',
                        stub_snapshot_get_all_by_project)
 
@@ -331,6 +335,17 @@ class SnapshotApiTest(test.TestCase):
         resp = self.controller.index(req)
         self.assertEqual(len(resp['snapshots']), 0)
 
+    @mock.patch.object(volume.api.API, 'get_all_snapshots',
+                       return_value=[])
+    def test_snapshot_list_pagination_params(self, mock_get_all):
+        req = fakes.HTTPRequest.blank('/v2/snapshots?marker=1&limit=5'
+                                      '&offset=2&sort_key=id&sort_dir=asc'
+                                      '&status=available')
+        self.controller.index(req)
+        mock_get_all.assert_called_once_with(
+            mock.ANY, search_opts={'status': 'available'}, marker='1',
+            limit=7, sort_key='id', sort_dir='asc')
+
     def test_admin_list_snapshots_limited_to_project(self):
         req = fakes.HTTPRequest.blank('/v2/fake/snapshots',
                                       use_admin_context=True)
@@ -341,12 +356,13 @@ class SnapshotApiTest(test.TestCase):
 
     def test_list_snapshots_with_limit_and_offset(self):
         def list_snapshots_with_limit_and_offset(is_admin):
-            def stub_snapshot_get_all_by_project(context, project_id):
-                return [
+            def stub_snapshot_get_all_by_project(context, project_id,
+                                                 filters=None, **kwargs):
+                return stubs.filter_snapshots([
                     stubs.stub_snapshot(1, display_name='backup1'),
                     stubs.stub_snapshot(2, display_name='backup2'),
                     stubs.stub_snapshot(3, display_name='backup3'),
-                ]
+                ], filters)
 
             self.stubs.Set(db, 'snapshot_get_all_by_project',
                            stub_snapshot_get_all_by_project)
@@ -17,6 +17,7 @@
 import datetime
 
 from lxml import etree
+import mock
 from oslo.config import cfg
 import six.moves.urllib.parse as urlparse
 import webob
@@ -635,6 +636,18 @@ class VolumeApiTest(test.TestCase):
         # Finally test that we cached the returned volumes
         self.assertEqual(1, len(req.cached_resource()))
 
+    @mock.patch.object(volume_api.API, 'get_all', return_value=[])
+    def test_volume_list_load_strategy(self, mock_get_all):
+        req = fakes.HTTPRequest.blank('/v2/volumes')
+        self.controller.index(req)
+        self.assertEqual('noload',
+                         mock_get_all.call_args[1]['load_strategy'])
+
+        req = fakes.HTTPRequest.blank('/v2/volumes/detail')
+        self.controller.detail(req)
+        self.assertEqual('subquery',
+                         mock_get_all.call_args[1]['load_strategy'])
+
     def test_volume_list_detail(self):
         self.stubs.Set(volume_api.API, 'get_all',
                        stubs.stub_volume_get_all_by_project)
@@ -751,7 +764,8 @@ class VolumeApiTest(test.TestCase):
     def test_volume_index_with_marker(self):
         def stub_volume_get_all_by_project(context, project_id, marker, limit,
                                            sort_key, sort_dir, filters=None,
-                                           viewable_admin_meta=False):
+                                           viewable_admin_meta=False,
+                                           load_strategy=None, offset=None):
             return [
                 stubs.stub_volume(1, display_name='vol1'),
                 stubs.stub_volume(2, display_name='vol2'),
@@ -812,7 +826,8 @@ class VolumeApiTest(test.TestCase):
     def test_volume_index_limit_offset(self):
         def stub_volume_get_all_by_project(context, project_id, marker, limit,
                                            sort_key, sort_dir, filters=None,
-                                           viewable_admin_meta=False):
+                                           viewable_admin_meta=False,
+                                           load_strategy=None, offset=None):
             return [
                 stubs.stub_volume(1, display_name='vol1'),
                 stubs.stub_volume(2, display_name='vol2'),
@@ -840,7 +855,8 @@ class VolumeApiTest(test.TestCase):
     def test_volume_detail_with_marker(self):
         def stub_volume_get_all_by_project(context, project_id, marker, limit,
                                            sort_key, sort_dir, filters=None,
-                                           viewable_admin_meta=False):
+                                           viewable_admin_meta=False,
+                                           load_strategy=None, offset=None):
             return [
                 stubs.stub_volume(1, display_name='vol1'),
                 stubs.stub_volume(2, display_name='vol2'),
@@ -901,7 +917,8 @@ class VolumeApiTest(test.TestCase):
     def test_volume_detail_limit_offset(self):
         def stub_volume_get_all_by_project(context, project_id, marker, limit,
                                            sort_key, sort_dir, filters=None,
-                                           viewable_admin_meta=False):
+                                           viewable_admin_meta=False,
+                                           load_strategy=None, offset=None):
             return [
                 stubs.stub_volume(1, display_name='vol1'),
                 stubs.stub_volume(2, display_name='vol2'),
@@ -960,7 +977,8 @@ class VolumeApiTest(test.TestCase):
         def stub_volume_get_all(context, marker, limit,
                                 sort_key, sort_dir,
                                 filters=None,
-                                viewable_admin_meta=False):
+                                viewable_admin_meta=False,
+                                load_strategy=None, offset=None):
             vols = [stubs.stub_volume(i)
                     for i in xrange(CONF.osapi_max_limit)]
             if limit is None or limit >= len(vols):
@@ -979,7 +997,8 @@ class VolumeApiTest(test.TestCase):
         def stub_volume_get_all2(context, marker, limit,
                                  sort_key, sort_dir,
                                  filters=None,
-                                 viewable_admin_meta=False):
+                                 viewable_admin_meta=False,
+                                 load_strategy=None, offset=None):
             vols = [stubs.stub_volume(i)
                     for i in xrange(100)]
             if limit is None or limit >= len(vols):
@@ -997,7 +1016,8 @@ class VolumeApiTest(test.TestCase):
         def stub_volume_get_all3(context, marker, limit,
                                  sort_key, sort_dir,
                                  filters=None,
-                                 viewable_admin_meta=False):
+                                 viewable_admin_meta=False,
+                                 load_strategy=None, offset=None):
             vols = [stubs.stub_volume(i)
                     for i in xrange(CONF.osapi_max_limit + 100)]
             if limit is None or limit >= len(vols):
@@ -1037,14 +1057,16 @@ class VolumeApiTest(test.TestCase):
         # Non-admin, project function should be called with no_migration_status
         def stub_volume_get_all_by_project(context, project_id, marker, limit,
                                            sort_key, sort_dir, filters=None,
-                                           viewable_admin_meta=False):
+                                           viewable_admin_meta=False,
+                                           load_strategy=None, offset=None):
             self.assertEqual(filters['no_migration_targets'], True)
             self.assertFalse('all_tenants' in filters)
             return [stubs.stub_volume(1, display_name='vol1')]
 
         def stub_volume_get_all(context, marker, limit,
                                 sort_key, sort_dir, filters=None,
-                                viewable_admin_meta=False):
+                                viewable_admin_meta=False,
+                                load_strategy=None, offset=None):
             return []
         self.stubs.Set(db, 'volume_get_all_by_project',
                        stub_volume_get_all_by_project)
@@ -1061,13 +1083,15 @@ class VolumeApiTest(test.TestCase):
         # without no_migration_status
         def stub_volume_get_all_by_project2(context, project_id, marker, limit,
                                             sort_key, sort_dir, filters=None,
-                                            viewable_admin_meta=False):
+                                            viewable_admin_meta=False,
+                                            load_strategy=None, offset=None):
             self.assertFalse('no_migration_targets' in filters)
             return [stubs.stub_volume(1, display_name='vol2')]
 
         def stub_volume_get_all2(context, marker, limit,
                                  sort_key, sort_dir, filters=None,
-                                 viewable_admin_meta=False):
+                                 viewable_admin_meta=False,
+                                 load_strategy=None, offset=None):
             return []
         self.stubs.Set(db, 'volume_get_all_by_project',
                        stub_volume_get_all_by_project2)
@@ -1082,12 +1106,14 @@ class VolumeApiTest(test.TestCase):
         # without no_migration_status
         def stub_volume_get_all_by_project3(context, project_id, marker, limit,
                                             sort_key, sort_dir, filters=None,
-                                            viewable_admin_meta=False):
+                                            viewable_admin_meta=False,
+                                            load_strategy=None, offset=None):
             return []
 
         def stub_volume_get_all3(context, marker, limit,
                                  sort_key, sort_dir, filters=None,
-                                 viewable_admin_meta=False):
+                                 viewable_admin_meta=False,
+                                 load_strategy=None, offset=None):
             self.assertFalse('no_migration_targets' in filters)
             self.assertFalse('all_tenants' in filters)
             return [stubs.stub_volume(1, display_name='vol3')]
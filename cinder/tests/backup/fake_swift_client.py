@@ -112,3 +112,31 @@ class FakeSwiftConnection(object):
         if container == 'socket_error_on_delete':
             raise socket.error(111, 'ECONNREFUSED')
         pass
+
+
+class FakeSwiftObjectStore(FakeSwiftConnection):
+    """Keeps the objects it is given in memory."""
+    def __init__(self, *args, **kwargs):
+        super(FakeSwiftObjectStore, self).__init__(*args, **kwargs)
+        self.objects = {}
+
+    def get_container(self, container, prefix='', **kwargs):
+        LOG.debug("fake get_container(%s)" % container)
+        names = sorted(name for (c, name) in self.objects
+                       if c == container and name.startswith(prefix))
+        return None, [{'name': name} for name in names]
+
+    def get_object(self, container, name):
+        LOG.debug("fake get_object(%s, %s)" % (container, name))
+        return None, self.objects[(container, name)]
+
+    def put_object(self, container, name, reader, content_length=None,
+                   etag=None, chunk_size=None, content_type=None,
+                   headers=None, query_string=None):
+        LOG.debug("fake put_object(%s, %s)" % (container, name))
+        self.objects[(container, name)] = reader.read()
+        return 'fake-md5-sum'
+
+    def delete_object(self, container, name):
+        LOG.debug("fake delete_object(%s, %s)" % (container, name))
+        del self.objects[(container, name)]
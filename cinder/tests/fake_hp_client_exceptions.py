@@ -90,6 +90,11 @@ class HTTPNotFound(Exception):
     message = "Not found"
 
 
+class HTTPUnauthorized(ClientException):
+    http_status = 401
+    message = "Unauthorized"
+
+
 class HTTPForbidden(ClientException):
     http_status = 403
     message = "Forbidden"
@@ -0,0 +1,162 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fcntl
+import os
+import shutil
+import tempfile
+
+import eventlet
+
+from cinder.image import file_cache
+from cinder import test
+
+
+class ImageFileCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ImageFileCacheTestCase, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.cache = file_cache.ImageFileCache(self.cache_dir, 100)
+        self.fetched = []
+
+    def _fetch_func(self, data):
+        def _fetch(path):
+            self.fetched.append(path)
+            with open(path, 'wb') as image_file:
+                image_file.write(data)
+        return _fetch
+
+    def _get(self, image_id, checksum='checksum', data='image data'):
+        with self.cache.get(image_id, checksum,
+                            self._fetch_func(data)) as path:
+            with open(path, 'rb') as image_file:
+                return image_file.read()
+
+    def _entries(self):
+        return sorted(os.listdir(self.cache_dir))
+
+    def test_get_image_file_cache(self):
+        self.assertIsNone(file_cache.get_image_file_cache())
+
+        self.flags(image_file_cache_size_gb=2,
+                   image_file_cache_dir=self.cache_dir)
+        cache = file_cache.get_image_file_cache()
+        self.assertEqual(self.cache_dir, cache.cache_dir)
+        self.assertEqual(2 * 1024 ** 3, cache.max_size)
+        self.assertIs(cache, file_cache.get_image_file_cache())
+
+    def test_get(self):
+        self.assertEqual('image data', self._get('image1'))
+        self.assertEqual('image data', self._get('image1'))
+        self.assertEqual(1, len(self.fetched))
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+        self.assertEqual(['image1-checksum'], self._entries())
+
+        # The image data changed
+        self.assertEqual('new data', self._get('image1', checksum='new',
+                                               data='new data'))
+        self.assertEqual(2, len(self.fetched))
+        self.assertEqual(2, self.cache.misses)
+
+    def test_get_fetch_failure(self):
+        def _fetch(path):
+            with open(path, 'wb') as image_file:
+                image_file.write('partial')
+            raise IOError()
+
+        def _get():
+            with self.cache.get('image1', 'checksum', _fetch):
+                pass
+
+        self.assertRaises(IOError, _get)
+        self.assertEqual([], self._entries())
+
+        self.assertEqual('image data', self._get('image1'))
+
+    def test_get_concurrent(self):
+        def _fetch(path):
+            self.fetched.append(path)
+            # Let the other requests run while the image is downloaded.
+            eventlet.sleep(0.1)
+            with open(path, 'wb') as image_file:
+                image_file.write('image data')
+
+        def _get():
+            with self.cache.get('image1', 'checksum', _fetch) as path:
+                with open(path, 'rb') as image_file:
+                    return image_file.read()
+
+        pool = eventlet.GreenPool()
+        results = list(pool.imap(lambda i: _get(), range(5)))
+
+        self.assertEqual(['image data'] * 5, results)
+        self.assertEqual(1, len(self.fetched))
+        self.assertEqual(4, self.cache.hits)
+
+    def test_evict(self):
+        for image_id in ('image1', 'image2', 'image3'):
+            self._get(image_id, data='x' * 40)
+            # Make the access times distinct
+            os.utime(os.path.join(self.cache_dir, '%s-checksum' % image_id),
+                     (len(self._entries()), len(self._entries())))
+        self.assertEqual(['image2-checksum', 'image3-checksum'],
+                         self._entries())
+        self.assertEqual(1, self.cache.evictions)
+
+        # A hit makes image2 the most recently used entry
+        self._get('image2')
+        self._get('image4', data='x' * 40)
+        self.assertEqual(['image2-checksum', 'image4-checksum'],
+                         self._entries())
+
+    def test_evict_skips_entries_in_use(self):
+        with self.cache.get('image1', 'checksum',
+                            self._fetch_func('x' * 60)):
+            self._get('image2', data='x' * 60)
+            # Both entries were in use when image2 was added
+            self.assertEqual(['image1-checksum', 'image2-checksum'],
+                             self._entries())
+        os.utime(os.path.join(self.cache_dir, 'image1-checksum'), (1, 1))
+        os.utime(os.path.join(self.cache_dir, 'image2-checksum'), (2, 2))
+
+        self._get('image3', data='x' * 60)
+        self.assertEqual(['image3-checksum'], self._entries())
+        self.assertEqual(2, self.cache.evictions)
+
+    def test_evict_partial_entries(self):
+        def _partial(name, size, mtime=None):
+            path = os.path.join(self.cache_dir, name + '.part')
+            with open(path, 'wb') as partial:
+                partial.write('x' * size)
+            if mtime is not None:
+                os.utime(path, (mtime, mtime))
+            return path
+
+        _partial('stale', 50, mtime=1)
+        _partial('fetching', 30)
+        # A fetch that stopped writing but still holds its lock
+        with open(_partial('locked', 10, mtime=1), 'rb') as locked:
+            fcntl.flock(locked, fcntl.LOCK_EX)
+            self._get('image1', data='x' * 40)
+            os.utime(os.path.join(self.cache_dir, 'image1-checksum'), (2, 2))
+            self._get('image2', data='x' * 40)
+
+        # The entries being fetched count against the size budget
+        self.assertEqual(['fetching.part', 'image2-checksum', 'locked.part'],
+                         self._entries())
+        self.assertEqual(1, self.cache.evictions)
@@ -14,6 +14,7 @@
 #    under the License.
 
 
+import collections
 import datetime
 
 import glanceclient.exc
@@ -103,6 +104,7 @@ class TestGlanceImageService(test.TestCase):
         self.service = self._create_image_service(client)
         self.context = context.RequestContext('fake', 'fake', auth_token=True)
         self.stubs.Set(glance.time, 'sleep', lambda s: None)
+        self.stubs.Set(glance, '_METADATA_CACHE', collections.OrderedDict())
 
     def _create_image_service(self, client):
         def _fake_create_glance_client(context, netloc, use_ssl, version):
@@ -386,6 +388,79 @@ class TestGlanceImageService(test.TestCase):
         }
         self.assertEqual(image_meta, expected)
 
+    def _show_counting_calls(self, ctxt, image_id):
+        with mock.patch.object(self.service._client, 'call',
+                               wraps=self.service._client.call) as call:
+            image_meta = self.service.show(ctxt, image_id)
+        return image_meta, call.call_count
+
+    def test_show_reuses_metadata_within_request(self):
+        fixture = self._make_fixture(name='image1')
+        image_id = self.service.create(self.context, fixture)['id']
+
+        image_meta, calls = self._show_counting_calls(self.context, image_id)
+        self.assertEqual(1, calls)
+        image_meta['name'] = 'changed'
+
+        image_meta, calls = self._show_counting_calls(self.context, image_id)
+        self.assertEqual(0, calls)
+        self.assertEqual('image1', image_meta['name'])
+
+        other_service = glance.GlanceImageService(
+            client=self.service._client)
+        self.assertEqual(image_meta,
+                         other_service.show(self.context, image_id))
+
+    def test_show_refetches_metadata_for_new_request(self):
+        fixture = self._make_fixture(name='image1')
+        image_id = self.service.create(self.context, fixture)['id']
+        self.service.show(self.context, image_id)
+
+        other_context = context.RequestContext('fake', 'fake',
+                                               auth_token=True)
+        _image_meta, calls = self._show_counting_calls(other_context,
+                                                       image_id)
+        self.assertEqual(1, calls)
+
+    @mock.patch.object(glance.time, 'time')
+    def test_show_reuses_metadata_within_ttl(self, mock_time):
+        self.flags(glance_metadata_cache_ttl=10)
+        fixture = self._make_fixture(name='image1')
+        image_id = self.service.create(self.context, fixture)['id']
+        mock_time.return_value = 100
+        self.service.show(self.context, image_id)
+
+        other_context = context.RequestContext('fake', 'fake',
+                                               auth_token=True)
+        mock_time.return_value = 109
+        _image_meta, calls = self._show_counting_calls(other_context,
+                                                       image_id)
+        self.assertEqual(0, calls)
+
+        mock_time.return_value = 110
+        _image_meta, calls = self._show_counting_calls(other_context,
+                                                       image_id)
+        self.assertEqual(1, calls)
+
+    def test_update_forgets_metadata(self):
+        fixture = self._make_fixture(name='image1')
+        image_id = self.service.create(self.context, fixture)['id']
+        self.service.show(self.context, image_id)
+
+        self.service.update(self.context, image_id, {'name': 'image2'},
+                            purge_props=False)
+        image_meta = self.service.show(self.context, image_id)
+        self.assertEqual('image2', image_meta['name'])
+
+    def test_delete_forgets_metadata(self):
+        fixture = self._make_fixture(name='image1')
+        image_id = self.service.create(self.context, fixture)['id']
+        self.service.show(self.context, image_id)
+
+        self.service.delete(self.context, image_id)
+        self.assertRaises(exception.ImageNotFound, self.service.show,
+                          self.context, image_id)
+
     def test_show_raises_when_no_authtoken_in_the_context(self):
         fixture = self._make_fixture(name='image1',
                                      is_public=False,
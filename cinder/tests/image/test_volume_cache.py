@@ -0,0 +1,138 @@
+# Copyright (c) 2014 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from cinder import context
+from cinder import exception
+from cinder.image import volume_cache
+from cinder import test
+
+
+class ImageVolumeCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ImageVolumeCacheTestCase, self).setUp()
+        self.context = context.RequestContext('user', 'project')
+        self.db = mock.Mock()
+        self.volume_api = mock.Mock()
+        self.cache = volume_cache.ImageVolumeCache(self.db, self.volume_api)
+        self.volume = {'id': 'volume', 'host': 'host@lvm#pool', 'size': 2}
+        self.image_meta = {'checksum': 'checksum'}
+
+    def _entry(self, image_id='image', size=1, checksum='checksum'):
+        return {'image_id': image_id, 'volume_id': 'volume-%s' % image_id,
+                'host': 'host@lvm#pool', 'size': size,
+                'image_checksum': checksum}
+
+    def test_get_entry(self):
+        entry = self._entry()
+        self.db.image_volume_cache_get_and_update_last_used.return_value = \
+            entry
+
+        self.assertEqual(entry, self.cache.get_entry(self.context,
+                                                     self.volume, 'image',
+                                                     self.image_meta))
+        self.db.image_volume_cache_get_and_update_last_used.\
+            assert_called_once_with(self.context, 'image', 'host@lvm#pool')
+
+    def test_get_entry_miss(self):
+        self.db.image_volume_cache_get_and_update_last_used.return_value = \
+            None
+
+        self.assertIsNone(self.cache.get_entry(self.context, self.volume,
+                                               'image', self.image_meta))
+
+    def test_get_entry_image_changed(self):
+        entry = self._entry(checksum='old')
+        self.db.image_volume_cache_get_and_update_last_used.return_value = \
+            entry
+
+        self.assertIsNone(self.cache.get_entry(self.context, self.volume,
+                                               'image', self.image_meta))
+        self.db.image_volume_cache_delete.assert_called_once_with(
+            self.context, 'volume-image')
+        # The image volume of the internal tenant is deleted as an admin
+        admin_context = self.db.volume_get.call_args[0][0]
+        self.assertTrue(admin_context.is_admin)
+        self.db.volume_get.assert_called_once_with(admin_context,
+                                                   'volume-image')
+        self.volume_api.delete.assert_called_once_with(
+            admin_context, self.db.volume_get.return_value)
+
+    def test_get_entry_larger_than_volume(self):
+        entry = self._entry(size=3)
+        self.db.image_volume_cache_get_and_update_last_used.return_value = \
+            entry
+
+        self.assertEqual(entry, self.cache.get_entry(self.context,
+                                                     self.volume, 'image',
+                                                     self.image_meta))
+        self.assertFalse(self.db.image_volume_cache_delete.called)
+
+    def test_create_cache_entry(self):
+        self.cache.create_cache_entry(self.context, self.volume, 'image',
+                                      self.image_meta)
+        self.db.image_volume_cache_create.assert_called_once_with(
+            self.context, 'host@lvm#pool', 'image', 'checksum', 'volume', 2)
+
+    def test_ensure_space_unlimited(self):
+        self.db.image_volume_cache_get_all_for_host.return_value = [
+            self._entry('image1', size=100)]
+
+        self.assertTrue(self.cache.ensure_space(self.context, 100,
+                                                'host@lvm'))
+        self.assertFalse(self.volume_api.delete.called)
+
+    def test_ensure_space_max_size(self):
+        self.cache.max_cache_size_gb = 10
+        self.db.image_volume_cache_get_all_for_host.return_value = [
+            self._entry('image1', size=4), self._entry('image2', size=4),
+            self._entry('image3', size=4)]
+
+        self.assertFalse(self.cache.ensure_space(self.context, 11,
+                                                 'host@lvm'))
+        self.assertFalse(self.volume_api.delete.called)
+
+        self.assertTrue(self.cache.ensure_space(self.context, 4,
+                                                'host@lvm'))
+        # The least recently used entries are evicted
+        self.assertEqual([mock.call(self.context, 'volume-image3'),
+                          mock.call(self.context, 'volume-image2')],
+                         self.db.image_volume_cache_delete.call_args_list)
+        self.assertEqual(2, self.volume_api.delete.call_count)
+
+    def test_ensure_space_max_count(self):
+        self.cache.max_cache_size_count = 2
+        self.db.image_volume_cache_get_all_for_host.return_value = [
+            self._entry('image1'), self._entry('image2')]
+
+        self.assertTrue(self.cache.ensure_space(self.context, 1,
+                                                'host@lvm'))
+        self.db.image_volume_cache_delete.assert_called_once_with(
+            self.context, 'volume-image2')
+
+    def test_ensure_space_volume_gone(self):
+        self.cache.max_cache_size_count = 1
+        self.db.image_volume_cache_get_all_for_host.return_value = [
+            self._entry('image1')]
+        self.db.volume_get.side_effect = exception.VolumeNotFound(
+            volume_id='volume-image1')
+
+        self.assertTrue(self.cache.ensure_space(self.context, 1,
+                                                'host@lvm'))
+        self.db.image_volume_cache_delete.assert_called_once_with(
+            self.context, 'volume-image1')
+        self.assertFalse(self.volume_api.delete.called)
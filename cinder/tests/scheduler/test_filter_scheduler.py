@@ -162,6 +162,61 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         self.assertIsNotNone(weighed_host.obj)
         self.assertTrue(_mock_service_get_all_by_topic.called)
 
+    @mock.patch('cinder.scheduler.driver.volume_update_db')
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    def test_schedule_create_volumes(self, _mock_service_get_all_by_topic,
+                                     _mock_volume_update_db):
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        sched.volume_rpcapi = mock.Mock()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+
+        def _request_spec(volume_id, size, volume_type_id):
+            return {'volume_id': volume_id,
+                    'snapshot_id': None,
+                    'image_id': None,
+                    'volume_type': {'name': volume_type_id},
+                    'volume_properties': {'project_id': 1,
+                                          'size': size,
+                                          'volume_type_id':
+                                          volume_type_id}}
+
+        request_spec_list = [_request_spec('vol%d' % i, 100, 'type1')
+                             for i in xrange(4)]
+        request_spec_list.append(_request_spec('vol4', 100, 'type2'))
+        request_spec_list.append(_request_spec('vol5', 100, 'type1'))
+        request_spec_list[5]['volume_properties']['availability_zone'] = (
+            'nowhere')
+
+        fake_host_manager = sched.host_manager
+        with mock.patch.object(fake_host_manager, 'get_all_host_states',
+                               wraps=fake_host_manager.get_all_host_states
+                               ) as get_all_host_states:
+            with mock.patch.object(fake_host_manager, 'get_filtered_hosts',
+                                   wraps=fake_host_manager.get_filtered_hosts
+                                   ) as get_filtered_hosts:
+                hosts = sched.schedule_create_volumes(fake_context,
+                                                      request_spec_list)
+
+        # Host states are refreshed once and the full set of filters runs
+        # once per volume type and zone, the capacity check once per volume.
+        self.assertEqual(1, get_all_host_states.call_count)
+        full_filters = [c for c in get_filtered_hosts.call_args_list
+                        if len(c[0]) == 2]
+        self.assertEqual(3, len(full_filters))
+        self.assertEqual(9, get_filtered_hosts.call_count)
+
+        # Capacity is consumed in memory across the whole batch.
+        self.assertEqual(['host1#lvm1'] * 5 + [None], hosts)
+        pool = fake_host_manager.host_state_map['host1'].pools['lvm1']
+        self.assertEqual(1024 - 5 * 100, pool.free_capacity_gb)
+        self.assertEqual(5, sched.volume_rpcapi.create_volume.call_count)
+        self.assertEqual(5, _mock_volume_update_db.call_count)
+        for call in sched.volume_rpcapi.create_volume.call_args_list:
+            self.assertNotIn('context', call[0][4])
+
     def test_max_attempts(self):
         self.flags(scheduler_max_attempts=4)
 
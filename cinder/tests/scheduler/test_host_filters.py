@@ -21,6 +21,9 @@ from cinder import context
 from cinder import db
 from cinder.openstack.common import jsonutils
 from cinder.openstack.common.scheduler import filters
+from cinder.openstack.common.scheduler.filters import extra_specs_ops
+from cinder.scheduler.filters import capabilities_filter
+from cinder.scheduler import host_manager
 from cinder import test
 from cinder.tests.scheduler import fakes
 from cinder.tests import utils
@@ -317,3 +320,124 @@ class HostFiltersTestCase(test.TestCase):
             'same_host': "NOT-a-valid-UUID", }}
 
         self.assertFalse(filt_cls.host_passes(host, filter_properties))
+
+    def test_affinity_filters_query_volumes_once(self):
+        volume1 = utils.create_volume(self.context, host='host1#pool0')
+        volume2 = utils.create_volume(self.context, host='host2#pool0')
+        hosts = [fakes.FakeHostState('host%d#pool0' % i, {})
+                 for i in xrange(1, 4)]
+
+        for filt_name, hint, expected in (
+                ('SameBackendFilter', 'same_host', [True, True, False]),
+                ('DifferentBackendFilter', 'different_host',
+                 [False, False, True])):
+            filt_cls = self.class_map[filt_name]()
+            filter_properties = {'context': self.context.elevated(),
+                                 'scheduler_hints': {
+                hint: [volume1.id, volume2.id], }}
+
+            with mock.patch.object(filt_cls.volume_api, 'get_all',
+                                   wraps=filt_cls.volume_api.get_all) as get:
+                result = [filt_cls.host_passes(host, filter_properties)
+                          for host in hosts]
+                self.assertEqual(1, get.call_count)
+            self.assertEqual(expected, result)
+
+
+class CapabilitiesFilterTestCase(test.TestCase):
+    """Test case for the compiled extra specs CapabilitiesFilter."""
+
+    def setUp(self):
+        super(CapabilitiesFilterTestCase, self).setUp()
+        self.filt_cls = capabilities_filter.CapabilitiesFilter()
+        compiled = mock.patch.dict(capabilities_filter._compiled_extra_specs,
+                                   clear=True)
+        compiled.start()
+        self.addCleanup(compiled.stop)
+
+    def _pool(self, name, capabilities):
+        capabilities = dict(capabilities, total_capacity_gb=100,
+                            free_capacity_gb=100, reserved_percentage=0,
+                            timestamp=None)
+        return host_manager.PoolState('host@backend', capabilities, name)
+
+    def test_compiled_requirement_matches_extra_specs_ops(self):
+        cases = [('1', '1'), ('1', '2'), (None, 'x'),
+                 ('123', '= 123'), ('124', '= 123'), ('12', '= 123'),
+                 ('abc', '= 123'), ('12', '= abc'), (None, '= 1'),
+                 ('12', '=='), ('12', '== 12'), ('12', '!= 12'),
+                 ('12', '>= 13'), ('12', '<= 13'),
+                 ('abc', 's== abc'), ('abc', 's!= abc'),
+                 ('abc', 's< abd'), ('abc', 's<= abb'),
+                 ('abc', 's> abb'), ('abc', 's>= abd'),
+                 ('12311321', '<in> 11'), ('12311321', '<in> 45'),
+                 (True, '<is> True'), ('false', '<is> True'),
+                 ('12', '<or> 11 <or> 12'), ('13', '<or> 11 <or> 12'),
+                 ('12', '<or> 11 12 13'), (None, '<or> 11 <or> 12')]
+        for value, req in cases:
+            self.assertEqual(extra_specs_ops.match(value, req),
+                             capabilities_filter._compile_requirement(req)(
+                                 value),
+                             '%r does not match %r consistently' % (value,
+                                                                    req))
+
+    def test_capabilities_filter_scopes(self):
+        pool = self._pool('pool0', {'opt1': '1', 'scope_lv': {'opt2': '2'}})
+        for extra_specs, expected in (
+                ({'opt1': '1'}, True),
+                ({'capabilities:opt1': '1'}, True),
+                ({'capabilities:scope_lv:opt2': '2'}, True),
+                ({'capabilities:opt1:opt2': '2'}, False),
+                ({'capabilities:opt3': '3'}, False),
+                ({'opt1': '2'}, False),
+                ({'trust:trusted_host': 'true'}, True),
+                ({}, True)):
+            filter_properties = {'resource_type': {'name': 'fake_type',
+                                                   'extra_specs':
+                                                   extra_specs}}
+            self.assertEqual(expected,
+                             self.filt_cls.host_passes(pool,
+                                                       filter_properties),
+                             extra_specs)
+
+    def test_capabilities_filter_compiles_once_per_volume_type(self):
+        capabilities = dict(('opt%d' % i, '%d' % i) for i in xrange(40))
+        extra_specs = dict(('capabilities:opt%d' % i, '>= %d' % i)
+                           for i in xrange(40))
+        pools = [self._pool('pool%d' % i, capabilities) for i in xrange(1000)]
+        resource_type = {'id': 'fake_type_id', 'updated_at': None,
+                         'extra_specs': extra_specs}
+        filter_properties = {'resource_type': resource_type}
+
+        with mock.patch.object(capabilities_filter, 'compile_extra_specs',
+                               wraps=capabilities_filter.compile_extra_specs
+                               ) as compile_specs:
+            passed = self.filt_cls.filter_all(pools, filter_properties)
+            self.assertEqual(1000, len(list(passed)))
+            self.assertEqual(1, compile_specs.call_count)
+
+            # A new scheduling request for the same type reuses the cache
+            passed = self.filt_cls.filter_all(pools, filter_properties)
+            self.assertEqual(1000, len(list(passed)))
+            self.assertEqual(1, compile_specs.call_count)
+
+            # Setting an extra spec does not touch the volume type's
+            # updated_at, the new specs are compiled anyway
+            resource_type = dict(resource_type,
+                                 extra_specs=dict(extra_specs,
+                                                  **{'capabilities:opt1':
+                                                     '2'}))
+            passed = self.filt_cls.filter_all(
+                pools, {'resource_type': resource_type})
+            self.assertEqual([], list(passed))
+            self.assertEqual(2, compile_specs.call_count)
+
+    def test_compiled_extra_specs_cache_is_bounded(self):
+        self.stubs.Set(capabilities_filter, '_COMPILED_EXTRA_SPECS_SIZE', 2)
+        for i in xrange(3):
+            capabilities_filter.get_compiled_extra_specs(
+                {'extra_specs': {'opt1': '%d' % i}})
+
+        self.assertEqual([frozenset([('opt1', '1')]),
+                          frozenset([('opt1', '2')])],
+                         capabilities_filter._compiled_extra_specs.keys())
@@ -16,6 +16,8 @@
 Tests For HostManager
 """
 
+import datetime
+
 import mock
 from oslo.config import cfg
 
@@ -116,10 +118,106 @@ class HostManagerTestCase(test.TestCase):
                     'host3': host3_volume_capabs}
         self.assertDictMatch(service_states, expected)
 
+    def test_update_service_capabilities_delta(self):
+        capabilities = {'free_capacity_gb': 100, 'QoS_support': False,
+                        'pools': [{'pool_name': 'pool1',
+                                   'free_capacity_gb': 60},
+                                  {'pool_name': 'pool2',
+                                   'free_capacity_gb': 40}]}
+        self.assertTrue(self.host_manager.update_service_capabilities(
+            'volume', 'host1', capabilities, version=1))
+
+        delta = {'changed': {'free_capacity_gb': 90}, 'removed': [],
+                 'pools': {'changed': [{'pool_name': 'pool2',
+                                        'free_capacity_gb': 30}],
+                           'removed': []}}
+        self.assertTrue(self.host_manager.update_service_capabilities(
+            'volume', 'host1', {}, version=2, delta=delta))
+
+        state = self.host_manager.service_states['host1']
+        self.assertEqual(90, state['free_capacity_gb'])
+        self.assertFalse(state['QoS_support'])
+        self.assertEqual([{'pool_name': 'pool1', 'free_capacity_gb': 60},
+                          {'pool_name': 'pool2', 'free_capacity_gb': 30}],
+                         state['pools'])
+        # The reported pools were not modified
+        self.assertEqual(40, capabilities['pools'][1]['free_capacity_gb'])
+
+    @mock.patch('cinder.db.volume_count_get_all_by_host')
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_update_service_capabilities_delta_after_consume(
+            self, _mock_service_is_up, _mock_service_get_all_by_topic,
+            _mock_volume_count_get_all_by_host):
+        context = 'fake_context'
+        _mock_service_get_all_by_topic.return_value = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow())]
+        _mock_service_is_up.return_value = True
+        _mock_volume_count_get_all_by_host.return_value = {}
+        capabilities = {'volume_backend_name': 'AAA',
+                        'pools': [{'pool_name': 'pool1',
+                                   'total_capacity_gb': 100,
+                                   'free_capacity_gb': 60,
+                                   'reserved_percentage': 0},
+                                  {'pool_name': 'pool2',
+                                   'total_capacity_gb': 100,
+                                   'free_capacity_gb': 40,
+                                   'reserved_percentage': 0}]}
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1', capabilities, version=1)
+        pools = dict((p.pool_name, p) for p in
+                     self.host_manager.get_all_host_states(context))
+        pools['pool1'].consume_from_volume({'size': 10})
+        self.assertEqual(50, pools['pool1'].free_capacity_gb)
+
+        # A delta leaving pool1 unchanged still resets its consumed space
+        delta = {'changed': {}, 'removed': [],
+                 'pools': {'changed': [{'pool_name': 'pool2',
+                                        'total_capacity_gb': 100,
+                                        'free_capacity_gb': 30,
+                                        'reserved_percentage': 0}],
+                           'removed': []}}
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1', {}, version=2, delta=delta)
+        pools = dict((p.pool_name, p) for p in
+                     self.host_manager.get_all_host_states(context))
+        self.assertEqual(60, pools['pool1'].free_capacity_gb)
+        self.assertEqual(30, pools['pool2'].free_capacity_gb)
+
+    def test_update_service_capabilities_missed_delta(self):
+        delta = {'changed': {'free_capacity_gb': 90}, 'removed': []}
+
+        # Nothing is known about host1 yet, e.g. after a scheduler restart
+        self.assertFalse(self.host_manager.update_service_capabilities(
+            'volume', 'host1', {}, version=5, delta=delta))
+        self.assertNotIn('host1', self.host_manager.service_states)
+
+        self.assertTrue(self.host_manager.update_service_capabilities(
+            'volume', 'host1', {'free_capacity_gb': 100}, version=6))
+        # Version 7 was lost
+        self.assertFalse(self.host_manager.update_service_capabilities(
+            'volume', 'host1', {}, version=8, delta=delta))
+        self.assertEqual(
+            100,
+            self.host_manager.service_states['host1']['free_capacity_gb'])
+        # Deltas are refused until the next full report
+        self.assertFalse(self.host_manager.update_service_capabilities(
+            'volume', 'host1', {}, version=9, delta=delta))
+        self.assertTrue(self.host_manager.update_service_capabilities(
+            'volume', 'host1', {'free_capacity_gb': 80}, version=10))
+        self.assertTrue(self.host_manager.update_service_capabilities(
+            'volume', 'host1', {}, version=11, delta=delta))
+        self.assertEqual(
+            90,
+            self.host_manager.service_states['host1']['free_capacity_gb'])
+
+    @mock.patch('cinder.db.volume_count_get_all_by_host')
     @mock.patch('cinder.db.service_get_all_by_topic')
     @mock.patch('cinder.utils.service_is_up')
     def test_get_all_host_states(self, _mock_service_is_up,
-                                 _mock_service_get_all_by_topic):
+                                 _mock_service_get_all_by_topic,
+                                 _mock_volume_count_get_all_by_host):
         context = 'fake_context'
         topic = CONF.volume_topic
 
@@ -188,10 +286,143 @@ class HostManagerTestCase(test.TestCase):
             self.assertEqual(host_state_map[host].service,
                              volume_node)
 
+    @mock.patch('cinder.db.volume_count_get_all_by_host')
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_get_all_host_states_volume_counts(
+            self, _mock_service_is_up, _mock_service_get_all_by_topic,
+            _mock_volume_count_get_all_by_host):
+        context = 'fake_context'
+
+        services = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+            dict(id=2, host='host2', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+        ]
+        _mock_service_get_all_by_topic.return_value = services
+        _mock_service_is_up.return_value = True
+        _mock_volume_count_get_all_by_host.return_value = {
+            'host1#AAA': 3, 'host1': 7}
+        self.host_manager.service_states = {
+            'host1': dict(volume_backend_name='AAA',
+                          total_capacity_gb=512, free_capacity_gb=200,
+                          timestamp=timeutils.utcnow(),
+                          reserved_percentage=0),
+            'host2': dict(volume_backend_name='BBB',
+                          total_capacity_gb=256, free_capacity_gb=100,
+                          timestamp=timeutils.utcnow(),
+                          reserved_percentage=0),
+        }
+
+        # Counts are seeded per pool from one grouped query
+        pools = dict((p.host, p) for p in
+                     self.host_manager.get_all_host_states(context))
+        _mock_volume_count_get_all_by_host.assert_called_once_with(context)
+        self.assertEqual(3, pools['host1#AAA'].volume_count)
+        self.assertEqual(0, pools['host2#BBB'].volume_count)
+
+        # Consumed volumes are tracked without going back to the database
+        pools['host1#AAA'].consume_from_volume({'size': 1})
+        pools = dict((p.host, p) for p in
+                     self.host_manager.get_all_host_states(context))
+        self.assertEqual(1, _mock_volume_count_get_all_by_host.call_count)
+        self.assertEqual(4, pools['host1#AAA'].volume_count)
+
+        # A capability report triggers a reload from the database
+        self.host_manager.update_service_capabilities(
+            'volume', 'host2', dict(volume_backend_name='BBB',
+                                    total_capacity_gb=256,
+                                    free_capacity_gb=100,
+                                    reserved_percentage=0))
+        pools = dict((p.host, p) for p in
+                     self.host_manager.get_all_host_states(context))
+        self.assertEqual(2, _mock_volume_count_get_all_by_host.call_count)
+        self.assertEqual(3, pools['host1#AAA'].volume_count)
+
+    @mock.patch('cinder.db.volume_count_get_all_by_host')
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_get_all_host_states_incremental(
+            self, _mock_service_is_up, _mock_service_get_all_by_topic,
+            _mock_volume_count_get_all_by_host):
+        context = 'fake_context'
+        services = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+            dict(id=2, host='host2', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+        ]
+        _mock_service_get_all_by_topic.return_value = services
+        _mock_service_is_up.return_value = True
+
+        with mock.patch.object(host_manager.HostState,
+                               'update_from_volume_capability') as update:
+            self.host_manager.get_all_host_states(context)
+            self.assertEqual(2, update.call_count)
+
+            # Nothing changed, nothing is re-derived
+            update.reset_mock()
+            self.host_manager.get_all_host_states(context)
+            self.assertFalse(update.called)
+
+            # Only the host with a new capability report is re-derived
+            self.host_manager.update_service_capabilities(
+                'volume', 'host1', {'free_capacity_gb': 100})
+            self.host_manager.get_all_host_states(context)
+            self.assertEqual(1, update.call_count)
+            self.assertEqual('host1',
+                             update.call_args[1]['service']['host'])
+
+            # A service heartbeat alone does not re-derive the host state
+            update.reset_mock()
+            services[1] = dict(services[1], updated_at=timeutils.utcnow() +
+                               datetime.timedelta(seconds=1))
+            self.host_manager.get_all_host_states(context)
+            self.assertFalse(update.called)
+
+            # Only the host whose service record changed is re-derived
+            services[1] = dict(services[1], availability_zone='zone2')
+            self.host_manager.get_all_host_states(context)
+            self.assertEqual(1, update.call_count)
+            self.assertEqual('zone2',
+                             update.call_args[1]['service'][
+                                 'availability_zone'])
+
+    @mock.patch('cinder.db.volume_count_get_all_by_host')
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_get_all_host_states_service_list_cache_ttl(
+            self, _mock_service_is_up, _mock_service_get_all_by_topic,
+            _mock_volume_count_get_all_by_host):
+        context = 'fake_context'
+        _mock_service_get_all_by_topic.return_value = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow())]
+        _mock_service_is_up.return_value = True
+
+        # Without a TTL the service list is read on every call
+        self.host_manager.get_all_host_states(context)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(2, _mock_service_get_all_by_topic.call_count)
+
+        self.flags(scheduler_service_list_cache_ttl=10)
+        _mock_service_get_all_by_topic.reset_mock()
+        self.host_manager.get_all_host_states(context)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(1, _mock_service_get_all_by_topic.call_count)
+
+        with mock.patch.object(timeutils, 'is_older_than',
+                               return_value=True):
+            self.host_manager.get_all_host_states(context)
+        self.assertEqual(2, _mock_service_get_all_by_topic.call_count)
+
+    @mock.patch('cinder.db.volume_count_get_all_by_host')
     @mock.patch('cinder.db.service_get_all_by_topic')
     @mock.patch('cinder.utils.service_is_up')
     def test_get_pools(self, _mock_service_is_up,
-                       _mock_service_get_all_by_topic):
+                       _mock_service_get_all_by_topic,
+                       _mock_volume_count_get_all_by_host):
         context = 'fake_context'
 
         services = [
@@ -84,6 +84,17 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  capabilities='fake_capabilities',
                                  fanout=True)
 
+    def test_update_service_capabilities_delta(self):
+        self._test_scheduler_api('update_service_capabilities',
+                                 rpc_method='cast',
+                                 service_name='fake_name',
+                                 host='fake_host',
+                                 capabilities=None,
+                                 capabilities_version=2,
+                                 capabilities_delta='fake_delta',
+                                 fanout=True,
+                                 version='1.9')
+
     def test_create_volume(self):
         self._test_scheduler_api('create_volume',
                                  rpc_method='cast',
@@ -95,6 +106,14 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  filter_properties='filter_properties',
                                  version='1.2')
 
+    def test_create_volumes(self):
+        self._test_scheduler_api('create_volumes',
+                                 rpc_method='call',
+                                 topic='topic',
+                                 request_spec_list=['fake_request_spec'],
+                                 filter_properties='filter_properties',
+                                 version='1.8')
+
     def test_migrate_volume_to_host(self):
         self._test_scheduler_api('migrate_volume_to_host',
                                  rpc_method='cast',
@@ -69,7 +69,8 @@ class SchedulerManagerTestCase(test.TestCase):
         self.manager.update_service_capabilities(self.context,
                                                  service_name=service,
                                                  host=host)
-        _mock_update_cap.assert_called_once_with(service, host, {})
+        _mock_update_cap.assert_called_once_with(service, host, {},
+                                                 version=None, delta=None)
 
     @mock.patch('cinder.scheduler.driver.Scheduler.'
                 'update_service_capabilities')
@@ -83,7 +84,28 @@ class SchedulerManagerTestCase(test.TestCase):
                                                  service_name=service,
                                                  host=host,
                                                  capabilities=capabilities)
-        _mock_update_cap.assert_called_once_with(service, host, capabilities)
+        _mock_update_cap.assert_called_once_with(service, host, capabilities,
+                                                 version=None, delta=None)
+
+    @mock.patch('cinder.volume.rpcapi.VolumeAPI.'
+                'publish_service_capabilities')
+    @mock.patch('cinder.scheduler.driver.Scheduler.'
+                'update_service_capabilities')
+    def test_update_service_capabilities_missed_delta(self, _mock_update_cap,
+                                                      _mock_publish):
+        # A delta that cannot be applied requests a full report
+        _mock_update_cap.return_value = False
+
+        self.manager.update_service_capabilities(self.context,
+                                                 service_name='volume',
+                                                 host='fake_host',
+                                                 capabilities_version=3,
+                                                 capabilities_delta={})
+        _mock_update_cap.assert_called_once_with('volume', 'fake_host', {},
+                                                 version=3, delta={})
+        _mock_publish.assert_called_once_with(self.context,
+                                              host='fake_host',
+                                              full_sync=True)
 
     @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volume')
     @mock.patch('cinder.db.volume_update')
@@ -105,6 +127,23 @@ class SchedulerManagerTestCase(test.TestCase):
         _mock_sched_create.assert_called_once_with(self.context, request_spec,
                                                    {})
 
+    @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volumes')
+    @mock.patch('cinder.db.volume_update')
+    def test_create_volumes_puts_unplaced_volumes_in_error_state(
+            self, _mock_volume_update, _mock_sched_create):
+        _mock_sched_create.return_value = ['host1', None]
+        topic = 'fake_topic'
+        request_spec_list = [{'volume_id': 1}, {'volume_id': 2}]
+
+        hosts = self.manager.create_volumes(self.context, topic,
+                                            request_spec_list,
+                                            filter_properties={})
+        self.assertEqual(['host1', None], hosts)
+        _mock_volume_update.assert_called_once_with(self.context, 2,
+                                                    {'status': 'error'})
+        _mock_sched_create.assert_called_once_with(self.context,
+                                                   request_spec_list, {})
+
     @mock.patch('cinder.scheduler.driver.Scheduler.host_passes_filters')
     @mock.patch('cinder.db.volume_update')
     def test_migrate_volume_exception_returns_volume_state(
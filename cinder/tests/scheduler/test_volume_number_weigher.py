@@ -30,20 +30,12 @@ from cinder.volume import utils
 CONF = cfg.CONF
 
 
-def fake_volume_data_get_for_host(context, host, count_only=False):
-    host = utils.extract_host(host)
-    if host == 'host1':
-        return 1
-    elif host == 'host2':
-        return 2
-    elif host == 'host3':
-        return 3
-    elif host == 'host4':
-        return 4
-    elif host == 'host5':
-        return 5
-    else:
-        return 6
+def fake_volume_count_get_all_by_host(context):
+    return {'host1#lvm1': 1,
+            'host2#lvm2': 2,
+            'host3#lvm3': 3,
+            'host4#lvm4': 4,
+            'host5#_pool0': 5}
 
 
 class VolumeNumberWeigherTestCase(test.TestCase):
@@ -60,6 +52,8 @@ class VolumeNumberWeigherTestCase(test.TestCase):
                                                        hosts,
                                                        weight_properties)[0]
 
+    @mock.patch('cinder.db.sqlalchemy.api.volume_count_get_all_by_host',
+                fake_volume_count_get_all_by_host)
     @mock.patch('cinder.db.sqlalchemy.api.service_get_all_by_topic')
     def _get_all_hosts(self, _mock_service_get_all_by_topic, disabled=False):
         ctxt = context.get_admin_context()
@@ -80,12 +74,10 @@ class VolumeNumberWeigherTestCase(test.TestCase):
         # host4: 4 volumes
         # host5: 5 volumes
         # so, host1 should win:
-        with mock.patch.object(api, 'volume_data_get_for_host',
-                               fake_volume_data_get_for_host):
-            weighed_host = self._get_weighed_host(hostinfo_list)
-            self.assertEqual(weighed_host.weight, -1.0)
-            self.assertEqual(utils.extract_host(weighed_host.obj.host),
-                             'host1')
+        weighed_host = self._get_weighed_host(hostinfo_list)
+        self.assertEqual(weighed_host.weight, -1.0)
+        self.assertEqual(utils.extract_host(weighed_host.obj.host),
+                         'host1')
 
     def test_volume_number_weight_multiplier2(self):
         self.flags(volume_number_multiplier=1.0)
@@ -97,9 +89,23 @@ class VolumeNumberWeigherTestCase(test.TestCase):
         # host4: 4 volumes
         # host5: 5 volumes
         # so, host5 should win:
-        with mock.patch.object(api, 'volume_data_get_for_host',
-                               fake_volume_data_get_for_host):
+        weighed_host = self._get_weighed_host(hostinfo_list)
+        self.assertEqual(weighed_host.weight, 5.0)
+        self.assertEqual(utils.extract_host(weighed_host.obj.host),
+                         'host5')
+
+    def test_volume_number_weight_consumed_volume(self):
+        self.flags(volume_number_multiplier=-1.0)
+        hostinfo_list = list(self._get_all_hosts())
+
+        # host1 goes from 1 to 3 volumes, so host2 should win and no
+        # per-host count query should be issued:
+        host1 = [h for h in hostinfo_list
+                 if utils.extract_host(h.host) == 'host1'][0]
+        host1.consume_from_volume({'size': 1})
+        host1.consume_from_volume({'size': 1})
+        with mock.patch.object(api, 'volume_data_get_for_host') as count:
             weighed_host = self._get_weighed_host(hostinfo_list)
-            self.assertEqual(weighed_host.weight, 5.0)
-            self.assertEqual(utils.extract_host(weighed_host.obj.host),
-                             'host5')
+            self.assertFalse(count.called)
+        self.assertEqual(utils.extract_host(weighed_host.obj.host),
+                         'host2')
@@ -19,6 +19,7 @@ Tests for Backup code.
 
 import tempfile
 
+import eventlet
 import mock
 from oslo.config import cfg
 
@@ -32,6 +33,7 @@ from cinder.openstack.common import timeutils
 from cinder import test
 from cinder.tests.backup.fake_service_with_verify import\
     get_backup_driver
+from cinder.tests import fake_notifier
 
 
 CONF = cfg.CONF
@@ -213,6 +215,57 @@ class BackupTestCase(BaseBackupTest):
         self.assertEqual(backup['size'], vol_size)
         self.assertTrue(_mock_volume_backup.called)
 
+    @mock.patch('%s.%s' % (CONF.volume_driver, 'backup_volume'))
+    def test_create_backup_concurrency_limit(self, _mock_volume_backup):
+        """Test backups beyond the concurrency limit are queued."""
+        self.flags(backup_max_concurrent_operations=1)
+        running = []
+        max_running = []
+        capabilities = []
+
+        def fake_backup_volume(context, backup, backup_service):
+            running.append(backup['id'])
+            max_running.append(len(running))
+            capabilities.append(self.backup_mgr.operation_stats)
+            eventlet.sleep(0.01)
+            running.remove(backup['id'])
+
+        _mock_volume_backup.side_effect = fake_backup_volume
+        backup_ids = [self._create_backup_db_entry(
+                      volume_id=self._create_volume_db_entry())
+                      for i in xrange(3)]
+
+        pool = eventlet.GreenPool()
+        for backup_id in backup_ids:
+            pool.spawn(self.backup_mgr.create_backup, self.ctxt, backup_id)
+        pool.waitall()
+
+        self.assertEqual(3, _mock_volume_backup.call_count)
+        self.assertEqual(1, max(max_running))
+        # The second backup ran while the third one waited for it.
+        self.assertEqual(1, capabilities[1]['in_flight_operations'])
+        self.assertEqual(1, capabilities[1]['queued_operations'])
+        self.assertEqual({'default': {'in_flight_operations': 1,
+                                      'queued_operations': 1}},
+                         capabilities[1]['backends'])
+        self.assertEqual(0,
+                         self.backup_mgr.operation_stats[
+                             'in_flight_operations'])
+        for backup_id in backup_ids:
+            backup = db.backup_get(self.ctxt, backup_id)
+            self.assertEqual('available', backup['status'])
+
+        fake_notifier.reset()
+        self.backup_mgr._notify_operation_stats(self.ctxt)
+        self.assertEqual(1, len(fake_notifier.NOTIFICATIONS))
+        msg = fake_notifier.NOTIFICATIONS[0]
+        self.assertEqual('backup.operations', msg['event_type'])
+        self.assertEqual({'queued_operations': 0, 'in_flight_operations': 0,
+                          'backends': {'default': {
+                              'queued_operations': 0,
+                              'in_flight_operations': 0}}},
+                         msg['payload'])
+
     def test_restore_backup_with_bad_volume_status(self):
         """Test error handling when restoring a backup to a volume
         with a bad status.
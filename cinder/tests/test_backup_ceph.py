@@ -346,6 +346,55 @@ class BackupCephTestCase(test.TestCase):
             # Ensure the files are equal
             self.assertEqual(checksum.digest(), self.checksum.digest())
 
+    @common_mocks
+    def test_transfer_data_skips_zero_chunks(self):
+        self.service.chunk_size = self.chunk_size
+        data = ''.join(['\0' * self.chunk_size,
+                        'x' * self.chunk_size,
+                        '\0' * self.chunk_size,
+                        'y' * (self.chunk_size / 2)])
+        length = len(data)
+
+        with tempfile.NamedTemporaryFile() as src_file:
+            src_file.write(data)
+
+            # A new image reads back as zeroes, zero chunks are skipped.
+            image = mock.Mock(write=mock.Mock(), discard=mock.Mock())
+            src_file.seek(0)
+            skipped = self.service._transfer_data(
+                src_file, 'src_foo', self._get_wrapped_rbd_io(image),
+                'dest_foo', length, dest_zeroed=True)
+            self.assertEqual(2 * self.chunk_size, skipped)
+            self.assertEqual([mock.call('x' * self.chunk_size,
+                                        self.chunk_size),
+                              mock.call('y' * (self.chunk_size / 2),
+                                        3 * self.chunk_size)],
+                             image.write.call_args_list)
+            self.assertFalse(image.discard.called)
+
+            # An existing image gets the zero chunks discarded.
+            image = mock.Mock(write=mock.Mock(), discard=mock.Mock())
+            src_file.seek(0)
+            skipped = self.service._transfer_data(
+                src_file, 'src_foo', self._get_wrapped_rbd_io(image),
+                'dest_foo', length)
+            self.assertEqual(2 * self.chunk_size, skipped)
+            self.assertEqual(2, image.write.call_count)
+            self.assertEqual([mock.call(0, self.chunk_size),
+                              mock.call(2 * self.chunk_size,
+                                        self.chunk_size)],
+                             image.discard.call_args_list)
+
+            # Files get the zeroes written.
+            with tempfile.NamedTemporaryFile() as test_file:
+                src_file.seek(0)
+                skipped = self.service._transfer_data(src_file, 'src_foo',
+                                                      test_file, 'dest_foo',
+                                                      length)
+                self.assertEqual(0, skipped)
+                test_file.seek(0)
+                self.assertEqual(data, test_file.read())
+
     @common_mocks
     def test_transfer_data_from_file_to_file(self):
         with tempfile.NamedTemporaryFile() as test_file:
@@ -383,6 +432,8 @@ class BackupCephTestCase(test.TestCase):
                     self.assertEqual(checksum.digest(), self.checksum.digest())
 
         self.assertTrue(self.service.rbd.Image.write.called)
+        backup = db.backup_get(self.ctxt, self.backup_id)
+        self.assertEqual(0, backup['skipped_zero_bytes'])
 
     @common_mocks
     def test_get_backup_base_name(self):
@@ -1000,7 +1051,8 @@ class BackupCephTestCase(test.TestCase):
             with mock.patch.object(self.service, '_get_volume_size_gb'):
                 with mock.patch.object(self.service, '_file_is_rbd',
                                        return_value=False):
-                    with mock.patch.object(self.service, '_full_backup'):
+                    with mock.patch.object(self.service, '_full_backup',
+                                           return_value=0):
                         with mock.patch.object(self.service, 'delete') as \
                                 mock_delete:
                             self.assertRaises(exception.BackupOperationError,
@@ -21,8 +21,11 @@ import bz2
 import hashlib
 import os
 import tempfile
+import time
 import zlib
 
+import eventlet
+import mock
 from oslo.config import cfg
 from swiftclient import client as swift
 
@@ -31,9 +34,12 @@ from cinder import context
 from cinder import db
 from cinder import exception
 from cinder.i18n import _
+from cinder.openstack.common import importutils
 from cinder.openstack.common import log as logging
 from cinder import test
 from cinder.tests.backup.fake_swift_client import FakeSwiftClient
+from cinder.tests.backup.fake_swift_client import FakeSwiftConnection
+from cinder.tests.backup.fake_swift_client import FakeSwiftObjectStore
 
 
 LOG = logging.getLogger(__name__)
@@ -136,6 +142,270 @@ class BackupSwiftTestCase(test.TestCase):
         backup = db.backup_get(self.ctxt, 123)
         service.backup(backup, self.volume_file)
 
+    def _backup_object_list(self, backup):
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        # Object names embed the time the backup started, pin it so that
+        # lists from different backups compare equal.
+        with mock.patch.object(service, '_generate_swift_object_name_prefix',
+                               return_value='backup_prefix'):
+            with mock.patch.object(service,
+                                   '_write_metadata') as write_metadata:
+                service.backup(backup, self.volume_file)
+        return write_metadata.call_args[0][3]
+
+    def test_backup_pipelined(self):
+        self._create_backup_db_entry()
+        self.flags(backup_compression_algorithm='zlib',
+                   backup_swift_object_size=8 * 1024)
+        backup = db.backup_get(self.ctxt, 123)
+        serial_objects = self._backup_object_list(backup)
+        self.assertEqual(16, len(serial_objects))
+
+        self.flags(backup_swift_upload_concurrency=4,
+                   backup_swift_read_ahead=2)
+        in_flight = []
+        max_in_flight = []
+        put_object = FakeSwiftConnection().put_object
+
+        def fake_put_object(conn, *args, **kwargs):
+            # Simulate the latency of a remote object store
+            self.assertNotIn(conn, in_flight)
+            in_flight.append(conn)
+            max_in_flight.append(len(in_flight))
+            eventlet.sleep(0.01)
+            in_flight.remove(conn)
+            return put_object(*args, **kwargs)
+
+        with mock.patch.object(FakeSwiftConnection, 'put_object',
+                               autospec=True, side_effect=fake_put_object):
+            pipelined_objects = self._backup_object_list(backup)
+
+        # Uploads overlapped on connections of their own, bounded by the
+        # configured concurrency, and the objects are recorded in volume
+        # order as in a serial backup.
+        self.assertEqual(4, max(max_in_flight))
+        self.assertEqual(serial_objects, pipelined_objects)
+
+    def test_backup_pipelined_put_object_wraps_socket_error(self):
+        self._create_backup_db_entry(container='socket_error_on_put')
+        self.flags(backup_swift_object_size=8 * 1024,
+                   backup_swift_upload_concurrency=4)
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 123)
+        self.assertRaises(exception.SwiftConnectionFailed,
+                          service.backup,
+                          backup, self.volume_file)
+
+    def _backup_incremental(self):
+        """Back up the volume, change a chunk and back it up again."""
+        store = FakeSwiftObjectStore()
+        self.stubs.Set(swift, 'Connection', lambda *args, **kwargs: store)
+        db.backup_create(self.ctxt, {'id': 123,
+                                     'size': 1,
+                                     'container': 'test-container',
+                                     'volume_id': '1234-5678-1234-8888'})
+        db.backup_create(self.ctxt, {'id': 456,
+                                     'size': 1,
+                                     'container': 'test-container',
+                                     'volume_id': '1234-5678-1234-8888',
+                                     'parent_id': 123})
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        service.backup(db.backup_get(self.ctxt, 123), self.volume_file)
+        self.volume_file.seek(0)
+        full_data = self.volume_file.read()
+
+        self.volume_file.seek(3 * 8 * 1024 + 100)
+        self.volume_file.write(os.urandom(100))
+        self.volume_file.seek(0)
+        incremental_data = self.volume_file.read()
+        self.volume_file.seek(0)
+        service.backup(db.backup_get(self.ctxt, 456), self.volume_file)
+        return store, service, full_data, incremental_data
+
+    def _check_backup_incremental(self, store, service, full_data,
+                                  incremental_data):
+        backup = db.backup_get(self.ctxt, 456)
+        metadata = service._read_metadata(backup)
+        self.assertEqual('123', metadata['parent_id'])
+        self.assertEqual(16, len(metadata['sha256s']))
+        self.assertEqual([3 * 8 * 1024],
+                         [obj.values()[0]['offset']
+                          for obj in metadata['objects']])
+        self.assertEqual(1, len(service._generate_object_names(backup)) - 1)
+
+        for backup_id, data in ((123, full_data), (456, incremental_data)):
+            with tempfile.NamedTemporaryFile() as volume_file:
+                service.restore(db.backup_get(self.ctxt, backup_id),
+                                '1234-5678-1234-8888', volume_file)
+                volume_file.seek(0)
+                self.assertEqual(data, volume_file.read())
+
+    def test_backup_incremental(self):
+        self.flags(backup_swift_object_size=8 * 1024)
+        self._check_backup_incremental(*self._backup_incremental())
+
+    def test_backup_incremental_pipelined(self):
+        self.flags(backup_swift_object_size=8 * 1024,
+                   backup_swift_upload_concurrency=4,
+                   backup_swift_restore_prefetch=4)
+        self._check_backup_incremental(*self._backup_incremental())
+
+    def test_backup_incremental_chunk_size_changed(self):
+        self.flags(backup_swift_object_size=8 * 1024)
+        store, service, full_data, incremental_data = \
+            self._backup_incremental()
+        # Digests of chunks of another size cannot be compared, all the
+        # chunks are backed up and the backup does not depend on its parent.
+        self.flags(backup_swift_object_size=16 * 1024)
+        db.backup_create(self.ctxt, {'id': 789,
+                                     'size': 1,
+                                     'container': 'test-container',
+                                     'volume_id': '1234-5678-1234-8888',
+                                     'parent_id': 456})
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 789)
+        service.backup(backup, self.volume_file)
+        metadata = service._read_metadata(backup)
+        self.assertIsNone(metadata['parent_id'])
+        self.assertEqual(8, len(metadata['objects']))
+
+    def test_backup_zero_chunks(self):
+        store = FakeSwiftObjectStore()
+        self.stubs.Set(swift, 'Connection', lambda *args, **kwargs: store)
+        self.flags(backup_swift_object_size=8 * 1024)
+        self._create_backup_db_entry()
+        for chunk in (2, 5):
+            self.volume_file.seek(chunk * 8 * 1024)
+            self.volume_file.write('\0' * 8 * 1024)
+        self.volume_file.seek(0)
+        data = self.volume_file.read()
+
+        service = SwiftBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = db.backup_get(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+
+        metadata = service._read_metadata(backup)
+        self.assertEqual([{'offset': 2 * 8 * 1024, 'length': 8 * 1024},
+                          {'offset': 5 * 8 * 1024, 'length': 8 * 1024}],
+                         metadata['holes'])
+        self.assertEqual(14, len(metadata['objects']))
+        backup = db.backup_get(self.ctxt, 123)
+        self.assertEqual(2 * 8 * 1024, backup['skipped_zero_bytes'])
+
+        with tempfile.NamedTemporaryFile() as volume_file:
+            service.restore(backup, '1234-5678-1234-8888', volume_file)
+            volume_file.seek(0)
+            self.assertEqual(data, volume_file.read())
+
+        # RBD volumes get the holes discarded rather than written.
+        rbd_file = mock.Mock(rbd_image=mock.Mock(discard=mock.Mock()),
+                             tell=mock.Mock(return_value=2 * 8 * 1024),
+                             seek=mock.Mock(), write=mock.Mock())
+        service._write_hole(rbd_file, 8 * 1024)
+        rbd_file.rbd_image.discard.assert_called_once_with(2 * 8 * 1024,
+                                                           8 * 1024)
+        rbd_file.seek.assert_called_once_with(8 * 1024, os.SEEK_CUR)
+        self.assertFalse(rbd_file.write.called)
+
+    def _backup_and_restore(self, backup_id, data):
+        """Back data up to an in memory store and restore it."""
+        store = FakeSwiftObjectStore()
+        self.stubs.Set(swift, 'Connection', lambda *args, **kwargs: store)
+        db.backup_create(self.ctxt, {'id': backup_id,
+                                     'size': 1,
+                                     'container': 'test-container',
+                                     'volume_id': '1234-5678-1234-8888'})
+        backup = db.backup_get(self.ctxt, backup_id)
+        service = SwiftBackupDriver(self.ctxt)
+        with tempfile.NamedTemporaryFile() as volume_file:
+            volume_file.write(data)
+            volume_file.seek(0)
+            service.backup(backup, volume_file)
+        with tempfile.NamedTemporaryFile() as volume_file:
+            service.restore(backup, '1234-5678-1234-8888', volume_file)
+            volume_file.seek(0)
+            self.assertEqual(data, volume_file.read())
+        return service._read_metadata(backup)
+
+    def test_backup_codecs(self):
+        # Synthetic volume data: random, repetitive and empty blocks.
+        data = ''.join([os.urandom(32 * 1024),
+                        'volume data ' * 4096,
+                        '\0' * 16 * 1024,
+                        os.urandom(16 * 1024)])
+        self.flags(backup_swift_object_size=8 * 1024)
+        algorithms = ['none', 'zlib', 'bz2']
+        for optional in ('lz4', 'snappy'):
+            try:
+                __import__(optional)
+            except ImportError:
+                continue
+            algorithms.append(optional)
+
+        for backup_id, algorithm in enumerate(algorithms, 100):
+            self.flags(backup_compression_algorithm=algorithm)
+            start = time.time()
+            metadata = self._backup_and_restore(backup_id, data)
+            LOG.debug('%(algorithm)s: %(rate)d KiB/s backup and restore',
+                      {'algorithm': algorithm,
+                       'rate': len(data) / 1024 / (time.time() - start)})
+            self.assertEqual(set([algorithm]),
+                             set(obj.values()[0]['compression']
+                                 for obj in metadata['objects']))
+
+    def test_backup_compressor_import_path(self):
+        data = 'volume data ' * 4096
+        self.flags(backup_swift_object_size=8 * 1024,
+                   backup_compression_algorithm='fake.Compressor')
+        imported = []
+        import_module = importutils.import_module
+
+        def fake_import_module(name):
+            if name.lower() != 'fake.compressor':
+                return import_module(name)
+            imported.append(name)
+            return zlib
+
+        with mock.patch('cinder.openstack.common.importutils.import_module',
+                        side_effect=fake_import_module):
+            metadata = self._backup_and_restore(100, data)
+
+        self.assertEqual(set(['fake.Compressor']),
+                         set(obj.values()[0]['compression']
+                             for obj in metadata['objects']))
+        # Imported for the backup and the restore, with the case kept
+        self.assertEqual(set(['fake.Compressor']), set(imported))
+        self.assertTrue(len(imported) > 1)
+
+    def test_backup_compression_min_ratio(self):
+        data = os.urandom(64 * 1024) + 'volume data ' * 5461 + '\0' * 4
+        self.flags(backup_swift_object_size=8 * 1024,
+                   backup_compression_algorithm='zlib',
+                   backup_compression_min_ratio=2)
+        metadata = self._backup_and_restore(123, data)
+        # Random chunks are stored as they are, the others compressed.
+        self.assertEqual(['none'] * 8 + ['zlib'] * 8,
+                         [obj.values()[0]['compression']
+                          for obj in metadata['objects']])
+
+    def test_backup_object_checksum_none(self):
+        self.flags(backup_swift_object_size=8 * 1024,
+                   backup_swift_object_checksum='none')
+        metadata = self._backup_and_restore(123, os.urandom(64 * 1024))
+        self.assertEqual(8, len(metadata['objects']))
+        for obj in metadata['objects']:
+            self.assertNotIn('md5', obj.values()[0])
+
+    def test_backup_object_checksum_invalid(self):
+        self.flags(backup_swift_object_checksum='crc32')
+        self.assertRaises(exception.BackupDriverException,
+                          SwiftBackupDriver, self.ctxt)
+
     def test_backup_default_container(self):
         self._create_backup_db_entry(container=None)
         service = SwiftBackupDriver(self.ctxt)
@@ -229,6 +499,46 @@ class BackupSwiftTestCase(test.TestCase):
             backup = db.backup_get(self.ctxt, 123)
             service.restore(backup, '1234-5678-1234-8888', volume_file)
 
+    @mock.patch('os.fsync')
+    def test_restore_prefetch(self, _mock_fsync):
+        self._create_backup_db_entry()
+        self.flags(backup_swift_restore_prefetch=3,
+                   backup_swift_restore_fsync_interval=4)
+        service = SwiftBackupDriver(self.ctxt)
+        backup = db.backup_get(self.ctxt, 123)
+        object_names = ['backup_%03d' % i for i in xrange(6)]
+        metadata = {'objects': [{name: {'compression': 'zlib'}}
+                                for name in object_names]}
+        in_flight = []
+        max_in_flight = []
+
+        def fake_get_object(conn, container, name):
+            # Later objects come back first, they must still be written in
+            # volume order.
+            self.assertNotIn(conn, in_flight)
+            in_flight.append(conn)
+            max_in_flight.append(len(in_flight))
+            eventlet.sleep(0.01 * (6 - object_names.index(name)))
+            in_flight.remove(conn)
+            return None, zlib.compress(name * 1024)
+
+        with mock.patch.object(service, '_generate_object_names',
+                               return_value=object_names):
+            with mock.patch.object(FakeSwiftConnection, 'get_object',
+                                   autospec=True,
+                                   side_effect=fake_get_object):
+                with tempfile.NamedTemporaryFile() as volume_file:
+                    service._restore_v1(backup, '1234-5678-1234-8888',
+                                        metadata, volume_file)
+                    volume_file.seek(0)
+                    restored = volume_file.read()
+
+        self.assertEqual(''.join(name * 1024 for name in object_names),
+                         restored)
+        self.assertEqual(3, max(max_in_flight))
+        # Synced after the 4th object and at the end of the restore
+        self.assertEqual(2, _mock_fsync.call_count)
+
     def test_restore_wraps_socket_error(self):
         container_name = 'socket_error_on_get'
         self._create_backup_db_entry(container=container_name)
@@ -275,3 +585,10 @@ class BackupSwiftTestCase(test.TestCase):
         compressor = service._get_compressor('bz2')
         self.assertEqual(compressor, bz2)
         self.assertRaises(ValueError, service._get_compressor, 'fake')
+        with mock.patch('cinder.openstack.common.importutils.import_module',
+                        return_value=zlib) as import_module:
+            compressor = service._get_compressor('fake.compressor')
+        self.assertEqual(compressor, zlib)
+        import_module.assert_called_once_with('fake.compressor')
+        self.assertRaises(ValueError, service._get_compressor,
+                          'fake.missing_compressor')
@@ -182,7 +182,7 @@ class TestBlockDeviceDriver(cinder.test.TestCase):
         self.mox.StubOutWithMock(api, 'volume_get_all_by_host')
         self.mox.StubOutWithMock(context, 'get_admin_context')
         context.get_admin_context()
-        api.volume_get_all_by_host(None, self.host) \
+        api.volume_get_all_by_host(None, self.host, load_strategy='noload') \
             .AndReturn([TEST_VOLUME1, TEST_VOLUME2])
         self.mox.StubOutWithMock(self.drv, 'local_path')
         path1 = self.drv.local_path(TEST_VOLUME1).AndReturn('/dev/loop1')
@@ -16,9 +16,14 @@
 
 import time
 
+import mock
+
 from cinder import context
+from cinder import exception
+from cinder.openstack.common import units
 from cinder import test
 from cinder.volume.flows.api import create_volume
+from cinder.volume.flows.manager import create_volume as create_volume_manager
 
 
 class fake_scheduler_rpc_api(object):
@@ -114,3 +119,220 @@ class CreateVolumeFlowTestCase(test.TestCase):
             fake_db())
 
         task._cast_create_volume(self.ctxt, spec, props)
+
+
+class CreateVolumeFromImageCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(CreateVolumeFromImageCacheTestCase, self).setUp()
+        self.ctxt = context.RequestContext('user', 'project')
+        self.internal_ctxt = context.RequestContext('internal_user',
+                                                    'internal_project',
+                                                    is_admin=True)
+        self.db = mock.Mock()
+        self.driver = mock.Mock()
+        self.driver.clone_image.return_value = (None, False)
+        self.driver.create_volume.return_value = None
+        self.driver.create_cloned_volume.return_value = None
+        self.cache = mock.Mock()
+        self.task = create_volume_manager.CreateVolumeFromSpecTask(
+            self.db, self.driver, self.cache)
+        self.volume = {'id': 'volume', 'host': 'host@lvm#pool', 'size': 1,
+                       'availability_zone': 'nova', 'volume_type_id': None}
+        self.db.volume_update.return_value = self.volume
+        self.image_meta = {'checksum': 'checksum'}
+
+        patcher = mock.patch.object(context, 'get_internal_tenant_context',
+                                    return_value=self.internal_ctxt)
+        self.mock_internal_context = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(create_volume_manager, 'QUOTAS')
+        self.quotas = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.stubs.Set(self.task, '_copy_image_to_volume', mock.Mock())
+        self.stubs.Set(self.task, '_handle_bootable_volume_glance_meta',
+                       mock.Mock())
+
+    def _create_from_image(self):
+        return self.task._create_from_image(self.ctxt, self.volume,
+                                            'location', 'image',
+                                            self.image_meta, mock.Mock())
+
+    def _volume_update(self, ctxt, volume_id, values):
+        volume = self.volume if volume_id == 'volume' else {'id': volume_id}
+        volume.update(values)
+        return volume
+
+    def test_create_from_image_cache_hit(self):
+        self.cache.get_entry.return_value = {'volume_id': 'image_volume',
+                                             'size': 1}
+        self.driver.create_cloned_volume.return_value = {'key': 'value'}
+
+        self.assertEqual({'key': 'value'}, self._create_from_image())
+        self.cache.get_entry.assert_called_once_with(
+            self.ctxt, self.volume, 'image', self.image_meta)
+        # The image volume of the internal tenant is read as an admin
+        admin_ctxt = self.db.volume_get.call_args[0][0]
+        self.assertTrue(admin_ctxt.is_admin)
+        self.db.volume_get.assert_called_once_with(admin_ctxt, 'image_volume')
+        self.driver.create_cloned_volume.assert_called_once_with(
+            self.volume, self.db.volume_get.return_value)
+        self.assertFalse(self.driver.extend_volume.called)
+        self.assertFalse(self.driver.create_volume.called)
+        self.assertFalse(self.task._copy_image_to_volume.called)
+        self.assertFalse(self.cache.create_cache_entry.called)
+
+    def test_create_from_image_cache_hit_extend(self):
+        self.cache.get_entry.return_value = {'volume_id': 'image_volume',
+                                             'size': 1}
+        self.volume['size'] = 3
+
+        self._create_from_image()
+        self.assertTrue(self.driver.create_cloned_volume.called)
+        self.driver.extend_volume.assert_called_once_with(self.volume, 3)
+
+    def test_create_from_image_cache_hit_extend_not_supported(self):
+        self.cache.get_entry.return_value = {'volume_id': 'image_volume',
+                                             'size': 1}
+        self.volume['size'] = 3
+        self.driver.extend_volume.side_effect = NotImplementedError()
+
+        # The image is downloaded instead
+        self._create_from_image()
+        self.driver.delete_volume.assert_called_once_with(self.volume)
+        self.driver.create_volume.assert_called_once_with(self.volume)
+        self.assertTrue(self.task._copy_image_to_volume.called)
+        self.assertFalse(self.cache.create_cache_entry.called)
+
+    def test_create_from_image_cache_larger_than_volume(self):
+        self.cache.get_entry.return_value = {'volume_id': 'image_volume',
+                                             'size': 2}
+
+        self._create_from_image()
+        self.assertFalse(self.driver.create_cloned_volume.called)
+        self.driver.create_volume.assert_called_once_with(self.volume)
+        self.assertTrue(self.task._copy_image_to_volume.called)
+        # The image is cached already, only not in a volume small enough
+        self.cache.get_entry.assert_called_once_with(
+            self.ctxt, self.volume, 'image', self.image_meta)
+        self.assertFalse(self.cache.ensure_space.called)
+        self.assertFalse(self.cache.create_cache_entry.called)
+
+    def test_create_from_image_cache_miss(self):
+        self.cache.get_entry.return_value = None
+        image_volume = {'id': 'image_volume'}
+        self.db.volume_create.return_value = image_volume
+        self.db.volume_update.side_effect = [self.volume, image_volume]
+
+        self._create_from_image()
+        self.driver.create_volume.assert_called_once_with(self.volume)
+        self.assertTrue(self.task._copy_image_to_volume.called)
+        self.cache.ensure_space.assert_called_once_with(self.ctxt, 1,
+                                                        'host@lvm')
+        volume_values = self.db.volume_create.call_args[0][1]
+        self.assertEqual('internal_project', volume_values['project_id'])
+        self.assertEqual('host@lvm#pool', volume_values['host'])
+        self.driver.create_cloned_volume.assert_called_once_with(
+            image_volume, self.volume)
+        self.quotas.commit.assert_called_once_with(
+            self.internal_ctxt, self.quotas.reserve.return_value)
+        self.cache.create_cache_entry.assert_called_once_with(
+            self.ctxt, image_volume, 'image', self.image_meta)
+        self.assertFalse(self.driver.extend_volume.called)
+
+    def test_create_from_image_cache_miss_image_size(self):
+        self.cache.get_entry.return_value = None
+        self.db.volume_create.return_value = {'id': 'image_volume'}
+        self.db.volume_update.side_effect = self._volume_update
+        self.image_meta.update(disk_format='raw', size=units.Gi + 1)
+        self.volume['size'] = 5
+
+        def _create_cloned_volume(volume, src_vref):
+            # The image volume is only as large as the image
+            self.assertEqual(2, src_vref['size'])
+
+        self.driver.create_cloned_volume.side_effect = _create_cloned_volume
+
+        self._create_from_image()
+        self.assertTrue(self.driver.create_cloned_volume.called)
+        self.assertEqual(2, self.db.volume_create.call_args[0][1]['size'])
+        self.driver.extend_volume.assert_called_once_with(self.volume, 5)
+        self.assertEqual(5, self.volume['size'])
+
+    def test_create_from_image_cache_miss_copy_failure(self):
+        self.cache.get_entry.return_value = None
+        self.db.volume_update.side_effect = self._volume_update
+        self.image_meta.update(disk_format='raw', size=units.Gi)
+        self.volume['size'] = 5
+        self.task._copy_image_to_volume.side_effect = (
+            exception.ImageCopyFailure(reason='fake'))
+        sizes = []
+        self.driver.create_volume.side_effect = (
+            lambda volume: sizes.append(volume['size']))
+
+        self.assertRaises(exception.ImageCopyFailure, self._create_from_image)
+        self.assertEqual([1], sizes)
+        # The volume keeps the requested size
+        self.assertEqual(5, self.volume['size'])
+        self.assertFalse(self.cache.create_cache_entry.called)
+
+    def test_create_from_image_cache_miss_extend_not_supported(self):
+        self.cache.get_entry.return_value = None
+        self.db.volume_create.return_value = {'id': 'image_volume'}
+        self.db.volume_update.side_effect = self._volume_update
+        self.image_meta.update(disk_format='raw', size=units.Gi)
+        self.volume['size'] = 5
+        self.driver.extend_volume.side_effect = NotImplementedError()
+        sizes = []
+        self.driver.create_volume.side_effect = (
+            lambda volume: sizes.append(volume['size']))
+
+        # The image is downloaded again to a volume of the requested size
+        self._create_from_image()
+        self.assertTrue(self.cache.create_cache_entry.called)
+        self.driver.delete_volume.assert_called_once_with(self.volume)
+        self.assertEqual([1, 5], sizes)
+        self.assertEqual(2, self.task._copy_image_to_volume.call_count)
+        self.assertEqual(5, self.volume['size'])
+
+    def test_create_from_image_cache_miss_concurrent(self):
+        # Another volume cached the image while this one was created
+        self.cache.get_entry.side_effect = [None,
+                                            {'volume_id': 'image_volume',
+                                             'size': 1}]
+
+        self._create_from_image()
+        self.assertTrue(self.task._copy_image_to_volume.called)
+        self.assertEqual(2, self.cache.get_entry.call_count)
+        self.assertFalse(self.cache.ensure_space.called)
+        self.assertFalse(self.db.volume_create.called)
+        self.assertFalse(self.cache.create_cache_entry.called)
+
+    def test_create_from_image_cache_entry_failure(self):
+        self.cache.get_entry.return_value = None
+        self.db.volume_create.return_value = {'id': 'image_volume'}
+        self.driver.create_cloned_volume.side_effect = NotImplementedError()
+
+        # The volume is created even if the image can not be cached
+        self._create_from_image()
+        self.assertTrue(self.task._copy_image_to_volume.called)
+        self.quotas.rollback.assert_called_once_with(
+            self.internal_ctxt, self.quotas.reserve.return_value)
+        self.db.volume_destroy.assert_called_once_with(self.internal_ctxt,
+                                                       'image_volume')
+        self.assertFalse(self.cache.create_cache_entry.called)
+
+    def test_create_from_image_no_internal_tenant(self):
+        self.mock_internal_context.return_value = None
+
+        self._create_from_image()
+        self.assertFalse(self.cache.get_entry.called)
+        self.assertTrue(self.task._copy_image_to_volume.called)
+        self.assertFalse(self.cache.ensure_space.called)
+
+    def test_create_from_image_no_checksum(self):
+        self.image_meta = {}
+
+        self._create_from_image()
+        self.assertFalse(self.mock_internal_context.called)
+        self.assertFalse(self.cache.get_entry.called)
@@ -16,11 +16,13 @@
 
 import datetime
 
+import mock
 from oslo.config import cfg
 
 from cinder import context
 from cinder import db
 from cinder import exception
+from cinder.openstack.common import timeutils
 from cinder.openstack.common import uuidutils
 from cinder.quota import ReservableResource
 from cinder import test
@@ -304,6 +306,16 @@ class DBAPIVolumeTestCase(BaseTest):
                              db.volume_data_get_for_host(
                                  self.ctxt, 'h%d' % i))
 
+    def test_volume_count_get_all_by_host(self):
+        for i in xrange(3):
+            for j in xrange(i + 1):
+                db.volume_create(self.ctxt, {'host': 'h%d#pool' % i})
+        db.volume_create(self.ctxt, {'host': None})
+        deleted = db.volume_create(self.ctxt, {'host': 'h0#pool'})
+        db.volume_destroy(self.ctxt, deleted['id'])
+        self.assertEqual({'h0#pool': 1, 'h1#pool': 2, 'h2#pool': 3},
+                         db.volume_count_get_all_by_host(self.ctxt))
+
     def test_volume_data_get_for_project(self):
         for i in xrange(3):
             for j in xrange(3):
@@ -370,6 +382,83 @@ class DBAPIVolumeTestCase(BaseTest):
         self._assertEqualListsOfObjects(volumes[2:], db.volume_get_all(
                                         self.ctxt, 2, 2, 'id', None))
 
+    def test_volume_get_all_marker_not_reloaded(self):
+        volumes = [db.volume_create(self.ctxt, {'id': i})
+                   for i in xrange(1, 5)]
+
+        with mock.patch('cinder.db.sqlalchemy.api._volume_get') as mock_get:
+            result = db.volume_get_all(self.ctxt, 2, 2, 'id', None)
+            self.assertFalse(mock_get.called)
+        self._assertEqualListsOfObjects(volumes[2:], result)
+
+    def test_volume_get_all_marker_not_found(self):
+        db.volume_create(self.ctxt, {'id': 1})
+        self.assertRaises(exception.VolumeNotFound, db.volume_get_all,
+                          self.ctxt, 2, 2, 'id', None)
+
+    def test_volume_get_all_keyset_marker(self):
+        volumes = [db.volume_create(self.ctxt, {'id': i,
+                                                'host': 'h%d' % (i % 2)})
+                   for i in xrange(1, 5)]
+        marker = {'host': volumes[1]['host'],
+                  'created_at': volumes[1]['created_at'],
+                  'id': volumes[1]['id']}
+
+        result = db.volume_get_all(self.ctxt, marker, None, 'host', 'asc')
+        self.assertEqual(['4', '1', '3'], [vol['id'] for vol in result])
+
+    def test_volume_get_all_keyset_marker_missing_keys(self):
+        self.assertRaises(exception.InvalidInput, db.volume_get_all,
+                          self.ctxt, {'id': 1}, None, 'host', 'asc')
+
+    def test_volume_get_all_offset(self):
+        for i in xrange(1, 6):
+            db.volume_create(self.ctxt, {'id': str(i), 'host': 'h%d' % i,
+                                         'project_id': 'project',
+                                         'metadata': {'a': str(i)}})
+
+        result = db.volume_get_all(self.ctxt, None, 2, 'host', 'asc',
+                                   offset=1)
+        self.assertEqual(['2', '3'], [vol['id'] for vol in result])
+        self.assertEqual({'a': '3'}, dict((m.key, m.value)
+                                          for m in result[1].volume_metadata))
+
+        result = db.volume_get_all_by_project(self.ctxt, 'project', '1',
+                                              None, 'host', 'asc', offset=2)
+        self.assertEqual(['4', '5'], [vol['id'] for vol in result])
+
+    def test_volume_get_all_load_strategies(self):
+        db.volume_create(self.ctxt, {'metadata': {'a': '1', 'b': '2'},
+                                     'host': 'h1'})
+        db.volume_create(self.ctxt, {'metadata': {'c': '3'}, 'host': 'h1'})
+
+        joined = db.volume_get_all(self.ctxt, None, None, 'created_at',
+                                   'asc', load_strategy='joined')
+        subquery = db.volume_get_all(self.ctxt, None, None, 'created_at',
+                                     'asc', load_strategy='subquery')
+        by_host = db.volume_get_all_by_host(self.ctxt, 'h1')
+        for result in (subquery, by_host):
+            self.assertEqual(len(joined), len(result))
+            for vol1, vol2 in zip(joined, result):
+                self.assertEqual(
+                    dict((m.key, m.value) for m in vol1.volume_metadata),
+                    dict((m.key, m.value) for m in vol2.volume_metadata))
+
+    def test_volume_get_all_noload(self):
+        volume = db.volume_create(self.ctxt, {'metadata': {'a': '1'},
+                                              'host': 'h1'})
+
+        result = db.volume_get_all_by_host(self.ctxt, 'h1',
+                                           load_strategy='noload')
+        self.assertEqual([volume['id']], [vol['id'] for vol in result])
+        self.assertEqual([], result[0]['volume_metadata'])
+        self.assertIsNone(result[0]['volume_type'])
+
+    def test_volume_get_all_invalid_load_strategy(self):
+        self.assertRaises(exception.InvalidInput, db.volume_get_all,
+                          self.ctxt, None, None, 'created_at', 'asc',
+                          load_strategy='bogus')
+
     def test_volume_get_all_by_host(self):
         volumes = []
         for i in xrange(3):
@@ -741,6 +830,61 @@ class DBAPISnapshotTestCase(BaseTest):
                                         db.snapshot_get_all(self.ctxt),
                                         ignored_keys=['metadata', 'volume'])
 
+    def test_snapshot_get_all_by_filter(self):
+        db.volume_create(self.ctxt, {'id': 1})
+        db.volume_create(self.ctxt, {'id': 2})
+        db.snapshot_create(self.ctxt, {'id': 1, 'volume_id': 1,
+                                       'status': 'available',
+                                       'project_id': 'p1'})
+        db.snapshot_create(self.ctxt, {'id': 2, 'volume_id': 1,
+                                       'status': 'creating',
+                                       'project_id': 'p1'})
+        db.snapshot_create(self.ctxt, {'id': 3, 'volume_id': 2,
+                                       'status': 'available',
+                                       'project_id': 'p2'})
+
+        def _ids(filters, project_id=None):
+            if project_id:
+                result = db.snapshot_get_all_by_project(self.ctxt, project_id,
+                                                        filters=filters)
+            else:
+                result = db.snapshot_get_all(self.ctxt, filters=filters)
+            return sorted(snapshot['id'] for snapshot in result)
+
+        self.assertEqual(['1', '3'], _ids({'status': 'available'}))
+        self.assertEqual(['1'], _ids({'status': 'available'}, 'p1'))
+        self.assertEqual(['1', '2'], _ids({'volume_id': '1'}))
+        self.assertEqual(['2'], _ids({'volume_id': '1',
+                                      'status': 'creating'}))
+        self.assertEqual([], _ids({'status': 'error'}))
+        # Unknown and relationship keys do not match anything
+        self.assertEqual([], _ids({'bogus': 'foo'}))
+        self.assertEqual([], _ids({'volume': 'foo'}, 'p1'))
+
+    def test_snapshot_get_all_paginated(self):
+        db.volume_create(self.ctxt, {'id': 1})
+        for i in xrange(1, 6):
+            db.snapshot_create(self.ctxt, {'id': i, 'volume_id': 1,
+                                           'project_id': 'p1'})
+
+        result = db.snapshot_get_all(self.ctxt, limit=2, sort_key='id',
+                                     sort_dir='asc')
+        self.assertEqual(['1', '2'], [snapshot['id'] for snapshot in result])
+
+        result = db.snapshot_get_all_by_project(self.ctxt, 'p1', marker='2',
+                                                limit=2, sort_key='id',
+                                                sort_dir='asc')
+        self.assertEqual(['3', '4'], [snapshot['id'] for snapshot in result])
+
+        result = db.snapshot_get_all(self.ctxt, marker='3', sort_key='id',
+                                     sort_dir='desc')
+        self.assertEqual(['2', '1'], [snapshot['id'] for snapshot in result])
+
+        self.assertRaises(exception.SnapshotNotFound, db.snapshot_get_all,
+                          self.ctxt, marker='42')
+        self.assertRaises(exception.InvalidInput, db.snapshot_get_all,
+                          self.ctxt, sort_key='bogus')
+
     def test_snapshot_metadata_get(self):
         metadata = {'a': 'b', 'c': 'd'}
         db.volume_create(self.ctxt, {'id': 1})
@@ -1174,7 +1318,9 @@ class DBAPIBackupTestCase(BaseTest):
             'service_metadata': 'metadata',
             'service': 'service',
             'size': 1000,
-            'object_count': 100}
+            'object_count': 100,
+            'skipped_zero_bytes': 0,
+            'parent_id': 'parent'}
         if one:
             return base_values
 
@@ -1224,6 +1370,28 @@ class DBAPIBackupTestCase(BaseTest):
                                               self.created[1]['project_id'])
         self._assertEqualObjects(self.created[1], byproj[0])
 
+    def test_backup_get_all_paginated(self):
+        created_at = datetime.datetime(2014, 1, 1)
+        backups = []
+        for i in range(4):
+            values = self._get_values(one=True)
+            values['created_at'] = created_at + datetime.timedelta(hours=i)
+            values['project_id'] = 'paginated'
+            backups.append(db.backup_create(self.ctxt, values))
+
+        result = db.backup_get_all(self.ctxt,
+                                   filters={'project_id': 'paginated'},
+                                   limit=2, offset=1)
+        self._assertEqualListsOfObjects(backups[1:3], result)
+
+        result = db.backup_get_all_by_project(self.ctxt, 'paginated',
+                                              marker=backups[0]['id'],
+                                              limit=1, offset=1)
+        self._assertEqualListsOfObjects(backups[2:3], result)
+
+        self.assertRaises(exception.BackupNotFound,
+                          db.backup_get_all, self.ctxt, marker='notinbase')
+
     def test_backup_update_nonexistent(self):
         self.assertRaises(exception.BackupNotFound,
                           db.backup_update,
@@ -1245,3 +1413,57 @@ class DBAPIBackupTestCase(BaseTest):
     def test_backup_not_found(self):
         self.assertRaises(exception.BackupNotFound, db.backup_get, self.ctxt,
                           'notinbase')
+
+
+class DBAPIImageVolumeCacheTestCase(BaseTest):
+
+    """Tests for db.api.image_volume_cache_* methods."""
+
+    def _create(self, image_id, host='host1@lvm#pool', volume_id=None,
+                size=1):
+        return db.image_volume_cache_create(self.ctxt, host, image_id,
+                                            'checksum', volume_id or image_id,
+                                            size)
+
+    def test_image_volume_cache_get_and_update_last_used(self):
+        entry = self._create('image1')
+        self.assertIsNone(db.image_volume_cache_get_and_update_last_used(
+            self.ctxt, 'image1', 'host2@lvm#pool'))
+        self.assertIsNone(db.image_volume_cache_get_and_update_last_used(
+            self.ctxt, 'image2', 'host1@lvm#pool'))
+
+        later = entry['last_used'] + datetime.timedelta(minutes=1)
+        with mock.patch.object(timeutils, 'utcnow', return_value=later):
+            result = db.image_volume_cache_get_and_update_last_used(
+                self.ctxt, 'image1', 'host1@lvm#pool')
+        self.assertEqual(entry['id'], result['id'])
+        self.assertEqual('checksum', result['image_checksum'])
+        self.assertEqual(later, result['last_used'])
+
+    def test_image_volume_cache_get_all_for_host(self):
+        entries = [self._create('image1'),
+                   self._create('image2', host='host1@lvm#pool2'),
+                   self._create('image3', host='host1@lvm')]
+        self._create('image4', host='host1@lvm2#pool')
+        for i, entry in enumerate(entries):
+            last_used = entry['last_used'] + datetime.timedelta(minutes=i)
+            with mock.patch.object(timeutils, 'utcnow',
+                                   return_value=last_used):
+                db.image_volume_cache_get_and_update_last_used(
+                    self.ctxt, entry['image_id'], entry['host'])
+
+        result = db.image_volume_cache_get_all_for_host(self.ctxt,
+                                                        'host1@lvm')
+        self.assertEqual(['image3', 'image2', 'image1'],
+                         [entry['image_id'] for entry in result])
+
+    def test_image_volume_cache_delete(self):
+        self._create('image1', volume_id='volume1')
+        self.assertEqual('image1', db.image_volume_cache_get_by_volume_id(
+            self.ctxt, 'volume1')['image_id'])
+
+        db.image_volume_cache_delete(self.ctxt, 'volume1')
+        self.assertIsNone(db.image_volume_cache_get_by_volume_id(
+            self.ctxt, 'volume1'))
+        self.assertIsNone(db.image_volume_cache_get_and_update_last_used(
+            self.ctxt, 'image1', 'host1@lvm#pool'))
@@ -16,6 +16,7 @@
 import os
 import re
 
+import eventlet
 import mock
 
 from cinder import exception
@@ -2728,6 +2729,7 @@ class EMCVNXCLIToggleSPTestCase(test.TestCase):
         self.configuration.iscsi_initiators = '{"fakehost": ["10.0.0.2"]}'
         self.configuration.zoning_mode = None
         self.configuration.storage_vnx_security_file_dir = ""
+        self.configuration.naviseccli_query_cache_ttl = 0
         self.cli_client = emc_vnx_cli.CommandLineHelper(
             configuration=self.configuration)
         self.test_data = EMCVNXCLIToggleSPTestData()
@@ -2835,3 +2837,160 @@ Unable to establish a secure connection to the Management Server.
                         + FAKE_COMMAND),
                     check_exit_code=True)]
             mock_utils.assert_has_calls(expected)
+
+
+class EMCVNXCLIQueryCacheTestCase(test.TestCase):
+    def setUp(self):
+        super(EMCVNXCLIQueryCacheTestCase, self).setUp()
+        self.stubs.Set(CommandLineHelper, 'get_array_serial',
+                       mock.Mock(return_value={'array_serial':
+                                               'fakeSerial'}))
+        self.stubs.Set(CommandLineHelper, '_is_sp_alive',
+                       mock.Mock(return_value=True))
+        self.stubs.Set(os.path, 'exists', mock.Mock(return_value=1))
+
+        self.configuration = conf.Configuration(None)
+        self.configuration.append_config_values = mock.Mock(return_value=0)
+        self.configuration.naviseccli_path = '/opt/Navisphere/bin/naviseccli'
+        self.configuration.san_ip = '10.0.0.1'
+        self.configuration.storage_vnx_pool_name = 'unit_test_pool'
+        self.configuration.san_login = 'sysadmin'
+        self.configuration.san_password = 'sysadmin'
+        self.configuration.default_timeout = 0.0002
+        self.configuration.initiator_auto_registration = False
+        self.configuration.iscsi_initiators = '{"fakehost": ["10.0.0.2"]}'
+        self.testData = EMCVNXCLIDriverTestData()
+
+    def _fake_cli(self):
+        """Simulate the array for an attach of vol1 to fakehost."""
+        mapped = []
+
+        def _execute(*command, **kwargs):
+            if command == ('storagegroup', '-list', '-gname', 'fakehost'):
+                if mapped:
+                    return self.testData.STORAGE_GROUP_HAS_MAP('fakehost')
+                return self.testData.STORAGE_GROUP_NO_MAP('fakehost')
+            if command[:2] == ('storagegroup', '-addhlu'):
+                mapped.append(command)
+            elif command == self.testData.LUN_PROPERTY_ALL_CMD('vol1'):
+                return self.testData.LUN_PROPERTY('vol1')
+            elif command == self.testData.GETPORT_CMD():
+                return self.testData.ALL_PORTS
+            elif command == self.testData.PINGNODE_CMD('A', 4, 0,
+                                                       '10.0.0.2'):
+                return self.testData.PING_OK
+            return SUCCEED
+        return mock.Mock(side_effect=_execute)
+
+    def _attach(self, query_cache_ttl):
+        self.configuration.naviseccli_query_cache_ttl = query_cache_ttl
+        fake_cli = self._fake_cli()
+        self.stubs.Set(CommandLineHelper, '_command_execute_on_active_ip',
+                       fake_cli)
+        driver = EMCCLIISCSIDriver(configuration=self.configuration)
+        fake_cli.reset_mock()
+        connection_info = driver.initialize_connection(
+            self.testData.test_volume,
+            self.testData.connector)
+        self.assertEqual(self.testData.iscsi_connection_info_ro,
+                         connection_info)
+        return fake_cli
+
+    def test_attach_command_count(self):
+        uncached = self._attach(0)
+        cached = self._attach(60)
+
+        self.assertEqual(9, uncached.call_count)
+        self.assertEqual(6, cached.call_count)
+        # The storage group is listed again after the LUN was added to it.
+        self.assertEqual(
+            [mock.call('storagegroup', '-list', '-gname', 'fakehost')] * 2,
+            [c for c in cached.call_args_list
+             if c == mock.call('storagegroup', '-list', '-gname',
+                               'fakehost')])
+
+    def test_query_cache(self):
+        self.configuration.naviseccli_query_cache_ttl = 60
+        client = CommandLineHelper(self.configuration)
+        fake_cli = mock.Mock(return_value=SUCCEED)
+        client._command_execute_on_active_ip = fake_cli
+        lun_list = self.testData.LUN_PROPERTY_ALL_CMD('vol1')
+        sg_list = ('storagegroup', '-list', '-gname', 'fakehost')
+
+        with mock.patch('time.time', return_value=0):
+            client.command_execute(*lun_list)
+            client.command_execute(*sg_list)
+            client.command_execute(*lun_list)
+            client.command_execute(*sg_list)
+            self.assertEqual(2, fake_cli.call_count)
+
+            # Storage group changes only drop storage group output
+            client.command_execute('storagegroup', '-addhlu', '-hlu', 1,
+                                   '-alu', 1, '-gname', 'fakehost')
+            client.command_execute(*lun_list)
+            client.command_execute(*sg_list)
+            self.assertEqual(4, fake_cli.call_count)
+
+            # Other changes drop everything
+            client.command_execute(*self.testData.LUN_DELETE_CMD('vol1'))
+            client.command_execute(*lun_list)
+            client.command_execute(*sg_list)
+            self.assertEqual(7, fake_cli.call_count)
+
+            # Failed queries are not cached
+            fake_cli.return_value = FAKE_ERROR_RETURN
+            client.invalidate_query_cache()
+            client.command_execute(*lun_list)
+            fake_cli.return_value = SUCCEED
+            client.command_execute(*lun_list)
+            self.assertEqual(9, fake_cli.call_count)
+
+        with mock.patch('time.time', return_value=60):
+            client.command_execute(*lun_list)
+            self.assertEqual(10, fake_cli.call_count)
+
+    def test_query_cache_no_poll(self):
+        self.configuration.naviseccli_query_cache_ttl = 60
+        client = CommandLineHelper(self.configuration)
+        fake_cli = mock.Mock(return_value=SUCCEED)
+        client._command_execute_on_active_ip = fake_cli
+        sg_list = ('storagegroup', '-list', '-gname', 'fakehost')
+
+        # Polling and non polling queries are cached separately
+        client.command_execute(*sg_list)
+        client.command_execute('-np', *sg_list)
+        client.command_execute('-np', *sg_list)
+        self.assertEqual(2, fake_cli.call_count)
+
+        # Storage group changes drop the non polling output too
+        client.command_execute('storagegroup', '-addhlu', '-hlu', 1,
+                               '-alu', 1, '-gname', 'fakehost')
+        client.command_execute('-np', *sg_list)
+        self.assertEqual(4, fake_cli.call_count)
+
+    def test_query_cache_shares_running_queries(self):
+        self.configuration.naviseccli_query_cache_ttl = 60
+        client = CommandLineHelper(self.configuration)
+        lun_list = self.testData.LUN_PROPERTY_ALL_CMD('vol1')
+
+        def _execute(*command, **kwargv):
+            eventlet.sleep(0.01)
+            return SUCCEED
+        fake_cli = mock.Mock(side_effect=_execute)
+        client._command_execute_on_active_ip = fake_cli
+
+        pool = eventlet.GreenPool()
+        results = list(pool.imap(lambda i: client.command_execute(*lun_list),
+                                 xrange(3)))
+        self.assertEqual([SUCCEED] * 3, results)
+        self.assertEqual(1, fake_cli.call_count)
+
+        # Queries started after a change do not get the running output
+        client.invalidate_query_cache()
+        first = pool.spawn(client.command_execute, *lun_list)
+        eventlet.sleep(0)
+        client.invalidate_query_cache()
+        second = pool.spawn(client.command_execute, *lun_list)
+        self.assertEqual(SUCCEED, first.wait())
+        self.assertEqual(SUCCEED, second.wait())
+        self.assertEqual(3, fake_cli.call_count)
@@ -367,6 +367,7 @@ class HP3PARBaseDriver(object):
         configuration.hp3par_snapshot_retention = ""
         configuration.hp3par_iscsi_ips = []
         configuration.hp3par_iscsi_chap_enabled = False
+        configuration.hp3par_session_reuse = False
         return configuration
 
     @mock.patch(
@@ -1981,6 +1982,41 @@ class TestHP3PARFCDriver(HP3PARBaseDriver, test.TestCase):
         mock_client.reset_mock()
         return mock_client
 
+    def test_login_per_operation(self):
+        mock_client = self.setup_driver()
+        self.driver.delete_volume(self.volume)
+        self.driver.delete_volume(self.volume)
+
+        # One login for do_setup, and one for each delete.
+        self.assertEqual(3, self.driver.common.login_count)
+        self.assertEqual(2, mock_client.logout.call_count)
+
+    def test_session_reuse(self):
+        conf = self.setup_configuration()
+        conf.hp3par_session_reuse = True
+        mock_client = self.setup_mock_client(
+            conf=conf, driver=hpfcdriver.HP3PARFCDriver)
+        self.driver.delete_volume(self.volume)
+        self.driver.delete_volume(self.volume)
+
+        self.assertEqual(1, self.driver.common.login_count)
+        self.assertEqual(1, mock_client.login.call_count)
+        self.assertFalse(mock_client.logout.called)
+        self.assertEqual(2, mock_client.deleteVolume.call_count)
+
+    def test_session_reuse_expired(self):
+        conf = self.setup_configuration()
+        conf.hp3par_session_reuse = True
+        mock_client = self.setup_mock_client(
+            conf=conf, driver=hpfcdriver.HP3PARFCDriver)
+        mock_client.deleteVolume.side_effect = [
+            hpexceptions.HTTPUnauthorized, None]
+        self.driver.delete_volume(self.volume)
+
+        self.assertEqual(2, self.driver.common.login_count)
+        self.assertEqual(2, mock_client.deleteVolume.call_count)
+        self.assertFalse(mock_client.logout.called)
+
     def test_initialize_connection(self):
         # setup_mock_client drive with default configuration
         # and return the mock HTTP 3PAR client
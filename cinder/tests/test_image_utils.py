@@ -16,6 +16,8 @@
 """Unit tests for image utils."""
 
 import contextlib
+import hashlib
+import stat
 import tempfile
 
 import mock
@@ -24,6 +26,7 @@ from oslo.config import cfg
 
 from cinder import context
 from cinder import exception
+from cinder.image import file_cache
 from cinder.image import image_utils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import processutils
@@ -297,6 +300,42 @@ class TestUtils(test.TestCase):
                                  mox.IgnoreArg())
         self._mox.VerifyAll()
 
+    @mock.patch.object(image_utils, 'convert_image')
+    @mock.patch.object(image_utils, 'qemu_img_info')
+    @mock.patch.object(image_utils, 'fetch')
+    @mock.patch.object(file_cache, 'get_image_file_cache')
+    def test_fetch_to_raw_from_image_file_cache(self, mock_get_cache,
+                                                mock_fetch, mock_info,
+                                                mock_convert):
+        cache_path = '/cache/321-checksum'
+
+        @contextlib.contextmanager
+        def fake_get(image_id, checksum, fetch_func):
+            fetch_func(cache_path)
+            yield cache_path
+
+        mock_get_cache.return_value.get.side_effect = fake_get
+        mock_info.return_value = mock.Mock(virtual_size=units.Gi,
+                                           file_format='raw',
+                                           backing_file=None)
+        self.stubs.Set(self._image_service, 'show',
+                       lambda context, image_id: {'checksum': 'checksum',
+                                                  'disk_format': 'raw'})
+
+        image_utils.fetch_to_raw(context, self._image_service,
+                                 self.TEST_IMAGE_ID, self.TEST_DEV_PATH,
+                                 mox.IgnoreArg())
+
+        mock_get_cache.return_value.get.assert_called_once_with(
+            self.TEST_IMAGE_ID, 'checksum', mock.ANY)
+        mock_fetch.assert_called_once_with(context, self._image_service,
+                                           self.TEST_IMAGE_ID, cache_path,
+                                           None, None)
+        mock_info.assert_any_call(cache_path)
+        mock_convert.assert_called_once_with(
+            cache_path, self.TEST_DEV_PATH, 'raw',
+            bps_limit=CONF.volume_copy_bps_limit)
+
     def test_fetch_to_raw_no_qemu_img(self):
         self._test_fetch_to_raw(has_qemu=False)
 
@@ -722,3 +761,116 @@ class TestXenServerImageToCoalescedVhd(test.TestCase):
         mox.ReplayAll()
         image_utils.replace_xenserver_image_with_coalesced_vhd('image')
         mox.VerifyAll()
+
+
+class FakeRawImageService(object):
+    def __init__(self, data, checksum=None):
+        self.data = data
+        self.checksum = checksum or hashlib.md5(data).hexdigest()
+
+    def show(self, context, image_id):
+        return {'size': len(self.data),
+                'disk_format': 'raw',
+                'container_format': 'bare',
+                'checksum': self.checksum}
+
+    def download(self, context, image_id, data):
+        for i in range(0, len(self.data), 300):
+            data.write(self.data[i:i + 300])
+
+
+class TestStreamRawImage(test.TestCase):
+    TEST_IMAGE_ID = 321
+    TEST_DEV_PATH = '/dev/ether/fake_dev'
+
+    def setUp(self):
+        super(TestStreamRawImage, self).setUp()
+        self.flags(image_stream_raw=True)
+        self.written = []
+        self.process = mock.Mock(returncode=None)
+        self.process.stdin.write.side_effect = self.written.append
+
+        def fake_communicate():
+            if self.process.returncode is None:
+                self.process.returncode = 0
+            return ('', 'dd error')
+        self.process.communicate.side_effect = fake_communicate
+
+        patcher = mock.patch.object(image_utils.subprocess, 'Popen',
+                                    return_value=self.process)
+        self.mock_popen = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(image_utils.os, 'stat',
+                                    return_value=mock.Mock(
+                                        st_mode=stat.S_IFBLK))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(volume_utils,
+                                    'check_for_odirect_support',
+                                    return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(image_utils, 'qemu_img_info',
+                                    side_effect=processutils.
+                                    ProcessExecutionError())
+        self.mock_qemu_img_info = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fetch_to_raw(self, image_service, size=None):
+        image_utils.fetch_to_raw(context, image_service, self.TEST_IMAGE_ID,
+                                 self.TEST_DEV_PATH, '1M', size=size)
+
+    def test_stream(self):
+        data = 'x' * 1000
+        self._fetch_to_raw(FakeRawImageService(data), size=1)
+
+        cmd = self.mock_popen.call_args[0][0]
+        self.assertEqual(['dd', 'of=%s' % self.TEST_DEV_PATH, 'bs=1M',
+                          'iflag=fullblock', 'oflag=direct'], cmd[-5:])
+        self.assertEqual(data, ''.join(self.written))
+        # The first write holds the whole header
+        self.assertEqual(600, len(self.written[0]))
+        self.assertFalse(self.mock_qemu_img_info.called)
+
+    def test_stream_small_image(self):
+        self._fetch_to_raw(FakeRawImageService('x' * 10))
+        self.assertEqual(['x' * 10], self.written)
+
+    @mock.patch.object(volume_utils, 'copy_volume')
+    @mock.patch.object(image_utils, '_fetch_image')
+    def test_stream_not_raw(self, mock_fetch, mock_copy):
+        image_service = FakeRawImageService('QFI\xfb' + 'x' * 1000)
+        self._fetch_to_raw(image_service)
+
+        self.assertFalse(self.mock_popen.called)
+        # Fell back to fetching to a temporary file
+        self.assertTrue(mock_fetch.called)
+        self.assertTrue(mock_copy.called)
+
+    def test_stream_checksum_mismatch(self):
+        self.assertRaises(exception.ImageUnacceptable,
+                          self._fetch_to_raw,
+                          FakeRawImageService('x' * 1000, checksum='bad'))
+
+    def test_stream_too_large(self):
+        image_service = FakeRawImageService('x' * 1000)
+        with mock.patch.object(image_service, 'show',
+                               return_value=dict(image_service.show(None, 1),
+                                                 size=2 * units.Gi)):
+            self.assertRaises(exception.ImageUnacceptable,
+                              self._fetch_to_raw, image_service, size=1)
+        self.assertFalse(self.mock_popen.called)
+
+    def test_stream_dd_failure(self):
+        self.process.returncode = 1
+        self.assertRaises(processutils.ProcessExecutionError,
+                          self._fetch_to_raw, FakeRawImageService('x' * 1000))
+
+    @mock.patch.object(volume_utils, 'copy_volume')
+    @mock.patch.object(image_utils, '_fetch_image')
+    def test_stream_disabled(self, mock_fetch, mock_copy):
+        self.flags(image_stream_raw=False)
+        self._fetch_to_raw(FakeRawImageService('x' * 1000))
+
+        self.assertFalse(self.mock_popen.called)
+        self.assertTrue(mock_fetch.called)
@@ -1298,3 +1298,161 @@ class TestMigrations(test.TestCase):
                 execute().scalar()
 
             self.assertEqual(4, num_defaults)
+
+    def test_migration_027(self):
+        """Test adding volume listing indexes works correctly."""
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 26)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 27)
+            volumes = sqlalchemy.Table('volumes',
+                                       metadata,
+                                       autoload=True)
+            index_columns = dict((idx.name, idx.columns.keys())
+                                 for idx in volumes.indexes)
+
+            self.assertEqual(['project_id', 'deleted', 'created_at', 'id'],
+                             index_columns.get(
+                                 'volumes_project_deleted_created_id_idx'))
+            self.assertEqual(['host', 'deleted'],
+                             index_columns.get('volumes_host_deleted_idx'))
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 26)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            volumes = sqlalchemy.Table('volumes',
+                                       metadata,
+                                       autoload=True)
+            index_names = [idx.name for idx in volumes.indexes]
+            self.assertNotIn('volumes_project_deleted_created_id_idx',
+                             index_names)
+            self.assertNotIn('volumes_host_deleted_idx', index_names)
+
+    def test_migration_028(self):
+        """Test adding the snapshot listing index works correctly."""
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 27)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 28)
+            snapshots = sqlalchemy.Table('snapshots',
+                                         metadata,
+                                         autoload=True)
+            index_columns = []
+            for idx in snapshots.indexes:
+                if idx.name == 'snapshots_project_deleted_created_id_idx':
+                    index_columns = idx.columns.keys()
+                    break
+
+            self.assertEqual(['project_id', 'deleted', 'created_at', 'id'],
+                             index_columns)
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 27)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            snapshots = sqlalchemy.Table('snapshots',
+                                         metadata,
+                                         autoload=True)
+            index_names = [idx.name for idx in snapshots.indexes]
+            self.assertNotIn('snapshots_project_deleted_created_id_idx',
+                             index_names)
+
+    def test_migration_029(self):
+        """Test that adding parent_id column to backups works correctly."""
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 28)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 29)
+            backups = sqlalchemy.Table('backups',
+                                       metadata,
+                                       autoload=True)
+            self.assertIsInstance(backups.c.parent_id.type,
+                                  sqlalchemy.types.VARCHAR)
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 28)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            backups = sqlalchemy.Table('backups',
+                                       metadata,
+                                       autoload=True)
+            self.assertNotIn('parent_id', backups.c)
+
+    def test_migration_030(self):
+        """Test adding image_volume_cache_entries table works correctly."""
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 29)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 30)
+
+            self.assertTrue(engine.dialect.has_table(
+                engine.connect(), "image_volume_cache_entries"))
+            cache_entries = sqlalchemy.Table('image_volume_cache_entries',
+                                             metadata,
+                                             autoload=True)
+            self.assertIsInstance(cache_entries.c.id.type,
+                                  sqlalchemy.types.INTEGER)
+            self.assertIsInstance(cache_entries.c.host.type,
+                                  sqlalchemy.types.VARCHAR)
+            self.assertIsInstance(cache_entries.c.image_id.type,
+                                  sqlalchemy.types.VARCHAR)
+            self.assertIsInstance(cache_entries.c.image_checksum.type,
+                                  sqlalchemy.types.VARCHAR)
+            self.assertIsInstance(cache_entries.c.volume_id.type,
+                                  sqlalchemy.types.VARCHAR)
+            self.assertIsInstance(cache_entries.c.size.type,
+                                  sqlalchemy.types.INTEGER)
+            self.assertIsInstance(cache_entries.c.last_used.type,
+                                  self.time_type[engine.name])
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 29)
+
+            self.assertFalse(engine.dialect.has_table(
+                engine.connect(), "image_volume_cache_entries"))
+
+    def test_migration_031(self):
+        """Test adding skipped_zero_bytes column to backups works."""
+        for (key, engine) in self.engines.items():
+            migration_api.version_control(engine,
+                                          TestMigrations.REPOSITORY,
+                                          migration.db_initial_version())
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 30)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            migration_api.upgrade(engine, TestMigrations.REPOSITORY, 31)
+            backups = sqlalchemy.Table('backups',
+                                       metadata,
+                                       autoload=True)
+            self.assertIsInstance(backups.c.skipped_zero_bytes.type,
+                                  sqlalchemy.types.BIGINT)
+
+            migration_api.downgrade(engine, TestMigrations.REPOSITORY, 30)
+            metadata = sqlalchemy.schema.MetaData()
+            metadata.bind = engine
+
+            backups = sqlalchemy.Table('backups',
+                                       metadata,
+                                       autoload=True)
+            self.assertNotIn('skipped_zero_bytes', backups.c)
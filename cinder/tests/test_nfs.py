@@ -135,6 +135,7 @@ class NfsDriverTestCase(test.TestCase):
         self.configuration.nfs_oversub_ratio = 1.0
         self.configuration.nfs_mount_point_base = self.TEST_MNT_POINT_BASE
         self.configuration.nfs_mount_options = None
+        self.configuration.nfs_allocation_refresh_interval = 0
         self.configuration.volume_dd_blocksize = '1M'
         self._driver = nfs.NfsDriver(configuration=self.configuration)
         self._driver.shares = {}
@@ -267,6 +268,51 @@ class NfsDriverTestCase(test.TestCase):
 
         mox.VerifyAll()
 
+    def test_get_capacity_info_cached_allocated_space(self):
+        """du is only run again once nfs_allocation_refresh_interval passed."""
+        drv = self._driver
+        self.configuration.nfs_allocation_refresh_interval = 60
+        volume = {'name': 'volume-123', 'size': 2,
+                  'provider_location': self.TEST_NFS_EXPORT1}
+
+        def _execute(*cmd, **kwargs):
+            if cmd[0] == 'stat':
+                return '1 %d %d' % (10 * units.Gi, 8 * units.Gi), None
+            return '%d /mnt' % units.Gi, None
+
+        with mock.patch.object(drv, '_execute',
+                               side_effect=_execute) as mock_execute:
+            with mock.patch('cinder.volume.drivers.nfs.time') as mock_time:
+                mock_time.time.return_value = 0
+                self.assertEqual((10 * units.Gi, 8 * units.Gi, units.Gi),
+                                 drv._get_capacity_info(volume[
+                                     'provider_location']))
+
+                with mock.patch.object(remotefs.RemoteFSDriver,
+                                       '_do_create_volume'):
+                    drv._do_create_volume(volume)
+                mock_time.time.return_value = 30
+                self.assertEqual(3 * units.Gi,
+                                 drv._get_capacity_info(volume[
+                                     'provider_location'])[2])
+
+                with mock.patch.object(remotefs.RemoteFSDriver,
+                                       'delete_volume'):
+                    drv.delete_volume(volume)
+                self.assertEqual(units.Gi,
+                                 drv._get_capacity_info(volume[
+                                     'provider_location'])[2])
+
+                du_calls = [c for c in mock_execute.call_args_list
+                            if c[0][0] == 'du']
+                self.assertEqual(1, len(du_calls))
+
+                mock_time.time.return_value = 60
+                drv._get_capacity_info(volume['provider_location'])
+                du_calls = [c for c in mock_execute.call_args_list
+                            if c[0][0] == 'du']
+                self.assertEqual(2, len(du_calls))
+
     def test_load_shares_config(self):
         mox = self._mox
         drv = self._driver
@@ -416,12 +462,6 @@ class NfsDriverTestCase(test.TestCase):
         drv._get_capacity_info(self.TEST_NFS_EXPORT1).\
             AndReturn((5 * units.Gi, 2 * units.Gi,
                        2 * units.Gi))
-        drv._get_capacity_info(self.TEST_NFS_EXPORT1).\
-            AndReturn((5 * units.Gi, 2 * units.Gi,
-                       2 * units.Gi))
-        drv._get_capacity_info(self.TEST_NFS_EXPORT2).\
-            AndReturn((10 * units.Gi, 3 * units.Gi,
-                       1 * units.Gi))
         drv._get_capacity_info(self.TEST_NFS_EXPORT2).\
             AndReturn((10 * units.Gi, 3 * units.Gi,
                        1 * units.Gi))
@@ -101,6 +101,38 @@ def common_mocks(f):
     return _common_inner_inner1
 
 
+class FakeIoctx(object):
+    """Stands in for rados.Ioctx."""
+
+    def __init__(self, pool):
+        self.name = pool
+        self.state = 'open'
+
+    def close(self):
+        self.state = 'closed'
+
+
+class FakeRados(object):
+    """Stands in for rados.Rados, counting the cluster connections made."""
+
+    connections = 0
+    ioctxs_opened = 0
+
+    def __init__(self, rados_id=None, conffile=None):
+        self.state = 'configuring'
+
+    def connect(self, timeout=None):
+        FakeRados.connections += 1
+        self.state = 'connected'
+
+    def open_ioctx(self, pool):
+        FakeRados.ioctxs_opened += 1
+        return FakeIoctx(pool)
+
+    def shutdown(self):
+        self.state = 'shutdown'
+
+
 CEPH_MON_DUMP = """dumped monmap epoch 1
 { "epoch": 1,
   "fsid": "33630410-6d93-4d66-8e42-3b953cf194aa",
@@ -144,6 +176,8 @@ class RBDTestCase(test.TestCase):
         self.cfg.rbd_user = None
         self.cfg.volume_dd_blocksize = '1M'
         self.cfg.rbd_store_chunk_size = 4
+        self.cfg.rados_connect_timeout = -1
+        self.cfg.rados_connection_pool_size = 0
 
         mock_exec = mock.Mock()
         mock_exec.return_value = ('', '')
@@ -817,6 +851,73 @@ class RBDTestCase(test.TestCase):
         self.mock_rados.Rados.open_ioctx.assert_called_once()
         self.mock_rados.Rados.shutdown.assert_called_once()
 
+    def _create_delete_volumes(self, count):
+        FakeRados.connections = 0
+        FakeRados.ioctxs_opened = 0
+        self.driver.rados = mock.Mock(Rados=FakeRados, Error=MockException)
+        self.driver.rbd = mock.Mock(ImageNotFound=MockImageNotFoundException,
+                                    ImageBusy=MockImageBusyException)
+        image = self.driver.rbd.Image.return_value
+        image.list_snaps.return_value = []
+        image.parent_info.side_effect = MockImageNotFoundException
+        remove = self.driver.rbd.RBD.return_value.remove = mock.Mock()
+
+        for i in range(count):
+            volume = dict(name='volume-%08d' % i, size=1)
+            self.driver.create_volume(volume)
+            self.driver.delete_volume(volume)
+        self.assertEqual(count, remove.call_count)
+
+    def test_create_delete_volumes_without_connection_pool(self):
+        self._create_delete_volumes(20)
+        self.assertEqual(40, FakeRados.connections)
+        self.assertEqual(40, FakeRados.ioctxs_opened)
+        self.assertEqual([], self.driver._idle_clients)
+        self.assertEqual({}, self.driver._client_ioctxs)
+
+    def test_create_delete_volumes_with_connection_pool(self):
+        self.cfg.rados_connection_pool_size = 2
+        self._create_delete_volumes(20)
+        self.assertEqual(1, FakeRados.connections)
+        self.assertEqual(1, FakeRados.ioctxs_opened)
+        self.assertEqual(1, len(self.driver._idle_clients))
+
+    def test_connection_pool(self):
+        self.cfg.rados_connection_pool_size = 1
+        self.driver.rados = mock.Mock(Rados=FakeRados, Error=MockException)
+        FakeRados.connections = 0
+
+        client1, ioctx1 = self.driver._connect_to_rados()
+        client2, ioctx2 = self.driver._connect_to_rados()
+        self.assertEqual(2, FakeRados.connections)
+        self.driver._disconnect_from_rados(client1, ioctx1)
+        # The pool is bounded, the second connection is shut down.
+        self.driver._disconnect_from_rados(client2, ioctx2)
+        self.assertEqual([client1], self.driver._idle_clients)
+        self.assertEqual('shutdown', client2.state)
+        self.assertEqual('closed', ioctx2.state)
+
+        # Idle connections are reused, with an ioctx per pool.
+        client, ioctx = self.driver._connect_to_rados('alt_pool')
+        self.assertEqual(client1, client)
+        self.assertEqual('alt_pool', ioctx.name)
+        self.driver._disconnect_from_rados(client, ioctx)
+        self.assertEqual((client1, ioctx1), self.driver._connect_to_rados())
+        self.assertEqual(2, FakeRados.connections)
+
+        # Connections released after a failure are not reused.
+        self.driver._disconnect_from_rados(client1, ioctx1, healthy=False)
+        self.assertEqual([], self.driver._idle_clients)
+        self.assertEqual('shutdown', client1.state)
+        self.assertEqual('closed', ioctx.state)
+
+        # Nor are connections that were shut down while idle.
+        client, ioctx = self.driver._connect_to_rados()
+        self.driver._disconnect_from_rados(client, ioctx)
+        client.shutdown()
+        self.assertNotEqual(client, self.driver._connect_to_rados()[0])
+        self.assertEqual(4, FakeRados.connections)
+
 
 class RBDImageIOWrapperTestCase(test.TestCase):
     def setUp(self):
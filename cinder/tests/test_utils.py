@@ -458,6 +458,40 @@ class GenericUtilsTestCase(test.TestCase):
         h2 = hashlib.sha1(data).hexdigest()
         self.assertEqual(h1, h2)
 
+    def test_is_zero_data(self):
+        self.assertTrue(utils.is_zero_data('\0'))
+        self.assertTrue(utils.is_zero_data('\0' * 4096))
+        self.assertFalse(utils.is_zero_data(''))
+        self.assertFalse(utils.is_zero_data('\0' * 100 + 'x' + '\0' * 100))
+        self.assertFalse(utils.is_zero_data('x' + '\0' * 100))
+        self.assertFalse(utils.is_zero_data('\0' * 100 + 'x'))
+
+    def test_capabilities_delta(self):
+        old = {'volume_backend_name': 'lvm', 'QoS_support': False,
+               'driver_version': '2.0',
+               'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 10},
+                         {'pool_name': 'pool2', 'free_capacity_gb': 20},
+                         {'pool_name': 'pool3', 'free_capacity_gb': 30}]}
+        new = {'volume_backend_name': 'lvm', 'QoS_support': True,
+               'reserved_percentage': 0,
+               'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 10},
+                         {'pool_name': 'pool2', 'free_capacity_gb': 15},
+                         {'pool_name': 'pool4', 'free_capacity_gb': 40}]}
+
+        delta = utils.diff_capabilities(old, new)
+        self.assertEqual({'QoS_support': True, 'reserved_percentage': 0},
+                         delta['changed'])
+        self.assertEqual(['driver_version'], delta['removed'])
+        self.assertEqual([{'pool_name': 'pool2', 'free_capacity_gb': 15},
+                          {'pool_name': 'pool4', 'free_capacity_gb': 40}],
+                         delta['pools']['changed'])
+        self.assertEqual(['pool3'], delta['pools']['removed'])
+        self.assertEqual(new, utils.apply_capabilities_delta(old, delta))
+
+        self.assertEqual({'changed': {}, 'removed': [],
+                          'pools': {'changed': [], 'removed': []}},
+                         utils.diff_capabilities(new, new))
+
     def test_check_ssh_injection(self):
         cmd_list = ['ssh', '-D', 'my_name@name_of_remote_computer']
         self.assertIsNone(utils.check_ssh_injection(cmd_list))
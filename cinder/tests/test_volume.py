@@ -425,6 +425,20 @@ class VolumeTestCase(BaseVolumeTestCase):
                           self.context,
                           volume_id)
 
+    def test_delete_image_volume_evicts_cache_entry(self):
+        """Test deleting an image volume removes it from the cache."""
+        self.volume.image_volume_cache = mock.Mock()
+        volume = tests_utils.create_volume(self.context, **self.volume_params)
+        volume_id = volume['id']
+        self.volume.create_volume(self.context, volume_id)
+
+        self.volume.delete_volume(self.context, volume_id)
+        cache = self.volume.image_volume_cache
+        cache.get_by_image_volume.assert_called_once_with(mock.ANY,
+                                                          volume_id)
+        cache.evict.assert_called_once_with(
+            mock.ANY, cache.get_by_image_volume.return_value)
+
     def test_create_delete_volume_with_metadata(self):
         """Test volume can be created with metadata and deleted."""
         test_meta = {'fake_key': 'fake_value'}
@@ -623,6 +637,39 @@ class VolumeTestCase(BaseVolumeTestCase):
             self.assertEqual(volume_stats['key2'],
                              fake_capabilities['key2'])
 
+    @mock.patch('cinder.scheduler.rpcapi.SchedulerAPI.'
+                'update_service_capabilities')
+    def test_publish_service_capabilities_delta(self, mock_update_cap):
+        self.flags(capabilities_full_sync_interval=2)
+        manager = VolumeManager()
+        stats = {'volume_backend_name': 'fake', 'free_capacity_gb': 10,
+                 'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 10}]}
+
+        for free in (10, 8, 8, 6):
+            stats['free_capacity_gb'] = free
+            stats['pools'][0]['free_capacity_gb'] = free
+            manager.update_service_capabilities(stats)
+            manager._publish_service_capabilities(self.context)
+        # A full sync was requested, e.g. by a scheduler missing a delta
+        manager.request_full_capabilities_sync()
+        manager._publish_service_capabilities(self.context)
+
+        calls = mock_update_cap.call_args_list
+        self.assertEqual(5, len(calls))
+        self.assertEqual([1, 2, 3, 4, 5],
+                         [kwargs['capabilities_version']
+                          for args, kwargs in calls])
+        # Full reports, then two deltas and a full report again
+        self.assertEqual([False, True, True, False, False],
+                         ['capabilities_delta' in kwargs
+                          for args, kwargs in calls])
+        self.assertEqual({'free_capacity_gb': 8},
+                         calls[1][1]['capabilities_delta']['changed'])
+        self.assertEqual({'changed': {}, 'removed': [],
+                          'pools': {'changed': [], 'removed': []}},
+                         calls[2][1]['capabilities_delta'])
+        self.assertEqual(6, calls[3][0][3]['free_capacity_gb'])
+
     def test_extra_capabilities_fail(self):
         with mock.patch.object(jsonutils, 'loads') as mock_loads:
             mock_loads.side_effect = exception.CinderException('test')
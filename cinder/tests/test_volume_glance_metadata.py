@@ -18,6 +18,7 @@ Unit Tests for volume types extra specs code
 
 from cinder import context
 from cinder import db
+from cinder.db.sqlalchemy import api as sqlalchemy_api
 from cinder import exception
 from cinder import test
 
@@ -95,6 +96,34 @@ class VolumeGlanceMetadataTestCase(test.TestCase):
         self._assert_metadata_equals('2', 'key2', 'value2', metadata[1])
         self._assert_metadata_equals('2', 'key22', 'value22', metadata[2])
 
+    def test_vols_list_get_glance_metadata(self):
+        ctxt = context.get_admin_context()
+        db.volume_create(ctxt, {'id': '1'})
+        db.volume_create(ctxt, {'id': '2'})
+        db.volume_create(ctxt, {'id': '3'})
+        db.volume_glance_metadata_create(ctxt, '1', 'key1', 'value1')
+        db.volume_glance_metadata_create(ctxt, '2', 'key2', 'value2')
+        db.volume_glance_metadata_create(ctxt, '3', 'key3', 'value3')
+
+        metadata = db.volume_glance_metadata_list_get(ctxt, ['1', '3'])
+        self.assertEqual(len(metadata), 2)
+        self._assert_metadata_equals('1', 'key1', 'value1', metadata[0])
+        self._assert_metadata_equals('3', 'key3', 'value3', metadata[1])
+
+        self.assertEqual([], db.volume_glance_metadata_list_get(ctxt, []))
+
+    def test_vols_list_get_glance_metadata_chunked(self):
+        ctxt = context.get_admin_context()
+        for i in xrange(5):
+            db.volume_create(ctxt, {'id': str(i)})
+            db.volume_glance_metadata_create(ctxt, str(i), 'key', 'value')
+
+        self.stubs.Set(sqlalchemy_api, '_IN_QUERY_CHUNK_SIZE', 2)
+        metadata = db.volume_glance_metadata_list_get(
+            ctxt, [str(i) for i in xrange(5)])
+        self.assertEqual(sorted(str(i) for i in xrange(5)),
+                         sorted(meta.volume_id for meta in metadata))
+
     def _assert_metadata_equals(self, volume_id, key, value, observed):
         self.assertEqual(volume_id, observed.volume_id)
         self.assertEqual(key, observed.key)
@@ -232,6 +232,13 @@ class VolumeRpcAPITestCase(test.TestCase):
                               connector='fake_connector',
                               force=False)
 
+    def test_publish_service_capabilities_full_sync(self):
+        self._test_volume_api('publish_service_capabilities',
+                              rpc_method='cast',
+                              host='fake_host',
+                              full_sync=True,
+                              version='1.19')
+
     def test_accept_transfer(self):
         self._test_volume_api('accept_transfer',
                               rpc_method='call',
@@ -122,6 +122,26 @@ class VolumeTransferTestCase(test.TestCase):
         ts = tx_api.get_all(nctxt)
         self.assertEqual(len(ts), 0, 'Unexpected transfers listed.')
 
+    def test_transfer_get_all_paginated(self):
+        tx_api = transfer_api.API()
+        transfers = []
+        for i in range(4):
+            volume = utils.create_volume(self.ctxt, id=str(i),
+                                         updated_at=self.updated_at)
+            transfers.append(tx_api.create(self.ctxt, volume['id'],
+                                           'Description'))
+        ids = [transfer['id'] for transfer in transfers]
+
+        ts = tx_api.get_all(self.ctxt)
+        self.assertEqual(ids, [t['id'] for t in ts])
+        ts = tx_api.get_all(self.ctxt, limit=2, offset=1)
+        self.assertEqual(ids[1:3], [t['id'] for t in ts])
+        ts = tx_api.get_all(self.ctxt, marker=ids[1], limit=1)
+        self.assertEqual(ids[2:3], [t['id'] for t in ts])
+        ts = tx_api.get_all(self.ctxt, filters={'all_tenants': 1},
+                            marker=ids[0], offset=2)
+        self.assertEqual(ids[3:], [t['id'] for t in ts])
+
     def test_delete_transfer_with_deleted_volume(self):
         #create a volume
         volume = utils.create_volume(self.ctxt, id='1',
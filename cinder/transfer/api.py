@@ -69,14 +69,17 @@ class API(base.Base):
             LOG.error(msg)
         self.db.transfer_destroy(context, transfer_id)
 
-    def get_all(self, context, filters=None):
+    def get_all(self, context, filters=None, marker=None, limit=None,
+                offset=None):
         filters = filters or {}
         volume_api.check_policy(context, 'get_all_transfers')
         if context.is_admin and 'all_tenants' in filters:
-            transfers = self.db.transfer_get_all(context)
+            transfers = self.db.transfer_get_all(context, marker=marker,
+                                                 limit=limit, offset=offset)
         else:
-            transfers = self.db.transfer_get_all_by_project(context,
-                                                            context.project_id)
+            transfers = self.db.transfer_get_all_by_project(
+                context, context.project_id, marker=marker, limit=limit,
+                offset=offset)
         return transfers
 
     def _get_random_string(self, length):
@@ -19,6 +19,7 @@
 
 
 import contextlib
+import copy
 import datetime
 import hashlib
 import inspect
@@ -508,6 +509,15 @@ def hash_file(file_like_object):
     return checksum.hexdigest()
 
 
+def is_zero_data(data):
+    """Return True if the string data is not empty and all NUL bytes."""
+    # Data that starts or ends with something else is rejected without
+    # scanning it.
+    if data[:1] != '\0' or data[-1:] != '\0':
+        return False
+    return data.count('\0') == len(data)
+
+
 def service_is_up(service):
     """Check whether a service is up based on last heartbeat."""
     last_heartbeat = service['updated_at'] or service['created_at']
@@ -516,6 +526,58 @@ def service_is_up(service):
     return abs(elapsed) <= CONF.service_down_time
 
 
+def _pools_by_name(pools):
+    return dict((pool['pool_name'], pool) for pool in pools)
+
+
+def diff_capabilities(old, new):
+    """Return the delta turning the capabilities dict old into new.
+
+    Pools are compared one by one on their pool_name, so that a single
+    pool changing does not resend the whole pool list.  The delta is
+    applied with apply_capabilities_delta().
+    """
+    delta = {'changed': {},
+             'removed': [key for key in old if key not in new]}
+    for key, value in six.iteritems(new):
+        old_value = old.get(key)
+        if (key == 'pools' and isinstance(value, list) and
+                isinstance(old_value, list)):
+            old_pools = _pools_by_name(old_value)
+            new_pools = _pools_by_name(value)
+            delta['pools'] = {
+                'changed': [pool for pool in value
+                            if old_pools.get(pool['pool_name']) != pool],
+                'removed': [name for name in old_pools
+                            if name not in new_pools]}
+        elif key not in old or old_value != value:
+            delta['changed'][key] = value
+    return delta
+
+
+def apply_capabilities_delta(capabilities, delta):
+    """Return a copy of capabilities with a diff_capabilities() delta.
+
+    The pools carried over from capabilities are copied as well.
+    """
+    result = dict(capabilities)
+    for key in delta['removed']:
+        result.pop(key, None)
+    result.update(delta['changed'])
+
+    pools_delta = delta.get('pools')
+    if pools_delta is not None:
+        changed = _pools_by_name(pools_delta['changed'])
+        pools = [changed.get(pool['pool_name']) or copy.deepcopy(pool)
+                 for pool in result.get('pools', [])
+                 if pool['pool_name'] not in pools_delta['removed']]
+        known = set(pool['pool_name'] for pool in pools)
+        pools.extend(pool for pool in pools_delta['changed']
+                     if pool['pool_name'] not in known)
+        result['pools'] = pools
+    return result
+
+
 def read_file_as_root(file_path):
     """Secure helper to read file as root."""
     try:
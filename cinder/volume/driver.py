@@ -127,6 +127,19 @@ volume_opts = [
                default=None,
                help='The path to the client certificate for verification, '
                     'if the driver supports it.'),
+    cfg.BoolOpt('image_volume_cache_enabled',
+                default=False,
+                help='Keep a volume of the images volumes are created from '
+                     'and clone it for the next volumes created from the '
+                     'same image. Requires the Cinder internal tenant'),
+    cfg.IntOpt('image_volume_cache_max_size_gb',
+               default=0,
+               help='Maximum size in GB of the image-volume cache of a '
+                    'backend. 0 => unlimited'),
+    cfg.IntOpt('image_volume_cache_max_count',
+               default=0,
+               help='Maximum number of entries in the image-volume cache of '
+                    'a backend. 0 => unlimited'),
 ]
 
 # for backward compatibility
@@ -21,6 +21,7 @@ import random
 import re
 import time
 
+from eventlet import event
 from oslo.config import cfg
 import six
 
@@ -60,6 +61,13 @@ loc_opts = [
     cfg.StrOpt('naviseccli_path',
                default='',
                help='Naviseccli Path.'),
+    cfg.IntOpt('naviseccli_query_cache_ttl',
+               default=0,
+               help='Number of seconds the output of listing commands, '
+               'such as lun -list and storagegroup -list, is reused by '
+               'later identical commands. Commands changing the array '
+               'clear the cached output. '
+               'By default, the value is 0 and nothing is cached.'),
     cfg.StrOpt('storage_vnx_pool_name',
                default=None,
                help='Storage pool name.'),
@@ -191,11 +199,25 @@ class CommandLineHelper(object):
     CLI_RESP_PATTERN_CG_NOT_FOUND = 'Cannot find'
     CLI_RESP_PATTERN_SNAP_NOT_FOUND = 'The specified snapshot does not exist'
 
+    # Options of the commands whose output is cached
+    QUERY_OPTIONS = ('-list', '-getport')
+    # Cached commands affected by changes made by commands of a given
+    # object type, all cached output is dropped for other object types.
+    QUERY_CACHE_SCOPES = {'storagegroup': ('storagegroup', 'port')}
+
     def __init__(self, configuration):
         configuration.append_config_values(san.san_opts)
 
         self.timeout = configuration.default_timeout * INTERVAL_60_SEC
         self.max_luns = configuration.max_luns_per_storage_group
+        self.query_cache_ttl = configuration.naviseccli_query_cache_ttl
+        # (command, kwargs) : (time of execution, (out, rc))
+        self._query_cache = {}
+        # (command, kwargs) : event sent the (out, rc) of the running query
+        self._queries_in_flight = {}
+        # Bumped when the cache is cleared, so the output of queries
+        # running concurrently with a change is not cached.
+        self._query_generation = 0
 
         # Checking for existence of naviseccli tool
         navisecclipath = configuration.naviseccli_path
@@ -372,6 +394,8 @@ class CommandLineHelper(object):
             timeout = self.timeout
 
         def _inner():
+            # The condition is being polled for, it needs fresh output.
+            self.invalidate_query_cache()
             try:
                 testValue = testmethod()
             except Exception as ex:
@@ -1295,8 +1319,76 @@ class CommandLineHelper(object):
         pattern = re.compile(error_pattern)
         return pattern.match(out)
 
-    @log_enter_exit
+    def _is_query(self, command):
+        return any(option in command for option in self.QUERY_OPTIONS)
+
+    @staticmethod
+    def _object_type(command):
+        """Return the object type of a command, skipping -np."""
+        if command and command[0] == '-np':
+            command = command[1:]
+        return command[0] if command else None
+
+    def invalidate_query_cache(self, object_type=None):
+        """Drop cached command output affected by object_type changes.
+
+        Queries running at that time are not shared with later queries.
+        """
+        self._query_generation += 1
+        scope = self.QUERY_CACHE_SCOPES.get(object_type)
+        if scope is None:
+            self._query_cache.clear()
+            self._queries_in_flight.clear()
+            return
+        for cache in (self._query_cache, self._queries_in_flight):
+            for key in cache.keys():
+                if self._object_type(key[0]) in scope:
+                    del cache[key]
+
     def command_execute(self, *command, **kwargv):
+        if self.query_cache_ttl <= 0:
+            return self._command_execute(*command, **kwargv)
+
+        if not self._is_query(command):
+            try:
+                return self._command_execute(*command, **kwargv)
+            finally:
+                self.invalidate_query_cache(self._object_type(command))
+
+        # Polling is selected by the -np option, which is part of the
+        # command, and the kwargs change how the command is run.
+        key = (command, tuple(sorted(kwargv.items())))
+        cached = self._query_cache.get(key)
+        if (cached is not None and
+                time.time() - cached[0] < self.query_cache_ttl):
+            LOG.debug('EMC: Cached result of command: %s.' % (command,))
+            return cached[1]
+
+        in_flight = self._queries_in_flight.get(key)
+        if in_flight is not None:
+            LOG.debug('EMC: Waiting for the result of running command: %s.'
+                      % (command,))
+            return in_flight.wait()
+
+        done = event.Event()
+        self._queries_in_flight[key] = done
+        generation = self._query_generation
+        try:
+            out, rc = self._command_execute(*command, **kwargv)
+        except Exception as ex:
+            with excutils.save_and_reraise_exception():
+                if self._queries_in_flight.get(key) is done:
+                    del self._queries_in_flight[key]
+                done.send_exception(ex)
+        if self._queries_in_flight.get(key) is done:
+            del self._queries_in_flight[key]
+        if rc == 0 and generation == self._query_generation:
+            self._query_cache[key] = (time.time(), (out, rc))
+        done.send((out, rc))
+        return out, rc
+
+    @log_enter_exit
+    def _command_execute(self, *command, **kwargv):
         # NOTE: retry_disable need to be removed from kwargv
         # before it pass to utils.execute, otherwise exception will thrown
         retry_disable = kwargv.pop('retry_disable', False)
@@ -223,7 +223,8 @@ class StorwizeSVCDriver(san.SanDriver):
             admin_context = context.get_admin_context()
         else:
             admin_context = ctxt.elevated()
-        volumes = self.db.volume_get_all_by_host(admin_context, self.host)
+        volumes = self.db.volume_get_all_by_host(admin_context, self.host,
+                                                 load_strategy='noload')
 
         for volume in volumes:
             metadata = self.db.volume_admin_metadata_get(admin_context,
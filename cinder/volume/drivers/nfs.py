@@ -15,6 +15,7 @@
 
 import errno
 import os
+import time
 
 from oslo.config import cfg
 
@@ -58,6 +59,12 @@ volume_opts = [
                default=None,
                help=('Mount options passed to the nfs client. See section '
                      'of the nfs man page for details.')),
+    cfg.IntOpt('nfs_allocation_refresh_interval',
+               default=0,
+               help=('Seconds for which the space allocated on a share, as '
+                     'counted by du, is cached and adjusted as volumes are '
+                     'created, extended and deleted before it is counted '
+                     'again. 0 counts it every time it is needed.')),
 ]
 
 CONF = cfg.CONF
@@ -76,6 +83,8 @@ class NfsDriver(remotefs.RemoteFSDriver):
 
     def __init__(self, execute=putils.execute, *args, **kwargs):
         self._remotefsclient = None
+        # nfs_share : [time counted, bytes allocated]
+        self._share_allocations = {}
         super(NfsDriver, self).__init__(*args, **kwargs)
         self.configuration.append_config_values(volume_opts)
         root_helper = utils.get_root_helper()
@@ -158,10 +167,11 @@ class NfsDriver(remotefs.RemoteFSDriver):
         target_share_reserved = 0
 
         for nfs_share in self._mounted_shares:
-            if not self._is_share_eligible(nfs_share, volume_size_in_gib):
+            capacity_info = self._get_capacity_info(nfs_share)
+            if not self._is_share_eligible(nfs_share, volume_size_in_gib,
+                                           capacity_info):
                 continue
-            total_size, total_available, total_allocated = \
-                self._get_capacity_info(nfs_share)
+            total_size, total_available, total_allocated = capacity_info
             if target_share is not None:
                 if target_share_reserved > total_allocated:
                     target_share = nfs_share
@@ -178,7 +188,8 @@ class NfsDriver(remotefs.RemoteFSDriver):
 
         return target_share
 
-    def _is_share_eligible(self, nfs_share, volume_size_in_gib):
+    def _is_share_eligible(self, nfs_share, volume_size_in_gib,
+                           capacity_info=None):
         """Verifies NFS share is eligible to host volume with given size.
 
         First validation step: ratio of actual space (used_space / total_space)
@@ -190,14 +201,17 @@ class NfsDriver(remotefs.RemoteFSDriver):
 
         :param nfs_share: nfs share
         :param volume_size_in_gib: int size in GB
+        :param capacity_info: result of _get_capacity_info for the share,
+                              fetched when not given
         """
 
         used_ratio = self.configuration.nfs_used_ratio
         oversub_ratio = self.configuration.nfs_oversub_ratio
         requested_volume_size = volume_size_in_gib * units.Gi
 
-        total_size, total_available, total_allocated = \
-            self._get_capacity_info(nfs_share)
+        if capacity_info is None:
+            capacity_info = self._get_capacity_info(nfs_share)
+        total_size, total_available, total_allocated = capacity_info
         apparent_size = max(0, total_size * oversub_ratio)
         apparent_available = max(0, apparent_size - total_allocated)
         used = (total_size - total_available) / total_size
@@ -236,10 +250,47 @@ class NfsDriver(remotefs.RemoteFSDriver):
         total_available = block_size * blocks_avail
         total_size = block_size * blocks_total
 
+        total_allocated = self._get_allocated_space(nfs_share, mount_point)
+        return total_size, total_available, total_allocated
+
+    def _get_allocated_space(self, nfs_share, mount_point):
+        """Return the apparent size of the files on the NFS share.
+
+        du walks the whole share, so its result is reused for
+        nfs_allocation_refresh_interval seconds, during which the
+        volumes this driver creates, extends and deletes are accounted
+        for by _update_allocated_space.  Counting again afterwards picks
+        up changes made by anything else.
+        """
+        interval = self.configuration.nfs_allocation_refresh_interval
+        allocation = self._share_allocations.get(nfs_share)
+        if (interval > 0 and allocation is not None and
+                time.time() - allocation[0] < interval):
+            return allocation[1]
+
         du, _ = self._execute('du', '-sb', '--apparent-size', '--exclude',
                               '*snapshot*', mount_point, run_as_root=True)
         total_allocated = float(du.split()[0])
-        return total_size, total_available, total_allocated
+        self._share_allocations[nfs_share] = [time.time(), total_allocated]
+        return total_allocated
+
+    def _update_allocated_space(self, nfs_share, size_in_gib):
+        """Account for a volume file on nfs_share growing by size_in_gib."""
+        allocation = self._share_allocations.get(nfs_share)
+        if allocation is not None:
+            allocation[1] = max(0, allocation[1] + size_in_gib * units.Gi)
+
+    def _do_create_volume(self, volume):
+        super(NfsDriver, self)._do_create_volume(volume)
+        self._update_allocated_space(volume['provider_location'],
+                                     volume['size'])
+
+    def delete_volume(self, volume):
+        """Deletes a logical volume."""
+        super(NfsDriver, self).delete_volume(volume)
+        nfs_share = volume['provider_location']
+        if nfs_share in self._share_allocations:
+            self._update_allocated_space(nfs_share, -volume['size'])
 
     def _get_mount_point_base(self):
         return self.base
@@ -259,6 +310,7 @@ class NfsDriver(remotefs.RemoteFSDriver):
         if not self._is_file_size_equal(path, new_size):
             raise exception.ExtendVolumeError(
                 reason='Resizing image file failed.')
+        self._update_allocated_space(volume['provider_location'], extend_by)
 
     def _is_file_size_equal(self, path, size):
         """Checks if file size at path is equal to size."""
@@ -78,7 +78,11 @@ rbd_opts = [
     cfg.IntOpt('rados_connect_timeout', default=-1,
                help=_('Timeout value (in seconds) used when connecting to '
                       'ceph cluster. If value < 0, no timeout is set and '
-                      'default librados value is used.'))
+                      'default librados value is used.')),
+    cfg.IntOpt('rados_connection_pool_size', default=0,
+               help=_('Number of idle connections to the ceph cluster kept '
+                      'open for reuse by the driver, along with their '
+                      'ioctxs. 0 connects for every operation.'))
 ]
 
 CONF = cfg.CONF
@@ -226,7 +230,8 @@ class RBDVolumeProxy(object):
         try:
             self.volume.close()
         finally:
-            self.driver._disconnect_from_rados(self.client, self.ioctx)
+            self.driver._disconnect_from_rados(self.client, self.ioctx,
+                                               healthy=type_ is None)
 
     def __getattr__(self, attrib):
         return getattr(self.volume, attrib)
@@ -242,7 +247,8 @@ class RADOSClient(object):
         return self
 
     def __exit__(self, type_, value, traceback):
-        self.driver._disconnect_from_rados(self.cluster, self.ioctx)
+        self.driver._disconnect_from_rados(self.cluster, self.ioctx,
+                                           healthy=type_ is None)
 
 
 class RBDDriver(driver.VolumeDriver):
@@ -257,6 +263,10 @@ class RBDDriver(driver.VolumeDriver):
         # allow overrides for testing
         self.rados = kwargs.get('rados', rados)
         self.rbd = kwargs.get('rbd', rbd)
+        # Idle cluster handles kept by _disconnect_from_rados for reuse, and
+        # the ioctxs opened by each of them: {client: {pool: ioctx}}
+        self._idle_clients = []
+        self._client_ioctxs = {}
 
         # All string args used with librbd must be None or utf-8 otherwise
         # librbd will break.
@@ -286,17 +296,54 @@ class RBDDriver(driver.VolumeDriver):
             args.extend(['--conf', self.configuration.rbd_ceph_conf])
         return args
 
-    def _connect_to_rados(self, pool=None):
-        LOG.debug("opening connection to ceph cluster (timeout=%s)." %
-                  (self.configuration.rados_connect_timeout))
+    def _client_is_healthy(self, client):
+        # python-rados tracks the state of cluster handles and ioctxs, a
+        # handle or ioctx that was shut down or closed cannot be reused.
+        if getattr(client, 'state', 'connected') != 'connected':
+            return False
+        return all(getattr(ioctx, 'state', 'open') == 'open'
+                   for ioctx in self._client_ioctxs[client].values())
+
+    def _get_idle_client(self):
+        """Return a healthy idle cluster handle from the pool, or None."""
+        while self._idle_clients:
+            client = self._idle_clients.pop()
+            if self._client_is_healthy(client):
+                return client
+            LOG.debug("discarding unhealthy ceph cluster connection.")
+            self._shutdown_client(client)
+        return None
+
+    def _shutdown_client(self, client):
+        # closing an ioctx cannot raise an exception
+        for ioctx in self._client_ioctxs.pop(client, {}).values():
+            ioctx.close()
+        client.shutdown()
 
-        client = self.rados.Rados(rados_id=self.configuration.rbd_user,
-                                  conffile=self.configuration.rbd_ceph_conf)
+    def _connect_to_rados(self, pool=None):
         if pool is not None:
             pool = strutils.safe_encode(pool)
         else:
             pool = self.configuration.rbd_pool
 
+        if self.configuration.rados_connection_pool_size > 0:
+            client = self._get_idle_client()
+            if client is not None:
+                ioctxs = self._client_ioctxs[client]
+                try:
+                    if pool not in ioctxs:
+                        ioctxs[pool] = client.open_ioctx(pool)
+                    return client, ioctxs[pool]
+                except self.rados.Error as exc:
+                    LOG.error("error opening ioctx for pool %s." % pool)
+                    self._shutdown_client(client)
+                    raise exception.VolumeBackendAPIException(data=str(exc))
+
+        LOG.debug("opening connection to ceph cluster (timeout=%s)." %
+                  (self.configuration.rados_connect_timeout))
+
+        client = self.rados.Rados(rados_id=self.configuration.rbd_user,
+                                  conffile=self.configuration.rbd_ceph_conf)
         try:
             if self.configuration.rados_connect_timeout >= 0:
                 client.connect(timeout=
@@ -304,6 +351,7 @@ class RBDDriver(driver.VolumeDriver):
             else:
                 client.connect()
             ioctx = client.open_ioctx(pool)
+            self._client_ioctxs[client] = {pool: ioctx}
             return client, ioctx
         except self.rados.Error as exc:
             LOG.error("error connecting to ceph cluster.")
@@ -311,10 +359,21 @@ class RBDDriver(driver.VolumeDriver):
             client.shutdown()
             raise exception.VolumeBackendAPIException(data=str(exc))
 
-    def _disconnect_from_rados(self, client, ioctx):
-        # closing an ioctx cannot raise an exception
-        ioctx.close()
-        client.shutdown()
+    def _disconnect_from_rados(self, client, ioctx, healthy=True):
+        """Release a connection returned by _connect_to_rados.
+
+        The connection goes back to the pool unless the pool is full or the
+        operation using it failed, in which case it is shut down.
+        """
+        if (healthy and client in self._client_ioctxs and
+                len(self._idle_clients) <
+                self.configuration.rados_connection_pool_size):
+            self._idle_clients.append(client)
+            return
+        if client not in self._client_ioctxs:
+            # closing an ioctx cannot raise an exception
+            ioctx.close()
+        self._shutdown_client(client)
 
     def _get_backup_snaps(self, rbd_image):
         """Get list of any backup snapshots that exist on this volume.
@@ -40,6 +40,7 @@ import json
 import math
 import pprint
 import re
+import threading
 import uuid
 
 from cinder.openstack.common import importutils
@@ -105,6 +106,11 @@ hp3par_opts = [
     cfg.BoolOpt('hp3par_iscsi_chap_enabled',
                 default=False,
                 help="Enable CHAP authentication for iSCSI connections."),
+    cfg.BoolOpt('hp3par_session_reuse',
+                default=False,
+                help="Keep the 3PAR WSAPI session open between operations "
+                     "instead of logging in and out for each of them. "
+                     "Expired sessions are logged in again."),
 ]
 
 
@@ -112,6 +118,33 @@ CONF = cfg.CONF
 CONF.register_opts(hp3par_opts)
 
 
+class HP3PARSessionClient(object):
+    """Wraps an HP3ParClient to log in again when the session expired.
+
+    WSAPI sessions time out after a period of inactivity, which the
+    array reports as HTTPUnauthorized.  Calls failing that way are
+    retried once after logging in again.
+    """
+
+    def __init__(self, common, client):
+        self._common = common
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name in ('login', 'logout'):
+            return attr
+
+        def _call(*args, **kwargs):
+            try:
+                return attr(*args, **kwargs)
+            except hpexceptions.HTTPUnauthorized:
+                LOG.info(_("3PAR session expired, logging in again."))
+                self._common.client_login(relogin=True)
+                return attr(*args, **kwargs)
+        return _call
+
+
 class HP3PARCommon(object):
     """Class that contains common code for the 3PAR drivers.
 
@@ -151,10 +184,11 @@ class HP3PARCommon(object):
         2.0.21 - Remove bogus invalid snapCPG=None exception
         2.0.22 - HP 3PAR drivers should not claim to have 'infinite' space
         2.0.23 - Increase the hostname size from 23 to 31  Bug #1371242
+        2.0.24 - Optionally reuse the WSAPI session between operations
 
     """
 
-    VERSION = "2.0.23"
+    VERSION = "2.0.24"
 
     stats = {}
 
@@ -192,6 +226,11 @@ class HP3PARCommon(object):
         self.config = config
         self.hosts_naming_dict = dict()
         self.client = None
+        # Number of WSAPI logins made, including logins after the session
+        # expired.
+        self.login_count = 0
+        self._logged_in = False
+        self._session_lock = threading.Lock()
 
     def get_version(self):
         return self.VERSION
@@ -238,19 +277,36 @@ class HP3PARCommon(object):
 
         return cl
 
-    def client_login(self):
-        try:
-            LOG.debug("Connecting to 3PAR")
-            self.client.login(self.config.hp3par_username,
-                              self.config.hp3par_password)
-        except hpexceptions.HTTPUnauthorized as ex:
-            msg = (_("Failed to Login to 3PAR (%(url)s) because %(err)s") %
-                   {'url': self.config.hp3par_api_url, 'err': ex})
-            LOG.error(msg)
-            raise exception.InvalidInput(reason=msg)
+    def client_login(self, relogin=False):
+        """Log in to the WSAPI.
+
+        With hp3par_session_reuse the session of a previous login is used
+        when there is one, unless relogin is set because it expired.
+        """
+        with self._session_lock:
+            if (self._logged_in and not relogin and
+                    self.config.hp3par_session_reuse):
+                return
+            try:
+                LOG.debug("Connecting to 3PAR")
+                self.client.login(self.config.hp3par_username,
+                                  self.config.hp3par_password)
+            except hpexceptions.HTTPUnauthorized as ex:
+                self._logged_in = False
+                msg = (_("Failed to Login to 3PAR (%(url)s) because "
+                         "%(err)s") %
+                       {'url': self.config.hp3par_api_url, 'err': ex})
+                LOG.error(msg)
+                raise exception.InvalidInput(reason=msg)
+            self.login_count += 1
+            self._logged_in = True
 
     def client_logout(self):
-        self.client.logout()
+        if self.config.hp3par_session_reuse:
+            return
+        with self._session_lock:
+            self.client.logout()
+            self._logged_in = False
         LOG.debug("Disconnect from 3PAR")
 
     def do_setup(self, context):
@@ -261,6 +317,8 @@ class HP3PARCommon(object):
             self.client = self._create_client()
         except hpexceptions.UnsupportedVersion as ex:
             raise exception.InvalidInput(ex)
+        if self.config.hp3par_session_reuse:
+            self.client = HP3PARSessionClient(self, self.client)
         LOG.info(_("HP3PARCommon %(common_ver)s, hp3parclient %(rest_ver)s")
                  % {"common_ver": self.VERSION,
                      "rest_ver": hp3parclient.get_version_string()})
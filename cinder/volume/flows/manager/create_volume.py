@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import math
 import traceback
 
 from oslo.config import cfg
@@ -17,13 +18,17 @@ import taskflow.engines
 from taskflow.patterns import linear_flow
 from taskflow.utils import misc
 
+from cinder import context as cinder_context
 from cinder import exception
 from cinder import flow_utils
 from cinder.i18n import _
 from cinder.image import glance
+from cinder.openstack.common import excutils
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import processutils
 from cinder.openstack.common import timeutils
+from cinder.openstack.common import units
+from cinder import quota
 from cinder import utils
 from cinder.volume.flows import common
 from cinder.volume import utils as volume_utils
@@ -32,6 +37,7 @@ LOG = logging.getLogger(__name__)
 
 ACTION = 'volume:create'
 CONF = cfg.CONF
+QUOTAS = quota.QUOTAS
 
 # These attributes we will attempt to save for the volume if they exist
 # in the source image metadata.
@@ -329,10 +335,11 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
 
     default_provides = 'volume'
 
-    def __init__(self, db, driver):
+    def __init__(self, db, driver, image_volume_cache=None):
         super(CreateVolumeFromSpecTask, self).__init__(addons=[ACTION])
         self.db = db
         self.driver = driver
+        self.image_volume_cache = image_volume_cache
 
     def _handle_bootable_volume_glance_meta(self, context, volume_id,
                                             **kwargs):
@@ -567,33 +574,246 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
         # and clone status.
         model_update, cloned = self.driver.clone_image(
             volume_ref, image_location, image_id, image_meta)
+        internal_context = None
+        should_create_cache_entry = False
+        if not cloned and self._can_use_image_volume_cache(volume_ref,
+                                                           image_meta):
+            internal_context = cinder_context.get_internal_tenant_context()
+            if internal_context:
+                cache_entry = self.image_volume_cache.get_entry(
+                    context, volume_ref, image_id, image_meta)
+                if cache_entry is None:
+                    should_create_cache_entry = True
+                else:
+                    model_update, cloned = self._create_from_image_cache(
+                        context, volume_ref, cache_entry)
         if not cloned:
-            # TODO(harlowja): what needs to be rolled back in the clone if this
-            # volume create fails?? Likely this should be a subflow or broken
-            # out task in the future. That will bring up the question of how
-            # do we make said subflow/task which is only triggered in the
-            # clone image 'path' resumable and revertable in the correct
-            # manner.
-            #
-            # Create the volume and then download the image onto the volume.
-            model_update = self.driver.create_volume(volume_ref)
-            updates = dict(model_update or dict(), status='downloading')
+            original_size = volume_ref['size']
+            image_size = original_size
+            if should_create_cache_entry:
+                # The volume is created as large as the image so that it can
+                # be cloned into the image volume, and extended afterwards.
+                image_size = self._get_image_volume_size(volume_ref,
+                                                         image_meta)
             try:
-                volume_ref = self.db.volume_update(context,
-                                                   volume_ref['id'], updates)
-            except exception.CinderException:
-                LOG.exception(_("Failed updating volume %(volume_id)s with "
-                                "%(updates)s") %
-                              {'volume_id': volume_ref['id'],
-                               'updates': updates})
-            self._copy_image_to_volume(context, volume_ref,
-                                       image_id, image_location, image_service)
+                if image_size < original_size:
+                    volume_ref = self.db.volume_update(context,
+                                                       volume_ref['id'],
+                                                       {'size': image_size})
+                model_update, volume_ref = self._create_from_image_download(
+                    context, volume_ref, image_id, image_location,
+                    image_service)
+                if should_create_cache_entry:
+                    self._create_image_cache_volume_entry(context,
+                                                          internal_context,
+                                                          volume_ref,
+                                                          image_id,
+                                                          image_meta)
+                if image_size < original_size:
+                    try:
+                        self.driver.extend_volume(volume_ref, original_size)
+                    except NotImplementedError:
+                        LOG.warn(_("Volume driver does not support extending "
+                                   "volumes, downloading image %(image_id)s "
+                                   "again to volume %(volume_id)s."),
+                                 {'image_id': image_id,
+                                  'volume_id': volume_ref['id']})
+                        self.driver.delete_volume(volume_ref)
+                        volume_ref = self.db.volume_update(
+                            context, volume_ref['id'],
+                            {'size': original_size})
+                        model_update, volume_ref = \
+                            self._create_from_image_download(
+                                context, volume_ref, image_id,
+                                image_location, image_service)
+            finally:
+                # The size of the volume is the requested one whether it was
+                # created or not, its quota and a reschedule depend on it.
+                if volume_ref['size'] != original_size:
+                    volume_ref = self.db.volume_update(
+                        context, volume_ref['id'], {'size': original_size})
 
         self._handle_bootable_volume_glance_meta(context, volume_ref['id'],
                                                  image_id=image_id,
                                                  image_meta=image_meta)
         return model_update
 
+    def _create_from_image_download(self, context, volume_ref, image_id,
+                                    image_location, image_service):
+        """Create volume_ref and download the image onto it.
+
+        Returns (model_update, volume_ref).
+        """
+        # TODO(harlowja): what needs to be rolled back in the clone if this
+        # volume create fails?? Likely this should be a subflow or broken
+        # out task in the future. That will bring up the question of how
+        # do we make said subflow/task which is only triggered in the
+        # clone image 'path' resumable and revertable in the correct
+        # manner.
+        model_update = self.driver.create_volume(volume_ref)
+        updates = dict(model_update or dict(), status='downloading')
+        try:
+            volume_ref = self.db.volume_update(context,
+                                               volume_ref['id'], updates)
+        except exception.CinderException:
+            LOG.exception(_("Failed updating volume %(volume_id)s with "
+                            "%(updates)s") %
+                          {'volume_id': volume_ref['id'],
+                           'updates': updates})
+        self._copy_image_to_volume(context, volume_ref,
+                                   image_id, image_location, image_service)
+        return model_update, volume_ref
+
+    def _can_use_image_volume_cache(self, volume_ref, image_meta):
+        # NOTE: the key of an encrypted volume belongs to its owner, its
+        # data can not be shared through the cache.
+        return (self.image_volume_cache is not None and
+                bool(image_meta.get('checksum')) and
+                not volume_ref.get('encryption_key_id'))
+
+    def _get_image_volume_size(self, volume_ref, image_meta):
+        """Return the size in GB of the image volume of image_meta.
+
+        Falls back on the size of volume_ref when the virtual size of the
+        image is not known.
+        """
+        virtual_size = image_meta.get('virtual_size')
+        if not virtual_size and image_meta.get('disk_format') == 'raw':
+            virtual_size = image_meta.get('size')
+        if not virtual_size:
+            return volume_ref['size']
+        return min(volume_ref['size'],
+                   int(math.ceil(float(virtual_size) / units.Gi)))
+
+    def _create_from_image_cache(self, context, volume_ref, cache_entry):
+        """Clone volume_ref from the image volume of cache_entry.
+
+        Returns (model_update, cloned) like driver.clone_image.
+        """
+        image_volume_id = cache_entry['volume_id']
+        if cache_entry['size'] > volume_ref['size']:
+            LOG.debug("Image volume %(image_volume_id)s is larger than the "
+                      "requested %(size)dGB.",
+                      {'image_volume_id': image_volume_id,
+                       'size': volume_ref['size']})
+            return None, False
+
+        # Make sure the image volume is not evicted while it is cloned.
+        @utils.synchronized('%s-delete_volume' % image_volume_id,
+                            external=True)
+        def _clone_image_volume():
+            # The image volume belongs to the internal tenant.
+            image_volume = self.db.volume_get(context.elevated(),
+                                              image_volume_id)
+            return self.driver.create_cloned_volume(volume_ref, image_volume)
+
+        LOG.debug("Cloning volume %(volume_id)s from image volume "
+                  "%(image_volume_id)s.",
+                  {'volume_id': volume_ref['id'],
+                   'image_volume_id': image_volume_id})
+        try:
+            model_update = _clone_image_volume()
+        except exception.VolumeNotFound:
+            self.image_volume_cache.evict(context, cache_entry)
+            return None, False
+        except NotImplementedError:
+            LOG.warn(_("Volume driver does not support cloning volumes, "
+                       "the image-volume cache can not be used."))
+            return None, False
+
+        if volume_ref['size'] > cache_entry['size']:
+            try:
+                self.driver.extend_volume(volume_ref, volume_ref['size'])
+            except NotImplementedError:
+                LOG.warn(_("Volume driver does not support extending "
+                           "volumes, volume %(volume_id)s can not be cloned "
+                           "from the smaller image volume "
+                           "%(image_volume_id)s."),
+                         {'volume_id': volume_ref['id'],
+                          'image_volume_id': image_volume_id})
+                self.driver.delete_volume(volume_ref)
+                return None, False
+        return model_update, True
+
+    def _create_image_cache_volume_entry(self, context, internal_context,
+                                         volume_ref, image_id, image_meta):
+        """Clone volume_ref into an image volume of the internal tenant.
+
+        Failing to cache the image does not fail the volume creation.
+        """
+        # Only one of the volumes created concurrently from the image on
+        # the pool gets cached.
+        @utils.synchronized('%s-%s-image_volume_cache' % (image_id,
+                                                          volume_ref['host']),
+                            external=True)
+        def _create_cache_entry():
+            if self.image_volume_cache.get_entry(context, volume_ref,
+                                                 image_id, image_meta):
+                LOG.debug("Image %(image_id)s was cached while volume "
+                          "%(volume_id)s was created.",
+                          {'image_id': image_id,
+                           'volume_id': volume_ref['id']})
+                return
+            host = volume_utils.extract_host(volume_ref['host'])
+            if not self.image_volume_cache.ensure_space(context,
+                                                        volume_ref['size'],
+                                                        host):
+                LOG.warn(_("Volume %(volume_id)s of %(size)dGB is larger "
+                           "than the image-volume cache, image %(image_id)s "
+                           "is not cached."),
+                         {'volume_id': volume_ref['id'],
+                          'size': volume_ref['size'], 'image_id': image_id})
+                return
+            image_volume = self._create_image_volume(internal_context,
+                                                     volume_ref, image_id)
+            self.image_volume_cache.create_cache_entry(context, image_volume,
+                                                       image_id, image_meta)
+
+        try:
+            _create_cache_entry()
+        except (exception.CinderException, NotImplementedError) as ex:
+            LOG.warn(_("Failed to cache image %(image_id)s of volume "
+                       "%(volume_id)s: %(error)s"),
+                     {'image_id': image_id, 'volume_id': volume_ref['id'],
+                      'error': ex})
+
+    def _create_image_volume(self, internal_context, volume_ref, image_id):
+        """Create a volume of the internal tenant cloned from volume_ref."""
+        reserve_opts = {'volumes': 1, 'gigabytes': volume_ref['size']}
+        QUOTAS.add_volume_type_opts(internal_context, reserve_opts,
+                                    volume_ref['volume_type_id'])
+        reservations = QUOTAS.reserve(internal_context, **reserve_opts)
+
+        image_volume = None
+        try:
+            image_volume = self.db.volume_create(internal_context, {
+                'size': volume_ref['size'],
+                'user_id': internal_context.user_id,
+                'project_id': internal_context.project_id,
+                'status': 'creating',
+                'attach_status': 'detached',
+                'host': volume_ref['host'],
+                'availability_zone': volume_ref['availability_zone'],
+                'volume_type_id': volume_ref['volume_type_id'],
+                'display_name': 'image-%s' % image_id,
+                'bootable': True,
+            })
+            model_update = self.driver.create_cloned_volume(image_volume,
+                                                            volume_ref)
+            updates = dict(model_update or dict(), status='available',
+                           launched_at=timeutils.utcnow())
+            image_volume = self.db.volume_update(internal_context,
+                                                 image_volume['id'], updates)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                QUOTAS.rollback(internal_context, reservations)
+                if image_volume:
+                    self.db.volume_destroy(internal_context,
+                                           image_volume['id'])
+
+        QUOTAS.commit(internal_context, reservations)
+        return image_volume
+
     def _create_raw_volume(self, context, volume_ref, **kwargs):
         return self.driver.create_volume(volume_ref)
 
@@ -706,7 +926,7 @@ def get_flow(context, db, driver, scheduler_rpcapi, host, volume_id,
              allow_reschedule, reschedule_context, request_spec,
              filter_properties, snapshot_id=None, image_id=None,
              source_volid=None, source_replicaid=None,
-             consistencygroup_id=None):
+             consistencygroup_id=None, image_volume_cache=None):
     """Constructs and returns the manager entrypoint flow.
 
     This flow will do the following:
@@ -748,7 +968,8 @@ def get_flow(context, db, driver, scheduler_rpcapi, host, volume_id,
 
     volume_flow.add(ExtractVolumeSpecTask(db),
                     NotifyVolumeActionTask(db, "create.start"),
-                    CreateVolumeFromSpecTask(db, driver),
+                    CreateVolumeFromSpecTask(db, driver,
+                                             image_volume_cache),
                     CreateVolumeOnFinishTask(db, "create.end"))
 
     # Now load (but do not run) the flow using the provided initial data.
@@ -48,6 +48,7 @@ from cinder import exception
 from cinder import flow_utils
 from cinder.i18n import _
 from cinder.image import glance
+from cinder.image import volume_cache
 from cinder import manager
 from cinder.openstack.common import excutils
 from cinder.openstack.common import importutils
@@ -153,7 +154,7 @@ def locked_snapshot_operation(f):
 class VolumeManager(manager.SchedulerDependentManager):
     """Manages attachable block storage devices."""
 
-    RPC_API_VERSION = '1.18'
+    RPC_API_VERSION = '1.19'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -193,6 +194,17 @@ class VolumeManager(manager.SchedulerDependentManager):
                 LOG.error("Invalid JSON: %s" %
                           self.driver.configuration.extra_capabilities)
 
+        if self.driver.configuration.safe_get('image_volume_cache_enabled'):
+            self.image_volume_cache = volume_cache.ImageVolumeCache(
+                self.db,
+                importutils.import_object(CONF.volume_api_class),
+                self.driver.configuration.safe_get(
+                    'image_volume_cache_max_size_gb'),
+                self.driver.configuration.safe_get(
+                    'image_volume_cache_max_count'))
+        else:
+            self.image_volume_cache = None
+
     def _add_to_threadpool(self, func, *args, **kwargs):
         self._tp.spawn_n(func, *args, **kwargs)
 
@@ -343,6 +355,7 @@ class VolumeManager(manager.SchedulerDependentManager):
                 source_volid=source_volid,
                 source_replicaid=source_replicaid,
                 consistencygroup_id=consistencygroup_id,
+                image_volume_cache=self.image_volume_cache,
                 allow_reschedule=allow_reschedule,
                 reschedule_context=context_saved,
                 request_spec=request_spec,
@@ -474,6 +487,12 @@ class VolumeManager(manager.SchedulerDependentManager):
         # Delete glance metadata if it exists
         self.db.volume_glance_metadata_delete_by_volume(context, volume_id)
 
+        if self.image_volume_cache:
+            cache_entry = self.image_volume_cache.get_by_image_volume(
+                context, volume_id)
+            if cache_entry:
+                self.image_volume_cache.evict(context, cache_entry)
+
         self.db.volume_destroy(context, volume_id)
         LOG.info(_("volume %s: deleted successfully"), volume_ref['id'])
         self._notify_about_volume_usage(context, volume_ref, "delete.end")
@@ -1227,8 +1246,10 @@ class VolumeManager(manager.SchedulerDependentManager):
 
                 pool.update(pool_stats)
 
-    def publish_service_capabilities(self, context):
+    def publish_service_capabilities(self, context, full_sync=False):
         """Collect driver status and then publish."""
+        if full_sync:
+            self.request_full_capabilities_sync()
         self._report_driver_status(context)
         self._publish_service_capabilities(context)
 
@@ -57,6 +57,7 @@ class VolumeAPI(object):
         1.18 - Adds create_consistencygroup, delete_consistencygroup,
                create_cgsnapshot, and delete_cgsnapshot. Also adds
                the consistencygroup_id parameter in create_volume.
+        1.19 - Adds host and full_sync to publish_service_capabilities.
     '''
 
     BASE_RPC_API_VERSION = '1.0'
@@ -65,7 +66,7 @@ class VolumeAPI(object):
         super(VolumeAPI, self).__init__()
         target = messaging.Target(topic=CONF.volume_topic,
                                   version=self.BASE_RPC_API_VERSION)
-        self.client = rpc.get_client(target, '1.18')
+        self.client = rpc.get_client(target, '1.19')
 
     def create_consistencygroup(self, ctxt, group, host):
         new_host = utils.extract_host(host)
@@ -169,9 +170,17 @@ class VolumeAPI(object):
         return cctxt.call(ctxt, 'terminate_connection', volume_id=volume['id'],
                           connector=connector, force=force)
 
-    def publish_service_capabilities(self, ctxt):
-        cctxt = self.client.prepare(fanout=True, version='1.2')
-        cctxt.cast(ctxt, 'publish_service_capabilities')
+    def publish_service_capabilities(self, ctxt, host=None, full_sync=False):
+        if host is None and not full_sync:
+            cctxt = self.client.prepare(fanout=True, version='1.2')
+            cctxt.cast(ctxt, 'publish_service_capabilities')
+            return
+
+        if host is None:
+            cctxt = self.client.prepare(fanout=True, version='1.19')
+        else:
+            cctxt = self.client.prepare(server=host, version='1.19')
+        cctxt.cast(ctxt, 'publish_service_capabilities', full_sync=full_sync)
 
     def accept_transfer(self, ctxt, volume, new_user, new_project):
         new_host = utils.extract_host(volume['host'])